@@ -140,3 +140,47 @@ def test_non_langchain_backend_allows_embed_tools_when_mcp_is_enabled():
 
     assert args.mcp_server is True
     assert args.no_embed_tools is False
+
+
+def test_profile_startup_reports_lazy_tool_imports():
+    import subprocess
+
+    script = (
+        "import sys\n"
+        "sys.argv = ['ucagent', '--profile-startup', '--help']\n"
+        "import ucagent.cli\n"
+        "import ucagent.tools as tools\n"
+        "assert 'ucagent.tools.memory' not in sys.modules and 'mem0' not in sys.modules\n"
+        "assert tools.ReadTextFile.__module__ == 'ucagent.tools.fileops'\n"
+        "assert 'mcp' not in sys.modules and 'ucagent.tools.memory' not in sys.modules\n"
+        "ucagent.cli.get_args()\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=repo_root,
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert "--profile-startup" in result.stdout
+    assert "Startup import profile:" in result.stderr
+    assert "ucagent.tools.fileops" in result.stderr
+
+
+def test_check_config_cache_uses_the_overrides_of_a_real_start(tmp_path, monkeypatch):
+    from ucagent.util.config import get_config
+
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    (tmp_path / "home").mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("UC_CONFIG_CACHE", "true")
+
+    def start(config_file=None, cfg_override=None, **kwargs):
+        get_config(config_file, cfg_override, os.path.abspath(kwargs["workspace"]))
+        return mock.MagicMock()
+
+    argv = ["ucagent", str(workspace), "dut", "--backend", "langchain"]
+    with mock.patch("sys.argv", argv), mock.patch("ucagent.verify_agent.VerifyAgent", side_effect=start):
+        run()
+    with mock.patch("sys.argv", argv + ["--check-config-cache"]), pytest.raises(SystemExit) as exit_info:
+        run()
+    assert exit_info.value.code == 0
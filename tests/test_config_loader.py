@@ -458,6 +458,97 @@ plain_text: not enabled
             },
         )
 
+    def test_get_config_is_cached_until_a_source_file_or_env_var_changes(self):
+        import ucagent.util.config as config_module
+        from ucagent.util.config import check_config_cache, get_config
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            home_dir = os.path.join(temp_dir, "home")
+            work_dir = os.path.join(temp_dir, "work")
+            os.makedirs(os.path.join(home_dir, ".ucagent"))
+            os.makedirs(work_dir)
+            with open(os.path.join(home_dir, ".ucagent", "setting.yaml"), "w", encoding="utf-8") as handle:
+                handle.write("# user\n")
+            with open(os.path.join(work_dir, "run.yaml"), "w", encoding="utf-8") as handle:
+                handle.write("include: extra.yaml\ncache_probe: $(UC_TEST_CONFIG_CACHE: a)\n"
+                             "cache_api_key: \"Bearer $(UC_TEST_CACHE_API_KEY: none)\"\n")
+            extra_path = os.path.join(work_dir, "extra.yaml")
+            with open(extra_path, "w", encoding="utf-8") as handle:
+                handle.write("cache_extra: 1\n")
+
+            old_cwd = os.getcwd()
+            os.chdir(work_dir)
+            try:
+                with mock.patch.dict(os.environ, {"HOME": home_dir, "UC_CONFIG_CACHE": "true",
+                                                  "UC_TEST_CACHE_API_KEY": "sk-cache-secret"}), \
+                        mock.patch.object(config_module, "_build_config",
+                                          wraps=config_module._build_config) as build:
+                    override = [{"cache_override": "x"}]
+                    self.assertFalse(check_config_cache("run.yaml", override)[0])
+                    first = get_config("run.yaml", override)
+                    second = get_config("run.yaml", override)
+                    self.assertEqual(build.call_count, 1)
+                    self.assertTrue(check_config_cache("run.yaml", override)[0])
+                    self.assertEqual(second.as_dict(), first.as_dict())
+                    self.assertEqual((second.cache_probe, second.cache_extra, second.cache_override), ("a", 1, "x"))
+                    self.assertEqual(second.cache_api_key, "Bearer sk-cache-secret")
+                    cache_dir = os.path.join(home_dir, ".ucagent", "config_cache")
+                    for name in os.listdir(cache_dir):
+                        path = os.path.join(cache_dir, name)
+                        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+                        with open(path, encoding="utf-8") as handle:
+                            self.assertNotIn("sk-cache-secret", handle.read())
+                    self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+                    self.assertEqual(second._loaded_config_files, first._loaded_config_files)
+                    with self.assertRaises(RuntimeError):
+                        second.cache_probe = "b"
+
+                    get_config("run.yaml", [{"cache_override": "y"}])
+                    self.assertEqual(build.call_count, 2)
+
+                    with open(extra_path, "w", encoding="utf-8") as handle:
+                        handle.write("cache_extra: 2\n")
+                    fresh, reason = check_config_cache("run.yaml", override)
+                    self.assertFalse(fresh)
+                    self.assertIn("extra.yaml", reason)
+                    self.assertEqual(get_config("run.yaml", override).cache_extra, 2)
+
+                    os.environ["UC_TEST_CONFIG_CACHE"] = "b"
+                    self.assertFalse(check_config_cache("run.yaml", override)[0])
+                    self.assertEqual(get_config("run.yaml", override).cache_probe, "b")
+                    self.assertEqual(build.call_count, 4)
+
+                    # a secret written literally into a config file keeps that config out of the cache
+                    with open(extra_path, "w", encoding="utf-8") as handle:
+                        handle.write("cache_extra: 3\nother_api_key: sk-literal\n")
+                    get_config("run.yaml", override)
+                    self.assertEqual(get_config("run.yaml", override).other_api_key, "sk-literal")
+                    self.assertEqual(build.call_count, 6)
+                    self.assertFalse(check_config_cache("run.yaml", override)[0])
+            finally:
+                os.chdir(old_cwd)
+
+
+    def test_get_config_cache_hits_on_second_start_with_a_new_home(self):
+        import ucagent.util.config as config_module
+        from ucagent.util.config import get_config
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            home_dir = os.path.join(temp_dir, "home")
+            os.makedirs(home_dir)
+            old_cwd = os.getcwd()
+            os.chdir(temp_dir)
+            try:
+                with mock.patch.dict(os.environ, {"HOME": home_dir, "UC_CONFIG_CACHE": "true"}), \
+                        mock.patch.object(config_module, "_build_config",
+                                          wraps=config_module._build_config) as build:
+                    get_config(None, [])
+                    self.assertTrue(os.path.isfile(os.path.join(home_dir, ".ucagent", "setting.yaml")))
+                    get_config(None, [])
+                    self.assertEqual(build.call_count, 1)
+            finally:
+                os.chdir(old_cwd)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -186,3 +186,47 @@ def test_git_add_and_commit_without_changes_keeps_previous_commit_message(tmp_pa
 
     assert second_hash == first_hash
     assert diff_ops.get_commit_message(str(repo_dir), second_hash).strip() == "stage 1"
+
+
+def test_git_commit_paths_commits_only_given_paths(tmp_path):
+    repo_dir = tmp_path / "repo"
+    (repo_dir / "out" / "sub").mkdir(parents=True)
+
+    diff_ops.init_git_repo(str(repo_dir))
+    (repo_dir / "out" / "a.txt").write_text("a1\n", encoding="utf-8")
+    (repo_dir / "out" / "sub" / "b.txt").write_text("b1\n", encoding="utf-8")
+    first_hash = diff_ops.git_commit_paths(str(repo_dir), "init", ["out/a.txt"])
+    assert diff_ops.get_commit_changed_files(str(repo_dir), first_hash) == ["out/a.txt", "out/sub/b.txt"]
+
+    (repo_dir / "out" / "a.txt").write_text("a2\n", encoding="utf-8")
+    (repo_dir / "out" / "new.txt").write_text("new\n", encoding="utf-8")
+    (repo_dir / "out" / "untouched.txt").write_text("later\n", encoding="utf-8")
+    (repo_dir / "out" / "sub" / "b.txt").unlink()
+    (repo_dir / "out" / "sub").rmdir()
+    second_hash = diff_ops.git_commit_paths(str(repo_dir), "stage 1", ["out/a.txt", "out/new.txt", "out/sub"])
+
+    assert diff_ops.get_commit_changed_file_statuses(str(repo_dir), second_hash) == {
+        "out/a.txt": "modified", "out/new.txt": "added", "out/sub/b.txt": "deleted",
+    }
+    assert diff_ops.get_latest_commit_hash(str(repo_dir)) == second_hash
+    assert diff_ops.get_commit_message(str(repo_dir), second_hash).strip() == "stage 1"
+    assert diff_ops.get_untracked_files(str(repo_dir)) == ["out/untouched.txt"]
+    assert diff_ops.git_commit_paths(str(repo_dir), "no changes", ["out/a.txt"]) == second_hash
+
+
+def test_git_commit_paths_checks_ignored_files_in_chunks(tmp_path, monkeypatch):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    diff_ops.init_git_repo(str(repo_dir))
+    (repo_dir / "seed.txt").write_text("seed\n", encoding="utf-8")
+    diff_ops.git_commit_paths(str(repo_dir), "init", ["seed.txt"])
+    (repo_dir / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    names = [f"f{i}.txt" for i in range(5)] + ["skip.log", ".gitignore"]
+    for name in names[:-1]:
+        (repo_dir / name).write_text(name, encoding="utf-8")
+    chunks = diff_ops._chunks
+    monkeypatch.setattr(diff_ops, "_chunks", lambda items, size=512: chunks(items, 2))
+    commit = diff_ops.git_commit_paths(str(repo_dir), "many", names)
+
+    assert sorted(diff_ops.get_commit_changed_files(str(repo_dir), commit)) == \
+        sorted([".gitignore"] + names[:5])
@@ -742,3 +742,45 @@ def test_runtime_line_map_guide_uses_configured_limits_and_user_facing_terms():
     assert "进度文档" not in guide_text
     assert "checkpoint" not in guide_text
     assert "TUI" not in guide_text
+
+
+def test_batch_checker_validates_files_concurrently_and_reuses_results(tmp_path, monkeypatch):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "out" / "line_map").mkdir(parents=True)
+    _write_spec(tmp_path / "out" / "spec.md")
+    for name in ("a", "b", "c"):
+        (tmp_path / "src" / f"{name}.md").write_text("line\n" * 3, encoding="utf-8")
+        (tmp_path / "out" / "line_map" / f"src_{name}_md_line_func_map.txt").write_text(
+            "FG-API/FC-API/CK-API: 1-3\n", encoding="utf-8")
+
+    checker = UnityChipBatchCheckerFileLineMap(
+        name="functional_line_mapping",
+        file_list=["src/*.md"],
+        func_check_file="out/spec.md",
+        map_location="out/line_map",
+        batch_size=3,
+        max_workers=3,
+    ).set_workspace(str(tmp_path)).set_stage(_Stage())
+    checker.on_init()
+    calls = []
+    original = checker._check_line_block
+    monkeypatch.setattr(checker, "_check_line_block",
+                        lambda task, ck_list: calls.append(task) or original(task, ck_list))
+
+    passed, result = checker.do_check(is_complete=False)
+    assert passed is True
+    assert result["progress"] == "3/3"
+    assert len(calls) == 3
+    assert sorted(checker.get_file_timing()) == ["src/a.md", "src/b.md", "src/c.md"]
+
+    passed, _ = checker.do_check(is_complete=False)
+    assert passed is True
+    assert len(calls) == 3
+
+    (tmp_path / "out" / "line_map" / "src_b_md_line_func_map.txt").write_text(
+        "FG-API/FC-API/CK-API: 1-2\n", encoding="utf-8")
+    passed, result = checker.do_check(is_complete=False)
+    assert passed is False
+    assert result["invalid_completed_mappings"][0]["line_block"] == "src/b.md:1-3"
+    assert calls[3:] == [task for task in checker.batch_task.source_task_list
+                         if task.startswith("src/b.md")]
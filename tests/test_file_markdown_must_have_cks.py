@@ -9,6 +9,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.abspath(os.path.join(current_dir, "..")))
 
 from ucagent.checkers.file_markdown import MustHaveCKs
+from ucagent.checkers.unity_test import UnityChipCheckerLabelStructure
 
 
 def write_doc(path, labels):
@@ -157,3 +158,57 @@ def test_must_have_cks_reports_target_doc_parse_error(tmp_path):
     assert passed is False
     assert "functions_and_checks.md" in msg["error"]
     assert "parent FC tag" in msg["error"]
+
+
+def test_must_have_cks_check_result_is_cached_until_inputs_change(tmp_path, monkeypatch):
+    write_doc(tmp_path / "functions_and_checks.md", [("API", "BASIC", "RESET")])
+    write_doc(tmp_path / "source_a.md", [("API", "BASIC", "RESET")])
+
+    checker = MustHaveCKs(
+        source_files="source_*.md",
+        funcs_and_checks_doc="functions_and_checks.md",
+    ).set_workspace(str(tmp_path)).set_check_cache(True)
+    runs = []
+    do_check = checker.do_check
+    monkeypatch.setattr(checker, "do_check", lambda *a, **kw: runs.append(1) or do_check(*a, **kw))
+
+    passed, msg = checker.check(timeout=10)
+    assert passed is True and "check_cache" not in msg
+    passed, msg = checker.check(timeout=20)
+    assert passed is True and msg["check_cache"].startswith("hit")
+    assert len(runs) == 1
+
+    # a new file matching the source pattern changes the inputs
+    write_doc(tmp_path / "source_b.md", [("API", "BASIC", "READY")])
+    passed, msg = checker.check(timeout=10)
+    assert passed is False and "check_cache" not in msg
+    assert len(runs) == 2
+
+    checker.clear_check_cache()
+    checker.check(timeout=10)
+    assert len(runs) == 3
+    assert checker.get_check_cache_statistics() == {"hits": 1, "misses": 3, "entries": 1}
+
+
+def test_label_structure_cache_hit_replays_published_marks(tmp_path):
+    class StageManager:
+        data = {}
+
+        def set_data(self, key, value):
+            self.data[key] = value
+
+    write_doc(tmp_path / "functions_and_checks.md", [("API", "BASIC", "RESET"), ("API", "BASIC", "READY")])
+    checker = UnityChipCheckerLabelStructure(
+        "functions_and_checks.md", "CK", data_key="ck_marks",
+    ).set_workspace(str(tmp_path)).set_check_cache(True)
+    checker.stage_manager = StageManager()
+
+    assert checker.check()[0] is True
+    marks = checker.stage_manager.data.pop("ck_marks")
+    assert len(marks) == 2
+    checker.leaf_count = None
+
+    passed, msg = checker.check()
+    assert passed is True and msg["check_cache"].startswith("hit")
+    assert checker.stage_manager.data["ck_marks"] == marks
+    assert checker.get_template_data() == {"COUNT_CK": "2"}
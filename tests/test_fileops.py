@@ -265,6 +265,48 @@ class TestFileOpsTools(unittest.TestCase):
 
         self.assertIn("requires the 'regex' package", result)
 
+    def test_search_text_trigram_index_matches_full_scan(self):
+        """The trigram index only skips files, results equal a full scan."""
+        with open(os.path.join(self.workspace, "subdir", "unicode.txt"), "w", encoding="utf-8") as f:
+            f.write("Temperature 300K kelvin\nΣΊΣΥΦΟΣ line\n")
+        index_path = os.path.join(self.workspace, ".ucagent", "search_index", "trigrams.idx")
+        index = TrigramIndex(self.workspace, index_path, min_file_age=0)
+        indexed = SearchText(workspace=self.workspace).set_search_index(index)
+        plain = SearchText(workspace=self.workspace)
+        # The first query scans and queues the files, they are indexed in the background
+        self.assertEqual(indexed._run(pattern="Nested"), plain._run(pattern="Nested"))
+        self.assertEqual(index.get_statistics()["files_skipped"], 0)
+        index.wait_update()
+        self.assertGreater(index.get_statistics()["files_indexed"], 0)
+        queries = [
+            {"pattern": "line 2"}, {"pattern": "Nested"}, {"pattern": "Nested", "case_sensitive": True},
+            {"pattern": "*def meth*"}, {"pattern": "class Test*"}, {"pattern": "no such text"},
+            {"pattern": r"Line \d", "use_regex": True}, {"pattern": "ret(urn)? 42", "use_regex": True},
+            {"pattern": "300k", "use_regex": True}, {"pattern": "σίσυφος"}, {"pattern": "ne 3|deep", "use_regex": True},
+        ]
+        for query in queries:
+            self.assertEqual(indexed._run(**query), plain._run(**query), query)
+        self.assertGreater(index.get_statistics()["files_skipped"], 0)
+        self.assertTrue(os.path.exists(index_path))
+
+        with open(os.path.join(self.workspace, "simple.txt"), "a", encoding="utf-8") as f:
+            f.write("A brand new line\n")
+        index.on_file_changed(True, "simple.txt", "")
+        self.assertIn("simple.txt", indexed._run(pattern="brand new"))
+        index.wait_update()
+
+        reloaded = TrigramIndex(self.workspace, index_path, min_file_age=0)
+        reloaded_tool = SearchText(workspace=self.workspace).set_search_index(reloaded)
+        self.assertEqual(reloaded_tool._run(pattern="Deep nested"), plain._run(pattern="Deep nested"))
+        self.assertEqual(reloaded.get_statistics()["files_indexed"], 0)
+
+        # Recently modified files are scanned but not indexed
+        fresh = TrigramIndex(self.workspace, index_path + ".fresh")
+        fresh_tool = SearchText(workspace=self.workspace).set_search_index(fresh)
+        self.assertEqual(fresh_tool._run(pattern="Deep nested"), plain._run(pattern="Deep nested"))
+        fresh.wait_update()
+        self.assertEqual(fresh.get_statistics()["files_indexed"], 0)
+
     def test_find_files(self):
         """Test file finding functionality"""
         tool = FindFiles(workspace=self.workspace)
@@ -356,6 +398,59 @@ class TestFileOpsTools(unittest.TestCase):
         self.assertNotIn("1: Line 1", result)
         self.assertEqual(callback_results, [(True, "simple.txt", "")])
 
+    def test_read_text_file_uses_line_index_for_appended_logs(self):
+        """Ranged reads match a full read and follow appends and rewrites of a file."""
+        import hashlib
+        from ucagent.util import line_index
+
+        log_path = os.path.join(self.workspace, "sim.log")
+        lines = [f"cycle {i}\r\n" if i % 3 else f"cycle {i}\n" for i in range(1, 301)]
+        with open(log_path, "w", encoding="utf-8", newline="") as f:
+            f.write("".join(lines) + "tail\r")
+        tool = ReadTextFile(workspace=self.workspace)
+
+        result = tool._run(path="sim.log", start=130, count=3, structured_output=True)
+        self.assertEqual(result["content"], "".join(lines[129:132]))
+        self.assertEqual(result["total_lines"], 301)
+        index = line_index._get_line_index(log_path)
+        checkpoints = index.checkpoints
+        with open(log_path, "a", encoding="utf-8", newline="") as f:
+            f.write("\nnext\n")
+        result = tool._run(path="sim.log", start=300, count=-1, structured_output=True)
+        self.assertIs(line_index._get_line_index(log_path).checkpoints, checkpoints)
+        self.assertEqual(result["content"], lines[299] + "tail\r\nnext\n")
+        self.assertEqual(result["total_lines"], 302)
+        with open(log_path, "rb") as f:
+            self.assertEqual(result["sha256"], hashlib.sha256(f.read()).hexdigest())
+
+        with open(log_path, "w", encoding="utf-8") as f:
+            f.write("rewritten\n" * 400)
+        result = tool._run(path="sim.log", start=399, count=5, structured_output=True)
+        self.assertEqual(result["content"], "rewritten\n" * 2)
+        self.assertEqual(result["total_lines"], 400)
+
+    def test_line_index_survives_chunk_boundaries_and_truncation(self):
+        """Line ends split over reads count once, a file truncated under a view raises instead of crashing."""
+        from ucagent.util import line_index
+
+        log_path = os.path.join(self.workspace, "out.log")
+        content = "ab\r\ncd\r\r\nef\n\rgh\r"
+        with open(log_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content * 20)
+        with patch.object(line_index, "_CHUNK_SIZE", 3):
+            with line_index.open_text_view(log_path) as view:
+                lines = [line for _, line in view.iter_lines(1)]
+        expected = (content * 20).splitlines(keepends=True)
+        self.assertEqual(lines, expected)
+
+        with open(log_path, "w", encoding="utf-8") as f:
+            f.write("x\n" * 1000)
+        with line_index.open_text_view(log_path) as view:
+            with open(log_path, "w", encoding="utf-8") as f:
+                f.write("y\n")
+            with self.assertRaises(line_index.FileChangedError):
+                list(view.iter_lines(900))
+
     def test_read_text_file_edge_cases(self):
         """Test edge cases for text file reading"""
         tool = ReadTextFile(workspace=self.workspace)
@@ -1057,6 +1152,43 @@ class TestFileOpsTools(unittest.TestCase):
         self.assertIn("already has the requested content", result)
         self.assertNotIn("[ERROR]", result)
 
+    def test_multi_edit_files_applies_all_edits_or_none(self):
+        tool = MultiEditFiles(workspace=self.workspace)
+        callback_results = []
+        tool.append_callback(lambda success, path, msg: callback_results.append((success, path)))
+        simple = os.path.join(self.workspace, "simple.txt")
+        nested = os.path.join(self.workspace, "subdir", "nested.txt")
+
+        result = tool.invoke({"edits": [
+            {"path": "simple.txt", "old_string": "Line 1", "new_string": "First"},
+            {"path": "subdir/nested.txt", "old_string": "Second line", "new_string": "2nd"},
+            {"path": "simple.txt", "old_string": "Line", "new_string": "Row"},
+        ]})
+        self.assertIn("appears 2 times", result)
+        self.assertIn("Edit 3 (simple.txt)", result)
+        with open(simple, encoding="utf-8") as f:
+            self.assertEqual(f.read(), self.test_files["simple.txt"])
+        with open(nested, encoding="utf-8") as f:
+            self.assertEqual(f.read(), self.test_files["subdir/nested.txt"])
+        self.assertEqual(callback_results, [(False, "simple.txt")])
+
+        callback_results.clear()
+        result = tool.invoke({"edits": [
+            {"path": "simple.txt", "old_string": "Line 1", "new_string": "First"},
+            {"path": "subdir/nested.txt", "old_string": "Second line", "new_string": "2nd"},
+            {"path": "simple.txt", "old_string": "First\nLine 2", "new_string": "First\nSecond"},
+        ], "expected_sha256": {"simple.txt": hashlib.sha256(b"Line 1\nLine 2\nLine 3\n").hexdigest()}})
+        self.assertIn("Successfully applied 3 edits", result)
+        with open(simple, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "First\nSecond\nLine 3\n")
+        with open(nested, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "Nested file content\n2nd\n")
+        self.assertEqual(callback_results, [(True, "simple.txt"), (True, "subdir/nested.txt")])
+        self.assertEqual(
+            tool._get_call_lock_keys({"edits": [{"path": "b.txt"}, {"path": "a.txt"}, {"path": "b.txt"}]}),
+            [os.path.realpath(os.path.join(self.workspace, name)) for name in ("a.txt", "b.txt")],
+        )
+
     def test_file_tool_schemas_require_mutating_arguments(self):
         edit_schema = ArgEditTextFile.model_json_schema()
         delete_lines_schema = ArgDeleteTextLines.model_json_schema()
@@ -1292,6 +1424,57 @@ class TestFileOpsTools(unittest.TestCase):
         self.assertTrue(started_concurrently)
         self.assertEqual(set(results), {"first.txt", "second.txt"})
 
+    def test_sync_tool_calls_run_concurrently_unless_paths_conflict(self):
+        state_lock = threading.Lock()
+        active = []
+        peak = {}
+
+        def blocking_read(tool, path, **kwargs):
+            path = os.path.normpath(path)
+            with state_lock:
+                active.append(path)
+                peak[path] = max(peak.get(path, 0), active.count(path))
+                peak["all"] = max(peak.get("all", 0), len(active))
+            threading.Event().wait(0.1)
+            with state_lock:
+                active.remove(path)
+            return path
+
+        tool = ReadTextFile(workspace=self.workspace)
+        self.assertEqual(tool.call_lock_arguments, ("path",))
+        paths = ["a.txt", "./a.txt", "b.txt", "c.txt"]
+        with patch.object(ReadTextFile, "_run", blocking_read):
+            threads = [threading.Thread(target=tool.invoke, args=({"path": p},)) for p in paths]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(timeout=2)
+
+        # "a.txt" and "./a.txt" are the same file and never overlap
+        self.assertEqual(peak["a.txt"], 1)
+        self.assertGreaterEqual(peak["all"], 2)
+        self.assertLessEqual(peak["all"], 3)
+
+    def test_sync_calls_of_tool_without_lock_arguments_wait_for_each_other(self):
+        tool = GetFileInfo(workspace=self.workspace)
+        tool.call_lock_arguments = ()
+        tool.lock_time_out = 0.05
+        results = []
+
+        def slow_run(tool, path, **kwargs):
+            threading.Event().wait(0.2)
+            return path
+
+        with patch.object(GetFileInfo, "_run", slow_run):
+            threads = [threading.Thread(target=lambda p=p: results.append(tool.invoke({"path": p})))
+                       for p in ["a.txt", "b.txt"]]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(timeout=2)
+
+        self.assertEqual(sorted(results), ["a.txt", "b.txt"])
+
     def test_get_diff_reports_identical_content(self):
         self.assertIn(
             "No changes detected",
@@ -1357,6 +1540,62 @@ class TestBaseReadWrite(unittest.TestCase):
         self.assertEqual(real_path, os.path.realpath(self.test_dir))
 
 
+class TestToolResultCache(unittest.TestCase):
+    """Test the result cache of read-only tools"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp(prefix="test_cache_")
+        os.makedirs(os.path.join(self.test_dir, "src"))
+        self.file_path = os.path.join(self.test_dir, "src", "a.txt")
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            f.write("alpha\nbeta\n")
+        self.cache = ToolResultCache(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_read_hits_cache_and_replays_callbacks(self):
+        tool = ReadTextFile(self.test_dir).set_result_cache(self.cache)
+        reads = []
+        tool.append_callback(lambda success, path, msg: reads.append(path))
+
+        import ucagent.tools.fileops as fileops
+        with patch.object(fileops, "_text_file_metadata",
+                          wraps=fileops._text_file_metadata) as metadata:
+            first = tool._run(path="src/a.txt")
+            second = tool._run(path="./src/a.txt", start=1)
+            self.assertEqual(metadata.call_count, 1)
+
+        self.assertEqual(first, second)
+        self.assertEqual(reads, ["src/a.txt", "src/a.txt"])
+        self.assertEqual(tool.get_cache_statistics(),
+                         {"hits": 1, "misses": 1, "invalidations": 0})
+
+    def test_external_change_is_detected_by_fingerprint(self):
+        tool = SearchText(self.test_dir).set_result_cache(self.cache)
+        self.assertIn("No matches", tool._run(pattern="gamma", directory="src"))
+        with open(os.path.join(self.test_dir, "src", "b.txt"), "w", encoding="utf-8") as f:
+            f.write("gamma\n")
+        self.assertIn("b.txt", tool._run(pattern="gamma", directory="src"))
+        self.assertEqual(tool.get_cache_statistics()["hits"], 0)
+
+    def test_write_tool_callback_invalidates_entries(self):
+        reader = PathList(self.test_dir).set_result_cache(self.cache)
+        writer = EditTextFile(self.test_dir)
+        writer.append_callback(self.cache.on_file_changed)
+        reader._run(path="src")
+        reader._run(path=".")
+
+        writer._run(path="src/new.txt", content="new\n")
+
+        self.assertEqual(reader.get_cache_statistics()["invalidations"], 2)
+        self.assertIn("src/new.txt", reader._run(path="src"))
+        self.assertEqual(self.cache.get_statistics()["entries"], 1)
+
+    def test_tools_without_cache_report_no_statistics(self):
+        self.assertIsNone(FindFiles(self.test_dir).get_cache_statistics())
+
+
 def run_specific_tests():
     """Run specific tests for debugging"""
     suite = unittest.TestSuite()
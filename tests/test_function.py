@@ -9,6 +9,8 @@ sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
 
 from ucagent.util.functions import find_files_by_glob, find_files_by_regex, find_files_by_pattern, render_template_dir
 import ucagent.util.functions as fc
+import pytest
+import json
 
 
 def test_find_files_by_glob():
@@ -227,6 +229,79 @@ def test_workspace_relative_path_suffix_fallback_requires_unique_match(tmp_path)
     assert path == "container/workdir/tests/test_duplicate.py"
 
 
+def test_load_toffee_report_index_is_cached_by_file_signature(tmp_path, monkeypatch):
+    """Test the toffee report is parsed once per file version and results are not shared."""
+    import json
+    import time
+    tc_a, tc_b = f"{tmp_path}/tests/test_a.py:1-2::test_a", f"{tmp_path}/tests/test_a.py:4-5::test_b"
+    report = {
+        "test_abstract_info": {tc_a: "FAILED", tc_b: "PASSED"},
+        "tests": [{}, {}],
+        "coverages": {"functional": {"point_num_total": 1, "point_num_hints": 1,
+                                     "bin_num_total": 2, "bin_num_hints": 1, "groups": [{
+            "name": "G", "points": [{"name": "P", "functions": {"x": [tc_a, tc_b]},
+                                     "bins": [{"name": "x", "hints": 1}, {"name": "y", "hints": 0}]}]}]}},
+    }
+    path = tmp_path / "toffee_report.json"
+    path.write_text(json.dumps(report), encoding="utf-8")
+    loads = []
+    load_json_file = fc.load_json_file
+    monkeypatch.setattr(fc, "load_json_file", lambda p: loads.append(p) or load_json_file(p))
+
+    ret = fc.load_toffee_report(str(path), str(tmp_path), True, True)
+    assert ret["tests"] == {"total": 2, "fails": 1,
+                            "test_cases": {"tests/test_a.py:1-2::test_a": "FAILED",
+                                           "tests/test_a.py:4-5::test_b": "PASSED"}}
+    assert ret["failed_test_case_with_check_point_list"] == {"tests/test_a.py:1-2::test_a": ["G/P/x"]}
+    assert ret["failed_check_point_list"] == ["G/P/y"]
+    assert ret["unmarked_check_point_list"] == ["G/P/y"]
+    ret["failed_check_point_list"].append("mutated")
+    assert fc.load_toffee_report(str(path), str(tmp_path), True, True)["failed_check_point_list"] == ["G/P/y"]
+    assert len(loads) == 1
+
+    time.sleep(0.01)
+    report["test_abstract_info"][tc_a] = "PASSED"
+    path.write_text(json.dumps(report), encoding="utf-8")
+    ret = fc.load_toffee_report(str(path), str(tmp_path), True, False)
+    assert len(loads) == 2
+    assert ret["tests"]["fails"] == 0 and ret["failed_test_case_with_check_point_list"] == {}
+
+
+def test_discover_functions_in_file_does_not_import(tmp_path, monkeypatch):
+    """Test static test discovery extracts functions without executing the module."""
+    test_file = tmp_path / "test_adder.py"
+    test_file.write_text(
+        "import pytest\n"
+        "raise RuntimeError('must not be imported')\n\n"
+        "@pytest.mark.parametrize('a, b', [(1, 2)])\n"
+        "def test_add(env, a, b):\n"
+        "    '''Check <CK-ADD> and <CK-CARRY>.'''\n"
+        "    env.dut.fc_cover['FG'].mark_function('FC', test_add)\n\n"
+        "@pytest.fixture(scope='module')\n"
+        "def env(request):\n"
+        "    return None\n\n"
+        "def test_sub(env): pass\n"
+        "def _test_private(env): pass\n",
+        encoding="utf-8",
+    )
+
+    funcs = fc.discover_functions_in_file(str(test_file), "test*")
+    assert [f.__name__ for f in funcs] == ["test_add", "test_sub"]
+    add = funcs[0]
+    assert fc.get_func_arg_list(add) == ["env", "a", "b"]
+    assert add.fixtures == ["env"]
+    assert add.doc_marks == ["CK-ADD", "CK-CARRY"]
+    assert fc.get_func_source(add).startswith("@pytest.mark.parametrize")
+    assert "mark_function" in add.source
+    env = fc.discover_functions_in_file(str(test_file), "env")[0]
+    assert env.is_fixture and env.decorators == ["pytest.fixture(scope='module')"]
+    assert [f.__name__ for f in fc.discover_functions_in_file(str(test_file), r"test_(add|mul)")] == ["test_add"]
+
+    test_file.write_text("def test_broken(:\n", encoding="utf-8")
+    with pytest.raises(ImportError):
+        fc.discover_functions_in_file(str(test_file), "test*")
+
+
 def test_markdown_headers():
     """Test function markdown_headers"""
     test_file = "../ucagent/lang/zh/doc/Guide_Doc/dut_spec_template.md"
@@ -273,3 +348,172 @@ if __name__ == "__main__":
     #test_markdown_headers()
     #test_markdown_get_miss_headers()
     test_parse_line_CK_map_file()
+
+
+def test_line_coverage_index_is_persisted_and_diffed(tmp_path):
+    """Test the line coverage index sidecar, its reuse and the diff between runs."""
+    report = tmp_path / "uc_test_report" / "line_dat" / "code_coverage.json"
+    report.parent.mkdir(parents=True)
+
+    def write_report(lines):
+        miss = len(fc._parse_line_ranges(lines))
+        report.write_text(json.dumps({
+            "overview": {"total": {"line": 100}, "miss": {"line": miss}},
+            "uncovered": {"data": {str(tmp_path / "Adder.v"): {
+                "total": {"line": 100}, "miss": {"line": miss},
+                "modules": {"Adder": {"miss": {"line": miss}, "line": lines}}}}},
+        }), encoding="utf-8")
+
+    write_report(["3-5", "9"])
+    data = fc.parse_un_coverage_json("uc_test_report/line_dat/code_coverage.json", str(tmp_path))
+    assert data["lines_uncovered"] == 4 and data["coverage_rate"] == 0.96
+    assert data["uncoverage_detail"] == [{"module_name": "Adder", "lines_uncovered": "Adder.v:3-5,9"}]
+    assert os.path.exists(str(report) + fc.LINE_COVERAGE_INDEX_SUFFIX)
+
+    first = fc.get_line_coverage_index(str(report))
+    assert first is fc.get_line_coverage_index(str(report))
+    assert first.is_uncovered(str(tmp_path / "Adder.v"), 4)
+    assert not first.is_uncovered(str(tmp_path / "Adder.v"), 6)
+
+    fc._line_coverage_cache.clear()
+    os.utime(report, ns=(1, 1))  # same content, new mtime: reuse the sidecar
+    assert fc.LineCoverageIndex.from_dict(
+        json.load(open(str(report) + fc.LINE_COVERAGE_INDEX_SUFFIX))).mtime_ns != 1
+    assert fc.get_line_coverage_index(str(report)).mtime_ns == 1
+
+    write_report(["4", "9-10"])
+    diff = fc.get_line_coverage_index(str(report)).diff(first)
+    assert diff["newly_covered"] == {str(tmp_path / "Adder.v"): ["3", "5"]}
+    assert diff["newly_uncovered"] == {str(tmp_path / "Adder.v"): ["10"]}
+    assert (diff["newly_covered_lines"], diff["newly_uncovered_lines"]) == (2, 1)
+
+
+def test_doc_model_cache_marks_and_invalidation(tmp_path):
+    """Test doc marks are parsed once per file version and dropped by write tool callbacks."""
+    doc = tmp_path / "Adder_functions_and_checks.md"
+    doc.write_text("## <FG-ADD>\n### <FC-SUM>\n- <CK-BASIC>\n- <CK-CARRY>\n", encoding="utf-8")
+
+    marks, blocks = fc.get_unity_chip_doc_marks(str(doc), "CK", 1, return_line_block=True)
+    assert marks == ["FG-ADD/FC-SUM/CK-BASIC", "FG-ADD/FC-SUM/CK-CARRY"]
+    assert "3: - <CK-BASIC>" in blocks["FG-ADD/FC-SUM/CK-BASIC"]
+    model = fc.get_doc_model(str(doc))
+    assert fc.get_doc_model(str(doc)) is model
+    marks.append("changed")
+    tree = fc.parse_nested_keys(str(doc), ["FG", "FC"], ["<FG-", "<FC-"], [">", ">"])
+    tree["FG-ADD"]["FC"].clear()
+    assert fc.get_unity_chip_doc_marks(str(doc), "CK") == ["FG-ADD/FC-SUM/CK-BASIC", "FG-ADD/FC-SUM/CK-CARRY"]
+    assert fc.get_unity_chip_doc_marks(str(doc), "FC") == ["FG-ADD/FC-SUM"]
+    assert fc.get_doc_model(str(doc)) is model
+
+    fc.doc_model_write_callback(str(tmp_path))(True, doc.name, "")
+    assert fc.get_doc_model(str(doc)) is not model
+
+    doc.write_text("### <FC-SUM>\n", encoding="utf-8")
+    for _ in range(2):
+        with pytest.raises(ValueError, match="parent FG tag"):
+            fc.get_unity_chip_doc_marks(str(doc), "FC")
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_workspace_file_index_matches_file_system(tmp_path, use_inotify):
+    """Test the workspace file index answers like glob and os.walk, also after changes."""
+    import glob
+    from ucagent.util.file_index import WorkspaceFileIndex, IndexMiss
+
+    for rel in ["a.py", "src/b.py", "src/deep/c.py", "src/.hidden.py", ".git/config", "doc/readme.md"]:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text("x", encoding="utf-8")
+    index = WorkspaceFileIndex(str(tmp_path), use_inotify=use_inotify)
+
+    def check():
+        for pattern in ["*.py", "**/*.py", "src/**", "src/*/", "*/*.md", "src/.*", "doc", "missing/*"]:
+            expected = sorted(f.removeprefix(str(tmp_path) + os.sep)
+                              for f in glob.glob(os.path.join(str(tmp_path), pattern), recursive=True))
+            assert sorted(index.glob(pattern)) == expected, pattern
+        walked = [(r, sorted(d), sorted(f)) for r, d, f in index.walk(str(tmp_path / "src"))]
+        assert walked == [(r, sorted(d), sorted(f)) for r, d, f in os.walk(str(tmp_path / "src"))]
+
+    check()
+    (tmp_path / "link").symlink_to(tmp_path / "src")
+    with pytest.raises(IndexMiss):
+        index.glob("link/*.py")
+    with pytest.raises(IndexMiss):
+        index.glob(".git/*")
+    (tmp_path / "link").unlink()
+    (tmp_path / "src/deep/new.py").write_text("y", encoding="utf-8")
+    (tmp_path / "src/b.py").unlink()
+    (tmp_path / "doc").rename(tmp_path / "docs")
+    (tmp_path / "docs/more").mkdir()
+    (tmp_path / "docs/more/x.md").write_text("z", encoding="utf-8")
+    if not use_inotify:
+        # directory mtimes may not change within the timestamp granularity
+        for d in ["src/deep", "src", ""]:
+            os.utime(tmp_path / d, ns=(0, 0))
+        index.dir_mtimes = {k: -1 for k in index.dir_mtimes}
+    check()
+    assert index.get_entry(str(tmp_path / "docs/more/x.md"))[2] == 1
+    index.close()
+
+
+def test_sync_dir_to_uses_manifest_and_removes_stale_items(tmp_path):
+    """Test sync_dir_to copies changes, skips unchanged content and mirrors removals."""
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    manifest = str(tmp_path / "sync.json")
+    for rel, text in {"a.txt": "a", "sub/b.txt": "b", "sub/deep/c.txt": "c", "skip.log": "x"}.items():
+        (src / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src / rel).write_text(text, encoding="utf-8")
+    (dst / "stale").mkdir(parents=True)
+    (dst / "stale" / "old.txt").write_text("old", encoding="utf-8")
+
+    fc.sync_dir_to(str(src), str(dst), ["*.log"], manifest_path=manifest, max_workers=2)
+    assert sorted(p.relative_to(dst).as_posix() for p in dst.rglob("*") if p.is_file()) == \
+        ["a.txt", "sub/b.txt", "sub/deep/c.txt"]
+    with open(manifest, encoding="utf-8") as f:
+        records = json.load(f)["files"]
+    assert set(records) == {"a.txt", os.path.join("sub", "b.txt"), os.path.join("sub", "deep", "c.txt")}
+
+    # touched but unchanged content is not copied again, changed content is
+    os.utime(src / "a.txt", ns=(10**18, 10**18))
+    (src / "sub" / "b.txt").write_text("B", encoding="utf-8")
+    os.utime(src / "sub" / "b.txt", ns=(1, 1))
+    (src / "sub" / "deep" / "c.txt").unlink()
+    a_mtime = os.stat(dst / "a.txt").st_mtime_ns
+    fc.sync_dir_to(str(src), str(dst), ["*.log"], manifest_path=manifest)
+    assert os.stat(dst / "a.txt").st_mtime_ns == a_mtime
+    assert (dst / "sub" / "b.txt").read_text(encoding="utf-8") == "B"
+    assert not (dst / "sub" / "deep" / "c.txt").exists()
+
+    # a target changed behind the manifest is restored
+    (dst / "a.txt").write_text("changed", encoding="utf-8")
+    fc.sync_dir_to(str(src), str(dst), ["*.log"], manifest_path=manifest)
+    assert (dst / "a.txt").read_text(encoding="utf-8") == "a"
+
+
+def test_snapshot_shares_unchanged_files_and_restores(tmp_path):
+    """Test snapshots hard link unchanged files to their base and restore only differences."""
+    from ucagent.util.snapshot import take_snapshot, restore_snapshot, latest_snapshot
+    src, root = tmp_path / "src", tmp_path / "checkpoints"
+    for rel, text in {"a.txt": "a", "sub/b.txt": "b", "skip.log": "x"}.items():
+        (src / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src / rel).write_text(text, encoding="utf-8")
+
+    first = take_snapshot(str(src), str(root / "s1"), ["*.log"])
+    assert first["linked"] == 0 and first["reflinked"] + first["copied"] == 2
+    assert latest_snapshot(str(root)) == str(root / "s1")
+    (src / "sub" / "b.txt").write_text("B", encoding="utf-8")
+    second = take_snapshot(str(src), str(root / "s2"), ["*.log"], base_dir=latest_snapshot(str(root)))
+    assert second["linked"] == 1 and second["reflinked"] + second["copied"] == 1
+    assert os.stat(root / "s1" / "tree" / "a.txt").st_ino == os.stat(root / "s2" / "tree" / "a.txt").st_ino
+    assert not (root / "s2" / "tree" / "skip.log").exists()
+
+    (src / "a.txt").write_text("changed", encoding="utf-8")
+    (src / "extra").mkdir()
+    (src / "extra" / "e.txt").write_text("e", encoding="utf-8")
+    count = restore_snapshot(str(root / "s1"), str(src), ["*.log"])
+    assert count["restored"] == 2 and count["removed"] == 2
+    assert (src / "a.txt").read_text(encoding="utf-8") == "a"
+    assert (src / "sub" / "b.txt").read_text(encoding="utf-8") == "b"
+    assert not (src / "extra").exists() and (src / "skip.log").exists()
+    # the restored file is a copy, editing it leaves the snapshot intact
+    assert os.stat(src / "a.txt").st_ino != os.stat(root / "s1" / "tree" / "a.txt").st_ino
+    assert restore_snapshot(str(root / "s1"), str(src), ["*.log"])["unchanged"] == 2
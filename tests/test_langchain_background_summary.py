@@ -0,0 +1,111 @@
+import os
+import sys
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ucagent.abackend.langchain.middleware import (
+    BackgroundSummarizer,
+    MessageStatistic,
+    TrimAndSummaryMiddleware,
+)
+
+
+class _FakeModel:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def invoke(self, messages):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.calls.append(messages)
+        return AIMessage(content=f"summary-{len(self.calls)}")
+
+
+def _history(count):
+    messages = [SystemMessage(content="role", id="sys")]
+    for i in range(count):
+        messages.append(HumanMessage(content=f"question {i}", id=f"h{i}"))
+        messages.append(AIMessage(content=f"answer {i}", id=f"a{i}"))
+    return messages
+
+
+def _middleware(model, **kwargs):
+    return TrimAndSummaryMiddleware(
+        msg_stat=MessageStatistic(),
+        max_summary_tokens=128,
+        max_keep_msgs=20,
+        max_tokens=100000,
+        tail_keep_msgs=4,
+        model=model,
+        **kwargs,
+    )
+
+
+def test_background_summary_is_swapped_in_without_sync_call():
+    model = _FakeModel()
+    node = _middleware(model, background_summary=True, background_watermark=0.5)
+
+    # 16 messages crosses the watermark (10) but not the trim limit (20)
+    assert node.before_model({"messages": _history(8)}) == {}
+    node.bg_summarizer.jobs.join()
+    assert len(model.calls) == 1
+    assert node.bg_summarizer.covered_id == "a5"
+
+    ret = node.before_model({"messages": _history(11)})
+    assert len(model.calls) == 1
+    kept = ret["messages"][1:]
+    assert kept[0].id == "sys"
+    assert kept[1].content == "summary-1"
+    assert [m.id for m in kept[2:]] == [f"{p}{i}" for i in range(6, 11) for p in "ha"]
+
+
+def test_background_summary_falls_back_to_sync_when_behind():
+    gate = threading.Event()
+    model = _FakeModel()
+    node = _middleware(model, background_summary=True, background_watermark=0.5)
+    node.bg_summarizer.model = _FakeModel(gate=gate)
+
+    node.before_model({"messages": _history(8)})
+    ret = node.before_model({"messages": _history(11)})
+    gate.set()
+    node.bg_summarizer.jobs.join()
+
+    kept = ret["messages"][1:]
+    assert len(model.calls) == 1
+    assert kept[1].content == "summary-1"
+    assert len(kept) == 1 + 1 + 4
+    # the stale background job is dropped after the synchronous trim
+    assert node.bg_summarizer.covered_id is None
+
+
+def test_background_summarizer_queue_is_bounded():
+    gate = threading.Event()
+    summarizer = BackgroundSummarizer(_FakeModel(gate=gate), 128, queue_size=1)
+    msgs = _history(6)[1:]
+    assert summarizer.submit(msgs[:2])
+    # wait for the worker to pick up the first job, then fill the queue
+    for _ in range(500):
+        if summarizer.jobs.qsize() == 0:
+            break
+        threading.Event().wait(0.01)
+    assert summarizer.submit(msgs[2:4])
+    assert not summarizer.submit(msgs[4:6])
+    assert summarizer.next_index(msgs) == 4
+    gate.set()
+    summarizer.jobs.join()
+    assert summarizer.get_statistics()["done"] == 2
+    assert summarizer.get_statistics()["dropped"] == 1
+    assert summarizer.take(msgs) == (summarizer.summary, 4)
+
+
+def test_sync_summary_without_background():
+    model = _FakeModel()
+    node = _middleware(model)
+    assert node.bg_summarizer is None
+    ret = node.before_model({"messages": _history(11)})
+    assert len(model.calls) == 1
+    assert ret["messages"][2].content == "summary-1"
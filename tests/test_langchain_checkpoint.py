@@ -0,0 +1,72 @@
+import os
+import sys
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ucagent.abackend.langchain.checkpoint import PrunedSqliteSaver
+
+
+def _echo_graph(saver):
+    graph = StateGraph(MessagesState)
+    graph.add_node("echo", lambda state: {"messages": [AIMessage(content=f"echo {len(state['messages'])}")]})
+    graph.add_edge(START, "echo")
+    graph.add_edge("echo", END)
+    return graph.compile(checkpointer=saver)
+
+
+def _run(agent, thread_id, count):
+    config = {"configurable": {"thread_id": thread_id}}
+    for i in range(count):
+        agent.invoke({"messages": [HumanMessage(content=f"hello {i}")]}, config)
+    return agent.get_state(config).values["messages"]
+
+
+def _disk_count(saver, thread_id):
+    return saver.conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id=?", (thread_id,)).fetchone()[0]
+
+
+def test_keeps_last_checkpoints_in_memory_and_all_on_disk(tmp_path):
+    saver = PrunedSqliteSaver(str(tmp_path / "ckpt.sqlite"), keep_last=3)
+    messages = _run(_echo_graph(saver), "1", 5)
+    assert len(messages) == 10
+    assert len(saver.storage["1"][""]) == 3
+    assert _disk_count(saver, "1") > 3
+    referenced = {(k, v) for vers in saver._versions[("1", "")].values() for k, v in vers.items()}
+    assert {(k[2], k[3]) for k in saver.blobs} <= referenced
+
+
+def test_resume_thread_from_disk(tmp_path):
+    db_path = str(tmp_path / "ckpt.sqlite")
+    saver = PrunedSqliteSaver(db_path, keep_last=2)
+    _run(_echo_graph(saver), "42", 3)
+    saver.close()
+
+    resumed = PrunedSqliteSaver(db_path, keep_last=2)
+    assert resumed.latest_thread_id() == "42"
+    assert resumed.resume() == "42"
+    messages = _run(_echo_graph(resumed), "42", 1)
+    assert [m.content for m in messages[-2:]] == ["hello 0", "echo 7"]
+    assert len(messages) == 8
+
+
+def test_prune_disk_after_summary(tmp_path):
+    saver = PrunedSqliteSaver(str(tmp_path / "ckpt.sqlite"), keep_last=2)
+    agent = _echo_graph(saver)
+    _run(agent, "7", 3)
+    before = _disk_count(saver, "7")
+    saver.mark_summary(7)
+    _run(agent, "7", 1)
+    assert _disk_count(saver, "7") < before
+    assert saver.conn.execute("SELECT COUNT(*) FROM blobs WHERE thread_id='7'").fetchone()[0] > 0
+    assert _run(agent, "7", 0)[-1].content == "echo 7"
+
+
+def test_clear_drops_previous_threads(tmp_path):
+    saver = PrunedSqliteSaver(str(tmp_path / "ckpt.sqlite"))
+    _run(_echo_graph(saver), "1", 1)
+    saver.clear()
+    assert saver.latest_thread_id() is None
+    assert saver.resume() is None
@@ -0,0 +1,84 @@
+import os
+import sys
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ucagent.abackend.langchain.agent import UCAgentLangChainBackend
+from ucagent.abackend.langchain.middleware import MessageStatistic
+
+
+class _Agent:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.modes = None
+
+    def stream(self, instructions, config, stream_mode=None):
+        self.modes = stream_mode
+        for mode, data in self.chunks:
+            if mode in stream_mode:
+                yield mode, data
+
+
+class _VAgent:
+    def __init__(self):
+        self.echo = []
+        self.test_tools = []
+        self._tool__call_error = []
+
+    def is_break(self):
+        return False
+
+    def message_echo(self, msg, end="\n"):
+        self.echo.append(msg)
+
+
+def _backend(chunks):
+    backend = UCAgentLangChainBackend.__new__(UCAgentLangChainBackend)
+    backend.vagent = _VAgent()
+    backend.agent = _Agent(chunks)
+    backend.message_statistic = MessageStatistic()
+    backend._stat_msg_count_ai = 0
+    backend._stat_msg_count_tool = 0
+    backend._stat_msg_count_system = 0
+    return backend
+
+
+def _chunks():
+    call = {"name": "ReadTextFile", "args": {"path": "a.txt"}, "id": "c1", "type": "tool_call"}
+    return [
+        ("updates", {"TrimAndSummaryMiddleware.before_model": None}),
+        ("messages", (AIMessageChunk(content="thinking"), {})),
+        ("updates", {"model": {"messages": [AIMessage(content="", tool_calls=[call], id="ai-1")]}}),
+        ("updates", {"tools": {"messages": [
+            ToolMessage(content="one", tool_call_id="c1", id="t-1"),
+            ToolMessage(content="two", tool_call_id="c2", id="t-2"),
+        ]}}),
+        ("updates", {"TrimAndSummaryMiddleware.before_model": {
+            "messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), HumanMessage(content="summary", id="s")]}}),
+        ("updates", {"model": {"messages": [AIMessage(content="done", id="ai-2")]}}),
+    ]
+
+
+def test_do_work_values_consumes_updates_only():
+    backend = _backend(_chunks())
+    backend.do_work_values({"messages": [HumanMessage(content="start")]}, {})
+    assert backend.agent.modes == ["updates"]
+    assert backend._stat_msg_count_ai == 2
+    assert backend._stat_msg_count_tool == 2
+    echoed = "\n".join(backend.vagent.echo)
+    assert "start" in echoed and "one" in echoed and "two" in echoed and "done" in echoed
+    assert "summary" not in echoed
+
+
+def test_do_work_stream_consumes_updates_and_messages():
+    backend = _backend(_chunks())
+    backend.do_work_stream({"messages": [HumanMessage(content="start")]}, {})
+    assert backend.agent.modes == ["updates", "messages"]
+    assert backend._stat_msg_count_ai == 2
+    assert backend._stat_msg_count_tool == 2
+    assert "thinking" in backend.vagent.echo
+    assert "summary" not in "\n".join(str(e) for e in backend.vagent.echo)
@@ -22,6 +22,7 @@ if loaded_ucagent is not None and not loaded_ucagent_path.startswith(repo_packag
 
 import ucagent.stage.vmanager as vmanager
 from ucagent.stage.vstage import VerifyStage
+import ucagent.stage.vstage as vstage_module
 from ucagent.stage.vmanager import ArgsDoCheck, StageManager, ToolDoCheck, ToolDoComplete
 from ucagent.tools.uctool import to_fastmcp
 from ucagent.util import functions as fc
@@ -698,3 +699,64 @@ def test_verify_stage_marks_only_current_checker_as_run():
     assert check_info[0]["last_msg"] == {"error": "current"}
     assert check_info[1]["checked_in_last_run"] is False
     assert check_info[1]["count_check"] == 1
+
+
+def test_stage_outcome_is_cached_until_workspace_changes(tmp_path, monkeypatch):
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "a.md").write_text("a", encoding="utf-8")
+    stage = _make_verify_stage("stage", {})
+    stage.workspace = str(tmp_path)
+    stage.output_files = ["out/*.md"]
+    stage.meta_data = {}
+    stage.is_complete = True
+    stage._cached_stage_outcome = None
+    stage._cached_stage_outcome_key = None
+    calls = []
+    find_files = vstage_module.find_files_by_pattern
+    monkeypatch.setattr(vstage_module, "find_files_by_pattern",
+                        lambda *args, **kwargs: calls.append(args) or find_files(*args, **kwargs))
+
+    first = stage.get_stage_outcome()
+    assert first["output_files"] == {"out/*.md": ["out/a.md"]}
+    assert stage.get_stage_outcome() is first
+    assert len(calls) == 1
+
+    (tmp_path / "out" / "b.md").write_text("b", encoding="utf-8")
+    if not vstage_module.index_generation(str(tmp_path))[1]:
+        os.utime(tmp_path / "out", ns=(1, 1))
+    second = stage.get_stage_outcome()
+    assert sorted(second["output_files"]["out/*.md"]) == ["out/a.md", "out/b.md"]
+    assert len(calls) == 2
+
+
+def test_batched_stage_commits_are_included_in_the_completion_commit(tmp_path):
+    from ucagent.util import diff_ops
+
+    (tmp_path / "out").mkdir()
+    stage = _make_verify_stage("stage", {})
+    stage.workspace = str(tmp_path)
+    stage.prefix = ""
+    stage.meta_data = {}
+    stage._cached_stage_outcome = None
+    stage.hist_src_dir = "out"
+    stage.hist_sav_dir = str(tmp_path / "history")
+    stage.hist_tgt_dir = os.path.join(stage.hist_sav_dir, "out")
+    stage.hist_ign_list = []
+    stage.cfg = SimpleNamespace(get_value=lambda key, default=None: key == "hist_commit_batch" or default)
+    manager = SimpleNamespace(get_current_stage=lambda: stage)
+    stage.hist_init()
+    initial = diff_ops.get_latest_commit_hash(stage.hist_sav_dir)
+
+    (tmp_path / "out" / "a.txt").write_text("a", encoding="utf-8")
+    assert "committed when the stage completes" in StageManager.tool_stage_commit(manager, "add a")
+    (tmp_path / "out" / "b.txt").write_text("b", encoding="utf-8")
+    StageManager.tool_stage_commit(manager, "add b")
+    assert diff_ops.get_latest_commit_hash(stage.hist_sav_dir) == initial
+
+    stage.hist_commit(msg="Stage completed.")
+    commit = diff_ops.get_latest_commit_hash(stage.hist_sav_dir)
+    assert sorted(diff_ops.get_commit_changed_files(stage.hist_sav_dir, commit)) == ["out/a.txt", "out/b.txt"]
+    message = diff_ops.get_commit_message(stage.hist_sav_dir, commit)
+    assert "Includes deferred commits" in message and "add a" in message and "add b" in message
+    # one commit on top of the initial one
+    assert diff_ops.get_git_log(stage.hist_sav_dir, max_count=10).count("\ncommit ") == 1
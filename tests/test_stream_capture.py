@@ -0,0 +1,61 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ucagent.tools.testops import RunPyTest
+from ucagent.util.stream_capture import BoundedOutputCapture
+
+
+def test_bounded_capture_keeps_head_and_tail_and_spills_everything(tmp_path):
+    spill = str(tmp_path / "out.log")
+    seen = []
+    capture = BoundedOutputCapture(100, spill, on_line=seen.append)
+    for i in range(1000):
+        capture.write(f"line {i:04d}\n")
+    capture.close()
+
+    text = capture.getvalue()
+    assert text.startswith("line 0000\nline 0001\n")
+    assert text.endswith("line 0999\n")
+    assert f"full output in {spill}" in text
+    assert len(text) < 300
+    assert len(seen) == 1000
+    with open(spill, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1000
+    assert BoundedOutputCapture.from_file(spill, 100).getvalue() == text
+
+
+def test_run_pytest_bounds_output_and_stops_early(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "test_noisy.py").write_text(
+        "import time\n\ndef test_noisy():\n"
+        "    for i in range(200000):\n        print('noise', i)\n"
+        "    print('MARKER', flush=True)\n    time.sleep(30)\n", encoding="utf-8")
+    tool = RunPyTest(output_limit=4096)
+
+    all_pass, out, err = tool.do(str(tmp_path / "test_noisy.py"), "", True, True, 60,
+                                 stop_when=lambda name, line: "marker seen" if line.startswith("MARKER") else None)
+
+    assert not all_pass
+    assert "Test run stopped early: marker seen" in err
+    assert len(out) < 8192 and "MARKER" in out and "lines omitted" in out
+    spill = [p for p in os.listdir(tmp_path / ".ucagent" / "pytest_output") if p.endswith(".stdout.log")]
+    assert len(spill) == 1
+
+
+def test_run_pytest_stops_after_max_failures(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "test_fails.py").write_text(
+        "import time\n\n"
+        "def test_a():\n    assert False\n\n"
+        "def test_b():\n    assert False\n\n"
+        "def test_c():\n    time.sleep(30)\n", encoding="utf-8")
+    monkeypatch.setenv("UCA_PYTEST_MAX_FAILURES", "2")
+    tool = RunPyTest()
+
+    all_pass, out, err = tool.do(str(tmp_path / "test_fails.py"), "", False, True, 60)
+
+    assert not all_pass
+    assert out == ""
+    assert "reached max_failures (2)" in err and "incomplete" in err
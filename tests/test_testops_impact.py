@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ucagent.tools.testops import RunUnityChipTest
+from ucagent.util.functions import merge_toffee_report_subset, toffee_test_id
+from ucagent.util.test_tools import ucagent_lib_path
+
+
+def _run_pytest(workspace, impact_dir, select):
+    env = dict(os.environ,
+               PYTHONPATH=ucagent_lib_path(),
+               PYTEST_PLUGINS="ucagent.util.pytest_impact",
+               UCA_TEST_IMPACT_DIR=impact_dir,
+               UCA_TEST_IMPACT_MAP=os.path.join(impact_dir, "impact_map.json"),
+               UCA_TEST_IMPACT_ROOT=str(workspace),
+               UCA_TEST_IMPACT_SELECT="1" if select else "0")
+    subprocess.run([sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "tests"],
+                   cwd=workspace, env=env, capture_output=True, text=True)
+    with open(os.path.join(impact_dir, "run_0.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_impact_plugin_records_fixture_files_and_reruns_changed_tests(tmp_path):
+    tests = tmp_path / "tests"
+    tests.mkdir()
+    (tests / "Adder_api.py").write_text(
+        "import pytest\n\n@pytest.fixture\ndef env():\n    return 1\n", encoding="utf-8")
+    (tests / "conftest.py").write_text("from Adder_api import env\n", encoding="utf-8")
+    (tests / "test_a.py").write_text(
+        "def test_a1(env):\n    assert env\n\ndef test_a2():\n    pass\n", encoding="utf-8")
+    (tests / "test_b.py").write_text("def test_b():\n    pass\n", encoding="utf-8")
+    impact_dir = str(tmp_path / "impact")
+
+    run = _run_pytest(tmp_path, impact_dir, select=False)
+    assert run["order"] == ["tests/test_a.py::test_a1", "tests/test_a.py::test_a2", "tests/test_b.py::test_b"]
+    assert run["items"]["tests/test_b.py::test_b"] == ["test_b.py", "test_b"]
+    deps = run["deps"]["tests/test_a.py::test_a1"]
+    assert str(tests / "Adder_api.py") in deps and str(tests / "test_a.py") in deps
+    assert str(tests / "Adder_api.py") not in run["deps"]["tests/test_a.py::test_a2"]
+
+    with open(os.path.join(impact_dir, "impact_map.json"), "w", encoding="utf-8") as f:
+        json.dump({n: {"deps": d} for n, d in run["deps"].items()}, f)
+    time.sleep(0.01)
+    (tests / "Adder_api.py").write_text(
+        "import pytest\n\n@pytest.fixture\ndef env():\n    return 2\n", encoding="utf-8")
+
+    run = _run_pytest(tmp_path, impact_dir, select=True)
+    assert run["rerun"] == ["tests/test_a.py::test_a1"]
+    assert list(run["deps"]) == ["tests/test_a.py::test_a1"]
+
+
+def _bin_group(hints, funcs):
+    return {"groups": [{"name": "G", "points": [{
+        "name": "P",
+        "functions": {k: v for k, v in funcs.items()},
+        "bins": [{"name": k, "hints": v} for k, v in hints.items()],
+    }]}]}
+
+
+def test_merge_report_subset_replaces_rerun_results():
+    ta, tb = "/w/tests/test_a.py:1-2::test_a", "/w/tests/test_b.py:1-2::test_b"
+    cached = {
+        "test_abstract_info": {ta: "PASSED", tb: "FAILED"},
+        "tests": [{"id": "a-old"}, {"id": "b-old"}],
+        "coverages": {"functional": _bin_group({"x": 1, "y": 3}, {"x": [ta], "y": [tb]})},
+    }
+    current = {
+        "test_abstract_info": {tb: "PASSED"},
+        "tests": [{"id": "b-new"}],
+        "coverages": {"functional": _bin_group({"x": 0, "y": 0}, {"y": [tb]})},
+    }
+    order = [("test_a.py", "test_a"), ("test_b.py", "test_b")]
+
+    merged = merge_toffee_report_subset(cached, current, order, [("test_b.py", "test_b")])
+
+    assert merged["test_abstract_info"] == {ta: "PASSED", tb: "PASSED"}
+    assert merged["tests"] == [{"id": "a-old"}, {"id": "b-new"}]
+    point = merged["coverages"]["functional"]["groups"][0]["points"][0]
+    # x is kept from test_a, y is no longer hit by the re-run test_b
+    assert {b["name"]: b["hints"] for b in point["bins"]} == {"x": 1, "y": 0}
+    assert point["functions"] == {"x": [ta], "y": [tb]}
+    assert toffee_test_id(ta) == ("test_a.py", "test_a")
+
+
+def test_partial_rerun_notes_unattributed_coverage(tmp_path):
+    ta, tb = "/w/tests/test_a.py:1-2::test_a", "/w/tests/test_b.py:1-2::test_b"
+    tool = RunUnityChipTest(workspace=str(tmp_path))
+    impact_dir = tool.get_impact_dir("tests", "", {})
+    os.makedirs(impact_dir, exist_ok=True)
+    with open(os.path.join(impact_dir, "run_0.json"), "w", encoding="utf-8") as f:
+        json.dump({"order": ["a", "b"], "items": {"a": ["test_a.py", "test_a"], "b": ["test_b.py", "test_b"]},
+                   "rerun": ["b"], "deps": {}}, f)
+    with open(os.path.join(impact_dir, "toffee_report.json"), "w", encoding="utf-8") as f:
+        json.dump({"test_abstract_info": {ta: "PASSED", tb: "PASSED"}, "tests": [{}, {}]}, f)
+    os.makedirs(tool.result_dir)
+    with open(os.path.join(tool.result_dir, "toffee_report.json"), "w", encoding="utf-8") as f:
+        json.dump({"test_abstract_info": {tb: "FAILED"}, "tests": [{}]}, f)
+
+    note = tool.update_impact_cache(impact_dir, True)
+
+    assert note.startswith("Re-ran 1 of 2 tests") and "Line coverage" in note
+    with open(os.path.join(tool.result_dir, "toffee_report.json"), encoding="utf-8") as f:
+        assert json.load(f)["test_abstract_info"] == {ta: "PASSED", tb: "FAILED"}
+
+
+def test_impact_dir_depends_on_run_arguments(tmp_path):
+    tool = RunUnityChipTest(workspace=str(tmp_path))
+    a = tool.get_impact_dir("tests", "", {})
+    assert a == tool.get_impact_dir("tests", "", {})
+    assert a != tool.get_impact_dir("tests", "-k smoke", {})
+    assert a != tool.get_impact_dir("tests", "", {"UC_IS_IMP_TEMPLATE": "true"})
+    env = tool.get_impact_env(a, True, {})
+    assert env["PYTEST_PLUGINS"].endswith("ucagent.util.pytest_impact")
+    assert env["UCA_TEST_IMPACT_SELECT"] == "1"
@@ -0,0 +1,127 @@
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ucagent.tools.testops import RunPyTest, RunUnityChipTest
+from ucagent.util.functions import (
+    load_toffee_report,
+    merge_line_coverage_reports,
+    merge_toffee_reports,
+)
+from ucagent.util.test_tools import ucagent_lib_path
+
+
+def _group(hints_a, hints_b, func):
+    return {
+        "name": "G",
+        "hinted": False,
+        "point_num_total": 1,
+        "point_num_hints": 0,
+        "bin_num_total": 2,
+        "bin_num_hints": 0,
+        "points": [{
+            "name": "P",
+            "hinted": False,
+            "functions": {"a": [func], "b": [func]},
+            "bins": [{"name": "a", "hints": hints_a}, {"name": "b", "hints": hints_b}],
+        }],
+    }
+
+
+def _report(tests, group):
+    return {
+        "test_abstract_info": {k: v for k, v in tests},
+        "tests": [{"phases": []} for _ in tests],
+        "coverages": {"functional": {"groups": [group], "group_num_total": 1, "group_num_hints": 0}},
+    }
+
+
+def _line_coverage(lines):
+    return {
+        "overview": {"total": {"line": 20}, "miss": {"line": 0}},
+        "uncovered": {"data": {"/w/Adder/Adder.v": {
+            "total": {"line": 20},
+            "modules": {"Adder": {"miss": {"line": 0}, "line": lines}},
+        }}},
+    }
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def test_shard_plugin_splits_items_in_collection_order(tmp_path):
+    (tmp_path / "test_many.py").write_text(
+        "".join(f"def test_{i}():\n    pass\n" for i in range(5)), encoding="utf-8")
+    env = dict(os.environ, PYTEST_PLUGINS="ucagent.util.pytest_shard",
+               PYTHONPATH=ucagent_lib_path())
+    ran = []
+    for index in range(2):
+        env["UCA_PYTEST_SHARD"] = f"{index}/2"
+        out = subprocess.run([sys.executable, "-m", "pytest", "-v", "-p", "no:cacheprovider", "test_many.py"],
+                             cwd=tmp_path, env=env, capture_output=True, text=True).stdout
+        ran.append([line.split("::")[1].split()[0] for line in out.splitlines() if "PASSED" in line])
+    assert ran == [["test_0", "test_1"], ["test_2", "test_3", "test_4"]]
+
+
+def test_merge_toffee_reports_matches_serial_structure(tmp_path):
+    a, b = str(tmp_path / "a.json"), str(tmp_path / "b.json")
+    _write(a, _report([("t.py:1-2::test_a", "PASSED")], _group(1, 0, "t.py:1-2::test_a")))
+    _write(b, _report([("t.py:4-5::test_b", "FAILED")], _group(0, 2, "t.py:4-5::test_b")))
+
+    merged = merge_toffee_reports([a, b])
+
+    assert list(merged["test_abstract_info"]) == ["t.py:1-2::test_a", "t.py:4-5::test_b"]
+    assert len(merged["tests"]) == 2
+    func = merged["coverages"]["functional"]
+    point = func["groups"][0]["points"][0]
+    assert [b["hints"] for b in point["bins"]] == [1, 2]
+    assert point["functions"]["a"] == ["t.py:1-2::test_a", "t.py:4-5::test_b"]
+    assert point["hinted"] and func["groups"][0]["hinted"]
+    assert (func["bin_num_total"], func["bin_num_hints"]) == (2, 2)
+    assert (func["point_num_total"], func["point_num_hints"]) == (1, 1)
+    assert (func["group_num_total"], func["group_num_hints"]) == (1, 1)
+
+
+def test_merge_line_coverage_keeps_lines_missed_by_every_shard(tmp_path):
+    a, b = str(tmp_path / "a.json"), str(tmp_path / "b.json")
+    _write(a, _line_coverage(["3-6", "10-10"]))
+    _write(b, _line_coverage(["5-12"]))
+
+    merged = merge_line_coverage_reports([a, b])
+
+    module = merged["uncovered"]["data"]["/w/Adder/Adder.v"]["modules"]["Adder"]
+    assert module["line"] == ["5-6", "10-10"]
+    assert merged["overview"]["miss"]["line"] == 3
+
+
+def test_run_unity_chip_test_merges_shard_reports(tmp_path, monkeypatch):
+    (tmp_path / "tests").mkdir()
+    tool = RunUnityChipTest(workspace=str(tmp_path)).set_shards(2)
+    started = []
+
+    def fake_do(self, test_dir_or_file, pytest_ex_args, return_stdout, return_stderr, timeout,
+                pytest_ex_env, run_manager, python_paths=None, pytest_args=None, pre_call=None, stop_when=None):
+        index = int(pytest_ex_env["UCA_PYTEST_SHARD"].split("/")[0])
+        started.append(pytest_ex_env["PYTEST_PLUGINS"])
+        tc = f"tests/test_x.py:{index + 1}-{index + 1}::test_{index}"
+        _write(os.path.join(pytest_args["report-dir"], "toffee_report.json"),
+               _report([(tc, "PASSED")], _group(1 - index, index, tc)))
+        return True, f"out{index}", ""
+
+    monkeypatch.setattr(RunPyTest, "do", fake_do)
+    all_pass, out, _ = tool.do_sharded(str(tmp_path / "tests"), "", True, True, 10, {}, None)
+
+    assert all_pass
+    assert started == ["ucagent.util.pytest_shard"] * 2
+    assert "[Shard 0]:\nout0" in out and "[Shard 1]:\nout1" in out
+    report = load_toffee_report(os.path.join(tool.result_dir, "toffee_report.json"),
+                                str(tmp_path), True, True)
+    assert report["tests"]["total"] == 2
+    assert report["failed_funct_point"] == 0
+    assert "failed_check_point_list" not in report
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from ucagent.tools.testops import RunPyTest, set_warm_pool_config, warm_pool_summary
+from ucagent.util.pytest_pool import WarmPytestPool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="warm pool needs fork")
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Adder").mkdir()
+    (tmp_path / "Adder" / "__init__.py").write_text("VERSION = 1\n", encoding="utf-8")
+    tests = tmp_path / "tests"
+    tests.mkdir()
+    (tests / "Adder_api.py").write_text("from Adder import VERSION\n", encoding="utf-8")
+    (tests / "test_adder.py").write_text(
+        "import sys\nfrom Adder_api import VERSION\n\n"
+        "def test_version():\n    print('VERSION', VERSION, 'preloaded' if 'Adder' in sys.modules else '')\n",
+        encoding="utf-8")
+    yield tmp_path
+    WarmPytestPool.shutdown_all()
+
+
+def test_warm_pool_reuses_zygote_and_recycles_on_dut_change(workspace, monkeypatch):
+    monkeypatch.setenv("UCA_PYTEST_WARM_POOL", "1")
+    tool = RunPyTest()
+    tests = str(workspace / "tests")
+    python_paths = [str(workspace), tests]
+    assert tool.get_warm_preload(tests, python_paths) == ["pytest", "toffee", "toffee_test", "Adder"]
+
+    for _ in range(2):
+        all_pass, out, _ = tool.do(tests, "", True, True, 30, python_paths=python_paths)
+        assert all_pass and "VERSION 1 preloaded" in out and "1 passed" in out
+    stats = list(tool.get_warm_pool_statistics().values())[0]
+    assert (stats["cold_starts"], stats["warm_runs"]) == (1, 2)
+
+    time.sleep(0.01)
+    (workspace / "Adder" / "__init__.py").write_text("VERSION = 22\n", encoding="utf-8")
+    all_pass, out, _ = tool.do(tests, "", True, True, 30, python_paths=python_paths)
+    assert all_pass and "VERSION 22 preloaded" in out
+    stats = list(tool.get_warm_pool_statistics().values())[0]
+    assert (stats["cold_starts"], stats["warm_runs"]) == (2, 3)
+
+
+def test_warm_pool_kills_worker_on_timeout(workspace, monkeypatch):
+    monkeypatch.setenv("UCA_PYTEST_WARM_POOL", "1")
+    (workspace / "tests" / "test_adder.py").write_text(
+        "import time\n\ndef test_slow():\n    time.sleep(30)\n", encoding="utf-8")
+    workers = []
+    all_pass, _, err = RunPyTest().do(str(workspace / "tests"), "", True, True, 2,
+                                      python_paths=[str(workspace)], pre_call=workers.append)
+    assert not all_pass and "timed out" in err
+    assert len(workers) == 1 and workers[0].returncode is None
+
+
+def test_warm_pool_setting_enables_pool_and_reports_statistics(workspace, monkeypatch):
+    monkeypatch.delenv("UCA_PYTEST_WARM_POOL", raising=False)
+    tests = str(workspace / "tests")
+    assert warm_pool_summary() == ""
+    set_warm_pool_config(True, ["json"])
+    try:
+        tool = RunPyTest()
+        assert tool.use_warm_pool()
+        assert tool.get_warm_preload(tests, [str(workspace), tests]) == \
+            ["pytest", "toffee", "toffee_test", "json", "Adder"]
+        all_pass, out, _ = tool.do(tests, "", True, True, 30, python_paths=[str(workspace), tests])
+        assert all_pass and "preloaded" in out
+        assert warm_pool_summary().startswith("cold starts 1 (avg ")
+    finally:
+        set_warm_pool_config()
+    assert not RunPyTest().use_warm_pool()
@@ -3,11 +3,12 @@
 from ucagent.abackend.base import AgentBackendBase
 from ucagent.util.log import info, warning, error
 from .middleware import MessageStatistic, TokenSpeedCallbackHandler, TrimAndSummaryMiddleware
+from .checkpoint import PrunedSqliteSaver
 from langchain.agents import create_agent
 from langgraph.checkpoint.memory import MemorySaver
 from ucagent.util.models import get_chat_model
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
-from ucagent.util.functions import dump_as_json, get_ai_message_tool_call
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage, RemoveMessage, BaseMessage
+from ucagent.util.functions import dump_as_json, get_ai_message_tool_call, get_abs_path_cwd_ucagent
 
 
 class UCAgentLangChainBackend(AgentBackendBase):
@@ -29,7 +30,10 @@ class UCAgentLangChainBackend(AgentBackendBase):
                 max_keep_msgs=vagent.max_keep_msgs,
                 max_tokens=vagent.max_token,
                 tail_keep_msgs=vagent.tail_keep_msgs,
-                model=self.sumary_model
+                model=self.sumary_model,
+                background_summary=getattr(vagent, "background_summary", False),
+                background_watermark=getattr(vagent, "background_watermark", 0.7),
+                background_queue_size=getattr(vagent, "background_queue_size", 2),
             )
         else:
             raise ValueError(f"Unsupported context_management_strategy: {vagent.context_management_strategy}")
@@ -41,13 +45,36 @@ class UCAgentLangChainBackend(AgentBackendBase):
         set_debug(debug)
 
     def init(self):
+        self.checkpointer = self.new_checkpointer()
         self.agent = create_agent(
             model=self.model,
             tools=self.vagent.test_tools,
-            checkpointer=MemorySaver(),
+            checkpointer=self.checkpointer,
             middleware=[self.message_manage_node]
         )
 
+    def new_checkpointer(self):
+        checkpointer = self.kwargs.get("checkpointer", "memory")
+        if checkpointer == "memory":
+            return MemorySaver()
+        if checkpointer != "sqlite":
+            raise ValueError(f"Unsupported checkpointer: {checkpointer}")
+        db_path = get_abs_path_cwd_ucagent(self.vagent.workspace, "checkpoints.sqlite")
+        saver = PrunedSqliteSaver(db_path, keep_last=self.kwargs.get("checkpoint_keep_last", 8))
+        thread_id = saver.resume() if self.kwargs.get("checkpoint_resume", False) is True else None
+        if thread_id is not None:
+            info(f"Resume conversation thread {thread_id} from checkpoints '{db_path}'.")
+            self.vagent.thread_id = int(thread_id) if thread_id.isdigit() else thread_id
+        else:
+            saver.clear()
+        self.message_manage_node.on_context_trimmed = lambda: saver.mark_summary(self.vagent.thread_id)
+        return saver
+
+    def exit(self):
+        close = getattr(getattr(self, "checkpointer", None), "close", None)
+        if close is not None:
+            close()
+
     def reset_chat(self, force=False):
         self.message_manage_node.reset_chat(force)
 
@@ -92,10 +119,45 @@ class UCAgentLangChainBackend(AgentBackendBase):
             return str_text
         return str(msg)
 
+    @staticmethod
+    def _iter_delta_messages(data):
+        """Yield the new messages of a LangGraph `updates` chunk.
+
+        Updates that rewrite the context (trim/summary/reset, which carry
+        RemoveMessage) hold no new output and are skipped.
+        """
+        if not isinstance(data, dict):
+            return
+        for update in data.values():
+            updates = update if isinstance(update, (list, tuple)) else [update]
+            for upd in updates:
+                if not isinstance(upd, dict):
+                    continue
+                messages = upd.get("messages")
+                if messages is None:
+                    continue
+                if not isinstance(messages, (list, tuple)):
+                    messages = [messages]
+                if any(isinstance(m, RemoveMessage) for m in messages):
+                    continue
+                yield from (m for m in messages if isinstance(m, BaseMessage))
+
+    @staticmethod
+    def _last_input_message(instructions):
+        messages = instructions.get("messages") if isinstance(instructions, dict) else None
+        if messages and isinstance(messages[-1], BaseMessage):
+            return messages[-1]
+        return None
+
     def do_work_stream(self, instructions, config):
-        last_msg_index = None
         fist_ai_message = True
-        for v, data in self.agent.stream(instructions, config, stream_mode=["values", "messages"]):
+        input_msg = self._last_input_message(instructions)
+        if input_msg is not None:
+            self.vagent.message_echo("\n"+input_msg.pretty_repr())
+        for v, data in self.agent.stream(instructions, config, stream_mode=["updates", "messages"]):
+            if input_msg is not None:
+                self.state_record_mesg(input_msg)
+                input_msg = None
             if self.vagent.is_break():
                     break
             if v == "messages":
@@ -104,12 +166,8 @@ class UCAgentLangChainBackend(AgentBackendBase):
                     self.vagent.message_echo("\n\n================================== AI Message ==================================")
                 msg = data[0]
                 self.vagent.message_echo(self._process_msg_content(msg.content), end="")
-            else:
-                index = len(data["messages"])
-                if index == last_msg_index:
-                    continue
-                last_msg_index = index
-                msg = data["messages"][-1]
+                continue
+            for msg in self._iter_delta_messages(data):
                 self.state_record_mesg(msg)
                 if isinstance(msg, AIMessage):
                     self.vagent.message_echo(get_ai_message_tool_call(msg))
@@ -118,18 +176,19 @@ class UCAgentLangChainBackend(AgentBackendBase):
                 self.vagent.message_echo("\n"+msg.pretty_repr())
 
     def do_work_values(self, instructions, config):
-        last_msg_index = None
-        for _, step in self.agent.stream(instructions, config, stream_mode=["values"]):
+        input_msg = self._last_input_message(instructions)
+        if input_msg is not None:
+            self.vagent.message_echo(input_msg.pretty_repr())
+        for _, data in self.agent.stream(instructions, config, stream_mode=["updates"]):
+            if input_msg is not None:
+                self.state_record_mesg(input_msg)
+                input_msg = None
             if self.vagent.is_break():
                 break
-            index = len(step["messages"])
-            if index == last_msg_index:
-                continue
-            last_msg_index = index
-            msg = step["messages"][-1]
-            self.check_tool_call_error(msg)
-            self.state_record_mesg(msg)
-            self.vagent.message_echo(msg.pretty_repr())
+            for msg in self._iter_delta_messages(data):
+                self.check_tool_call_error(msg)
+                self.state_record_mesg(msg)
+                self.vagent.message_echo(msg.pretty_repr())
 
     def check_tool_call_error(self, msg):
         if not isinstance(msg, AIMessage):
@@ -219,6 +278,9 @@ class UCAgentLangChainBackend(AgentBackendBase):
             "configurable": {"thread_id": f"{self.vagent.thread_id}"},
             "recursion_limit": self.config.get_value("recursion_limit", 100000),
         }
+        tool_call_concurrency = self.config.get_value("tool_call_concurrency", 8)
+        if isinstance(tool_call_concurrency, int) and tool_call_concurrency > 0:
+            work_config["max_concurrency"] = tool_call_concurrency
         if self.vagent.langfuse_enable:
             work_config["callbacks"] = [self.vagent.langfuse_handler]
             work_config["metadata"] = {
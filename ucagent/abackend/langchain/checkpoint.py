@@ -0,0 +1,202 @@
+"""Disk-backed, pruned checkpointer for the LangChain backend."""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from ucagent.util.log import info, warning
+
+
+class PrunedSqliteSaver(InMemorySaver):
+    """Checkpointer that persists to SQLite and keeps only the last K checkpoints in memory.
+
+    Every checkpoint, its channel blobs and pending writes are appended to the
+    database as they are produced. The in-memory storage of `InMemorySaver` is
+    trimmed to the newest `keep_last` checkpoints per thread/namespace, and the
+    database drops everything older than the last context summary marked by
+    `mark_summary`, since the summarized state is self-contained.
+    `resume` loads a thread back from disk so an interrupted agent can continue it.
+    """
+
+    def __init__(self, db_path: str, keep_last: int = 8, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = os.path.abspath(db_path)
+        self.keep_last = max(1, int(keep_last))
+        self._lock = threading.RLock()
+        self._versions: Dict[tuple, Dict[str, Dict[str, Any]]] = {}
+        self._summary_marks: Dict[str, str] = {}
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT,
+                parent_id TEXT, ckpt_type TEXT, ckpt BLOB, meta_type TEXT, meta BLOB,
+                versions TEXT,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT, checkpoint_ns TEXT, channel TEXT, version TEXT,
+                type TEXT, data BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version));
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT,
+                task_id TEXT, idx INTEGER, channel TEXT, type TEXT, data BLOB, task_path TEXT,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));
+            """
+        )
+        self.conn.commit()
+
+    def resume(self, thread_id=None) -> Optional[str]:
+        """Load the newest `keep_last` checkpoints of a thread (default: the latest one) from disk."""
+        thread_id = str(thread_id) if thread_id is not None else self.latest_thread_id()
+        if thread_id is None:
+            return None
+        with self._lock:
+            count = 0
+            for (checkpoint_ns,) in self.conn.execute(
+                    "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id=?", (thread_id,)).fetchall():
+                rows = self.conn.execute(
+                    "SELECT checkpoint_id, parent_id, ckpt_type, ckpt, meta_type, meta, versions FROM checkpoints "
+                    "WHERE thread_id=? AND checkpoint_ns=? ORDER BY checkpoint_id DESC LIMIT ?",
+                    (thread_id, checkpoint_ns, self.keep_last)).fetchall()
+                for checkpoint_id, parent_id, ckpt_type, ckpt, meta_type, meta, versions in rows:
+                    self.storage[thread_id][checkpoint_ns][checkpoint_id] = ((ckpt_type, ckpt), (meta_type, meta), parent_id)
+                    versions = json.loads(versions)
+                    self._versions.setdefault((thread_id, checkpoint_ns), {})[checkpoint_id] = versions
+                    for channel, version in versions.items():
+                        blob = self.conn.execute(
+                            "SELECT type, data FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                            (thread_id, checkpoint_ns, channel, json.dumps(version))).fetchone()
+                        if blob is not None:
+                            self.blobs[(thread_id, checkpoint_ns, channel, version)] = (blob[0], blob[1])
+                    for task_id, idx, channel, type_, data, task_path in self.conn.execute(
+                            "SELECT task_id, idx, channel, type, data, task_path FROM writes "
+                            "WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                            (thread_id, checkpoint_ns, checkpoint_id)).fetchall():
+                        self.writes[(thread_id, checkpoint_ns, checkpoint_id)][(task_id, idx)] = (task_id, channel, (type_, data), task_path)
+                    count += 1
+        if count == 0:
+            return None
+        info(f"Loaded {count} checkpoints of thread {thread_id} from '{self.db_path}'.")
+        return thread_id
+
+    def clear(self):
+        """Drop every checkpoint stored on disk and in memory."""
+        with self._lock:
+            for thread_id in list(self.storage.keys()):
+                super().delete_thread(thread_id)
+            self._versions.clear()
+            self._summary_marks.clear()
+            for table in ("checkpoints", "blobs", "writes"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.commit()
+        return self
+
+    def latest_thread_id(self) -> Optional[str]:
+        """Return the thread id of the most recent checkpoint on disk."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT thread_id FROM checkpoints WHERE checkpoint_ns='' ORDER BY checkpoint_id DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def mark_summary(self, thread_id):
+        """Mark the latest checkpoint of a thread as superseded by a summarized context.
+
+        Once a newer checkpoint is stored, it and all older ones are pruned from disk.
+        """
+        thread_id = str(thread_id)
+        with self._lock:
+            checkpoints = self.storage.get(thread_id, {}).get("", {})
+            if checkpoints:
+                self._summary_marks[thread_id] = max(checkpoints.keys())
+        return self
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._lock:
+            ret = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = ret["configurable"]["thread_id"]
+            checkpoint_ns = ret["configurable"]["checkpoint_ns"]
+            checkpoint_id = ret["configurable"]["checkpoint_id"]
+            versions = dict(checkpoint["channel_versions"])
+            self._versions.setdefault((thread_id, checkpoint_ns), {})[checkpoint_id] = versions
+            ckpt, meta, parent_id = self.storage[thread_id][checkpoint_ns][checkpoint_id]
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                    [(thread_id, checkpoint_ns, k, json.dumps(v), *self.blobs[(thread_id, checkpoint_ns, k, v)])
+                     for k, v in new_versions.items()])
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint_id, parent_id, *ckpt, *meta, json.dumps(versions)))
+                mark = self._summary_marks.get(thread_id)
+                if checkpoint_ns == "" and mark is not None and checkpoint_id > mark:
+                    self._prune_disk(thread_id, mark)
+                    del self._summary_marks[thread_id]
+                self.conn.commit()
+            except sqlite3.Error as e:
+                warning(f"Failed to persist checkpoint {checkpoint_id}: {e}")
+            self._prune_memory(thread_id, checkpoint_ns)
+            return ret
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+            checkpoint_id = config["configurable"]["checkpoint_id"]
+            stored = self.writes.get((thread_id, checkpoint_ns, checkpoint_id), {})
+            rows = [(thread_id, checkpoint_ns, checkpoint_id, tid, idx, channel, *value, path)
+                    for (tid, idx), (_, channel, value, path) in stored.items() if tid == task_id]
+            try:
+                self.conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self.conn.commit()
+            except sqlite3.Error as e:
+                warning(f"Failed to persist writes of checkpoint {checkpoint_id}: {e}")
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            super().delete_thread(thread_id)
+            for key in [k for k in self._versions if k[0] == thread_id]:
+                del self._versions[key]
+            self._summary_marks.pop(thread_id, None)
+            for table in ("checkpoints", "blobs", "writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id=?", (thread_id,))
+            self.conn.commit()
+
+    def _prune_memory(self, thread_id, checkpoint_ns):
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_last:
+            return
+        versions = self._versions.setdefault((thread_id, checkpoint_ns), {})
+        for checkpoint_id in sorted(checkpoints.keys())[:-self.keep_last]:
+            del checkpoints[checkpoint_id]
+            versions.pop(checkpoint_id, None)
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        referenced = {(k, v) for vers in versions.values() for k, v in vers.items()}
+        for key in [k for k in self.blobs if k[0] == thread_id and k[1] == checkpoint_ns and (k[2], k[3]) not in referenced]:
+            del self.blobs[key]
+
+    def _prune_disk(self, thread_id, mark):
+        self.conn.execute("DELETE FROM checkpoints WHERE thread_id=? AND checkpoint_ns='' AND checkpoint_id<=?", (thread_id, mark))
+        self.conn.execute("DELETE FROM writes WHERE thread_id=? AND checkpoint_ns='' AND checkpoint_id<=?", (thread_id, mark))
+        referenced = set()
+        for (versions,) in self.conn.execute("SELECT versions FROM checkpoints WHERE thread_id=? AND checkpoint_ns=''", (thread_id,)):
+            referenced.update((k, json.dumps(v)) for k, v in json.loads(versions).items())
+        stale = [(thread_id, channel, version) for channel, version in self.conn.execute(
+            "SELECT channel, version FROM blobs WHERE thread_id=? AND checkpoint_ns=''", (thread_id,))
+            if (channel, version) not in referenced]
+        self.conn.executemany("DELETE FROM blobs WHERE thread_id=? AND checkpoint_ns='' AND channel=? AND version=?", stale)
+        info(f"Pruned checkpoints of thread {thread_id} older than the last summary.")
+
+    def close(self):
+        with self._lock:
+            try:
+                self.conn.close()
+            except sqlite3.Error as e:
+                warning(f"Failed to close checkpoint database: {e}")
@@ -30,6 +30,8 @@ from langchain_core.callbacks import BaseCallbackHandler
 from langmem.short_term import SummarizationNode
 from typing import Any, Dict, Union
 from pydantic import BaseModel
+import queue
+import threading
 import time
 
 class MessageStatistic:
@@ -270,6 +272,116 @@ def retain_skill_read_messages_as_human(messages, use_skill=False, skill_list=No
                 pending_tool_call_ids.remove(tool_call_id)
     return rebuilt_messages
 
+class BackgroundSummarizer:
+    """Keep a rolling summary of aged message segments in a worker thread.
+
+    Segments are queued (bounded) in conversation order; each finished job folds
+    the segment into the previous rolling summary and records the id of the last
+    message it covers, so trimming can swap the summary in without an LLM call.
+    """
+
+    def __init__(self, model, max_summary_tokens: int, queue_size: int = 2):
+        self.model = model
+        self.max_summary_tokens = max_summary_tokens
+        self.jobs = queue.Queue(maxsize=max(1, queue_size))
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.summary = []
+        self.covered_id = None
+        self.submitted_id = None
+        self.count_done = 0
+        self.count_failed = 0
+        self.count_dropped = 0
+        self._worker = None
+
+    def reset(self, summary=None):
+        """Drop queued/in-flight work and restart rolling from the given summary."""
+        with self.lock:
+            self.generation += 1
+            self.summary = list(summary or [])
+            self.covered_id = None
+            self.submitted_id = None
+        return self
+
+    def next_index(self, messages) -> int:
+        """Index of the first message in `messages` not yet submitted."""
+        with self.lock:
+            submitted_id = self.submitted_id
+        if submitted_id is None:
+            return 0
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == submitted_id:
+                return i + 1
+        return -1
+
+    def submit(self, segment) -> bool:
+        """Queue a segment for summarization, False if the queue is full."""
+        if not segment:
+            return False
+        with self.lock:
+            try:
+                self.jobs.put_nowait((self.generation, segment))
+            except queue.Full:
+                self.count_dropped += 1
+                return False
+            self.submitted_id = segment[-1].id
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="ucagent-summarizer", daemon=True)
+                self._worker.start()
+        return True
+
+    def take(self, messages):
+        """Return (summary, cutoff) if a finished summary covers messages[:cutoff]."""
+        with self.lock:
+            if not self.summary or self.covered_id is None:
+                return None
+            summary, covered_id = list(self.summary), self.covered_id
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == covered_id:
+                return summary, i + 1
+        return None
+
+    def _run(self):
+        while True:
+            generation, segment = self.jobs.get()
+            try:
+                self._summarize(generation, segment)
+            finally:
+                self.jobs.task_done()
+
+    def _summarize(self, generation, segment):
+        with self.lock:
+            if generation != self.generation:
+                return
+            base = list(self.summary)
+        try:
+            summary = summarize_messages(base + segment, self.max_summary_tokens, self.model)
+        except Exception as e:
+            warning(f"Background summarization failed: {e}")
+            with self.lock:
+                self.count_failed += 1
+                if generation == self.generation:
+                    # queued segments would leave a gap, resubmit from the covered point
+                    self.generation += 1
+                    self.submitted_id = self.covered_id
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.summary = [summary]
+            self.covered_id = segment[-1].id
+            self.count_done += 1
+
+    def get_statistics(self) -> dict:
+        with self.lock:
+            return {
+                "done": self.count_done,
+                "failed": self.count_failed,
+                "dropped": self.count_dropped,
+                "queued": self.jobs.qsize(),
+            }
+
+
 class SummarizationAndFixToolCall(SummarizationNode):
     """Custom summarization node that fixes tool call arguments."""
 
@@ -306,7 +418,9 @@ class SummarizationAndFixToolCall(SummarizationNode):
 class TrimAndSummaryMiddleware(AgentMiddleware):
     """trim and summarize older context for managing conversation context."""
     def __init__(self, msg_stat: MessageStatistic, max_summary_tokens: int,
-                 max_keep_msgs: int, max_tokens: int, tail_keep_msgs: int, model):
+                 max_keep_msgs: int, max_tokens: int, tail_keep_msgs: int, model,
+                 background_summary: bool = False, background_watermark: float = 0.7,
+                 background_queue_size: int = 2):
         self.msg_stat = msg_stat
         self.max_summary_tokens = max_summary_tokens
         self.max_keep_msgs = max_keep_msgs
@@ -319,6 +433,11 @@ class TrimAndSummaryMiddleware(AgentMiddleware):
         self._is_reset_force = False
         self.system_message = None
         self.vagent = None
+        self.on_context_trimmed = None
+        self.background_watermark = background_watermark
+        self.bg_summarizer = None
+        if background_summary:
+            self.bg_summarizer = BackgroundSummarizer(model, max_summary_tokens, background_queue_size)
 
     def reset_chat(self, force=False):
         self._is_reset_chat = True
@@ -372,6 +491,7 @@ class TrimAndSummaryMiddleware(AgentMiddleware):
                 else:
                     warning(f"No HumanMessage found in tails messages (size={len(tail_msgs)}), cannot force reset to human message, falling back to normal behavior.")
             ret["messages"] = [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + role_info + tail_msgs
+            self._reset_background_summary()
             warning(f"Chat reset [force={self._is_reset_force}], all messages ({len(llm_input_msgs) - len(tail_msgs)}) messages are removed except system and the most recent {len(tail_msgs)} messages.")
             self._is_reset_chat = False
             self._is_reset_force = False
@@ -383,6 +503,9 @@ class TrimAndSummaryMiddleware(AgentMiddleware):
                     warning(f"Messages token size {current_token_size} exceed max tokens {self.max_tokens}.")
                 # get tail start index
                 tail_msgs_start_index = SummarizationMiddleware._find_safe_cutoff_point(llm_input_msgs, max(0, len(llm_input_msgs) - self.tail_keep_msgs))
+                precomputed = self._take_background_summary(role_info, llm_input_msgs)
+                if precomputed is not None:
+                    tail_msgs_start_index = precomputed[1]
                 if tail_msgs_start_index > 0:
                     tail_msgs = llm_input_msgs[tail_msgs_start_index:]
                     use_skill = bool(getattr(getattr(self.vagent, "cfg", None), "skill", None) and self.vagent.cfg.skill.use_skill)
@@ -396,21 +519,73 @@ class TrimAndSummaryMiddleware(AgentMiddleware):
                         use_skill=use_skill,
                         skill_list=skill_list,
                     )
-                    self.summary_data = [summarize_messages(self.summary_data + llm_input_msgs[:tail_msgs_start_index], self.max_summary_tokens, self.model)]
+                    if precomputed is not None:
+                        info(f"Using background summary covering {tail_msgs_start_index} messages.")
+                        self.summary_data = precomputed[0]
+                    else:
+                        if self.bg_summarizer is not None:
+                            warning("Background summary is not ready, summarizing synchronously.")
+                        self.summary_data = [summarize_messages(self.summary_data + llm_input_msgs[:tail_msgs_start_index], self.max_summary_tokens, self.model)]
+                    self._reset_background_summary()
                     warning(f"Trimmed { tail_msgs_start_index-1 } messages, kept {len(tail_msgs)} tail messages and 1 summary message.")
                     ret["messages"] = [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + role_info + rebuilt_skill_msgs + self.summary_data + tail_msgs
                 else:
                     tail_msgs = llm_input_msgs
+            else:
+                self._feed_background_summary(llm_input_msgs, current_token_size)
         else:
             warning(f"Using arbitrary provided summary.")
             assert isinstance(self.arbit_summary_data, list), f"Need List, but find: {type(self.arbit_summary_data)}: {self.arbit_summary_data}"
             self.summary_data = self.arbit_summary_data
             self.arbit_summary_data = None
+            self._reset_background_summary()
             ret["messages"] = [RemoveMessage(id=msg.id) for msg in tail_msgs]
             tail_msgs = []
         self.msg_stat.update_message(role_info + rebuilt_skill_msgs + self.summary_data + tail_msgs)
+        if ret.get("messages") and self.on_context_trimmed is not None:
+            self.on_context_trimmed()
         return ret
     
+    def _reset_background_summary(self):
+        if self.bg_summarizer is not None:
+            self.bg_summarizer.reset(self.summary_data)
+
+    def _feed_background_summary(self, llm_input_msgs, current_token_size):
+        """Queue messages aged past the tail once history crosses the watermark."""
+        if self.bg_summarizer is None:
+            return
+        if len(llm_input_msgs) < self.max_keep_msgs * self.background_watermark and \
+           current_token_size < self.max_tokens * self.background_watermark:
+            return
+        start_index = self.bg_summarizer.next_index(llm_input_msgs)
+        if start_index < 0:
+            self._reset_background_summary()
+            start_index = 0
+        cutoff = SummarizationMiddleware._find_safe_cutoff_point(llm_input_msgs, max(0, len(llm_input_msgs) - self.tail_keep_msgs))
+        summary_ids = {msg.id for msg in self.summary_data}
+        segment = [msg for msg in llm_input_msgs[start_index:cutoff] if msg.id not in summary_ids]
+        if len(segment) < max(1, self.tail_keep_msgs):
+            return
+        if not self.bg_summarizer.submit(segment):
+            warning(f"Background summarizer is behind, skip queuing {len(segment)} messages.")
+
+    def _take_background_summary(self, role_info, llm_input_msgs):
+        """Return (summary, cutoff) if the rolling summary brings the context under limits."""
+        if self.bg_summarizer is None:
+            return None
+        ret = self.bg_summarizer.take(llm_input_msgs)
+        if ret is None:
+            return None
+        summary, cutoff = ret
+        if cutoff <= 0:
+            return None
+        remaining = llm_input_msgs[cutoff:]
+        if len(remaining) > self.max_keep_msgs:
+            return None
+        if count_tokens_approximately(role_info + summary + remaining) > self.max_tokens:
+            return None
+        return ret
+
     def set_arbit_summary(self, summary_text):
         """Set chat summary"""
         if isinstance(summary_text, str):
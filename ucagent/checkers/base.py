@@ -12,6 +12,10 @@ from ucagent.util.log import info, error, warning
 import time
 import traceback
 import hashlib
+import copy
+import stat
+import threading
+from collections import OrderedDict
 
 
 CB_KEY_SET_WORKSPACE = "after_set_workspace"
@@ -19,6 +23,39 @@ CB_KEY_ON_INIT = "after_on_init"
 CB_KEY_SET_STAGE_MANAGER = "after_set_stage_manager"
 CB_KEY_SET_STAGE = "after_set_stage"
 
+CHECK_CACHE_IGNORE_KWARGS = ("timeout",)
+
+_file_digests = {}
+_file_digests_lock = threading.Lock()
+
+
+def file_content_digest(path: str):
+    """Content digest of a file, None if it does not exist.
+
+    Digests are reused while the file's (mtime_ns, size, inode) is unchanged,
+    so unchanged inputs are not read again.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return f"mode:{stat.S_IFMT(st.st_mode)}"
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    real_path = os.path.realpath(path)
+    with _file_digests_lock:
+        cached = _file_digests.get(real_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+    with _file_digests_lock:
+        _file_digests[real_path] = (signature, digest)
+    return digest
+
 
 def format_stage_args_examples(tool_name, stage_args):
     """Return canonical object and JSON-string tool-call examples."""
@@ -43,6 +80,11 @@ class Checker:
     _is_init = False
     _need_human_check = False
     _cb_list = {}
+    _check_cache = None
+    _check_cache_size = 8
+    _check_cache_config = ""
+    _check_cache_stats = None
+    _check_extra_inputs = None
 
     def add_cb(self, key, cb):
         assert key in [CB_KEY_SET_WORKSPACE,
@@ -100,8 +142,92 @@ class Checker:
                 setattr(self, k, v)
             else:
                 warning(f"Unknown attribute '{k}' for checker '{self.__class__.__name__}', ignoring it.")
+        if self._check_cache is not None:
+            self.set_check_cache(True, self._check_cache_size)
         return self.get_attr()
 
+    def get_check_inputs(self, *a, **kw):
+        """
+        Workspace files the result of `do_check` depends on, as paths or patterns
+        (see `find_files_by_pattern`). Files only known while checking can be added
+        with `add_check_input`.
+        Return None (default) if the result is not a deterministic function of files,
+        which disables the check cache for this checker.
+        """
+        return None
+
+    def get_check_state(self):
+        """
+        Checker state set by `do_check` besides its result (e.g. counts or values published
+        to the stage manager), stored with a cached result. None (default) if there is none.
+        """
+        return None
+
+    def restore_check_state(self, state):
+        """Replay the state from `get_check_state` when a check is answered from the cache."""
+        pass
+
+    def add_check_input(self, path: str):
+        """Record a workspace file read by the running `do_check` as a check cache input."""
+        if self._check_extra_inputs is not None:
+            self._check_extra_inputs[path] = file_content_digest(self._check_input_path(path))
+
+    def _check_input_path(self, path: str) -> str:
+        return path if os.path.isabs(path) else self.get_path(path)
+
+    def set_check_cache(self, enable: bool, max_entries: int = 8):
+        """
+        Enable or disable the check result cache. Results are keyed by a content hash
+        of `get_check_inputs()`, the check arguments and the checker config.
+        """
+        self._check_cache = OrderedDict() if enable else None
+        self._check_cache_size = max(1, int(max_entries))
+        self._check_cache_stats = {"hits": 0, "misses": 0}
+        self._check_cache_config = json.dumps(self.get_attr(), sort_keys=True, default=str)
+        return self
+
+    def clear_check_cache(self):
+        """Drop all cached check results, the next check runs in full."""
+        if self._check_cache is not None:
+            self._check_cache.clear()
+
+    def get_check_cache_statistics(self):
+        if self._check_cache is None:
+            return None
+        return {**self._check_cache_stats, "entries": len(self._check_cache)}
+
+    def _get_check_cache_key(self, a, w):
+        if self._check_cache is None or self.workspace is None:
+            return None
+        patterns = self.get_check_inputs(*a, **w)
+        if patterns is None:
+            return None
+        inputs = []
+        for pattern in (patterns if isinstance(patterns, (list, tuple)) else [patterns]):
+            if not pattern:
+                continue
+            if os.path.exists(self._check_input_path(pattern)) or not any(c in pattern for c in "*?[]()|+^$"):
+                files = [pattern]
+            else:
+                files = sorted(fc.find_files_by_pattern(self.workspace, pattern, ignore_warn=True))
+            inputs.append([pattern, [[f, file_content_digest(self._check_input_path(f))] for f in files]])
+        key = [self.__class__.__name__, self._check_cache_config, repr(a),
+               sorted((k, repr(v)) for k, v in w.items() if k not in CHECK_CACHE_IGNORE_KWARGS), inputs]
+        return hashlib.sha256(json.dumps(key, default=str).encode("utf-8")).hexdigest()
+
+    def _get_cached_check(self, key):
+        entry = self._check_cache.get(key) if key is not None else None
+        if entry is None:
+            return None
+        extra_inputs, result, state = entry
+        if any(file_content_digest(self._check_input_path(p)) != d for p, d in extra_inputs.items()):
+            self._check_cache.pop(key, None)
+            return None
+        self._check_cache.move_to_end(key)
+        if state is not None:
+            self.restore_check_state(copy.deepcopy(state))
+        return copy.deepcopy(result)
+
     def filter_vstage_description(self, stage_description):
         return fill_template(stage_description, self.get_template_data())
 
@@ -208,12 +334,27 @@ class Checker:
             return False, f"Previous check is still running, please wait, ({deta_time}) seconds remain." + \
                           f"You can use tool 'KillCheck' to stop the previous check," + \
                           f"and use tool 'StdCheck' to get the stdout and stderr data"
+        try:
+            cache_key = self._get_check_cache_key(a, w)
+        except Exception as e:
+            warning(f"Check cache disabled for this call of {self.__class__.__name__}: {e}")
+            cache_key = None
+        cached = self._get_cached_check(cache_key)
+        if cached is not None:
+            self._check_cache_stats["hits"] += 1
+            p, m = cached
+            info(f"Check cache hit for {self.__class__.__name__}, inputs unchanged since the previous check")
+            return p, self.append_msg(m, "hit, inputs unchanged since the previous check", "check_cache")
+        if cache_key is not None:
+            self._check_cache_stats["misses"] += 1
+            self._check_extra_inputs = {}
         self.is_in_check = True
         self.time_start = time.time()
         try:
             p, m = self.do_check(*a, **w)
         except Exception as e:
             self.is_in_check = False
+            self._check_extra_inputs = None
             estack = traceback.format_exc()
             info(estack)
             return False, f"Error occurred during check: {e} \n" + estack
@@ -227,7 +368,15 @@ class Checker:
             if f_msg:
                 self.append_msg(m, f_msg, "Fail_Message")
         self.set_check_process(None, None) # Reset the process and timeout after check
-        return p, self.rec_render(m, self)
+        m = self.rec_render(m, self)
+        if cache_key is not None:
+            self._check_cache[cache_key] = (self._check_extra_inputs or {}, copy.deepcopy((p, m)),
+                                            copy.deepcopy(self.get_check_state()))
+            self._check_cache.move_to_end(cache_key)
+            while len(self._check_cache) > self._check_cache_size:
+                self._check_cache.popitem(last=False)
+        self._check_extra_inputs = None
+        return p, m
 
     def append_msg(self, data, value, key=""):
         if isinstance(data, str):
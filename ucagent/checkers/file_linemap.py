@@ -1,12 +1,16 @@
 #coding=utf-8
 """File line mapping checkers for UCAgent."""
 
+import copy
 import hashlib
 import os
 import re
+import threading
+import time
 import traceback
 from collections import OrderedDict
-from ucagent.checkers.base import Checker, UnityChipBatchTask
+from concurrent.futures import ThreadPoolExecutor
+from ucagent.checkers.base import Checker, UnityChipBatchTask, file_content_digest
 import ucagent.util.functions as fc
 from ucagent.util.log import info, warning
 
@@ -372,6 +376,10 @@ class FileLineMapChecker(Checker):
         self.must_has_no_miss_match = must_has_no_miss_match
         self.set_human_check_needed(need_human_check)
 
+    def get_check_inputs(self, *a, **kw):
+        return [self.source_file, self.func_check_file,
+                self.map_file or _mapping_file_for_source(self.source_file, self.map_location, self.map_suffix)]
+
     def do_check(self, **kw) -> tuple[bool, object]:
         """Check file for unmapped lines."""
         success, ck_list_or_msg = get_func_check_marks(
@@ -405,7 +413,8 @@ class UnityChipBatchCheckerFileLineMap(Checker):
                  map_location="line_map", map_suffix="_line_func_map.txt",
                  batch_size=1, max_block_lines=100, max_example_lines=20,
                  ignore_blank_lines=True, must_has_no_miss_match=True,
-                 need_human_check=False, data_key=None, **kw):
+                 need_human_check=False, data_key=None, max_workers=None,
+                 result_cache_size=4096, **kw):
         self.name = name
         self.file_list = file_list if isinstance(file_list, list) else [file_list]
         self.func_check_file = func_check_file
@@ -421,6 +430,13 @@ class UnityChipBatchCheckerFileLineMap(Checker):
             raise ValueError("batch_size must be a positive integer")
         if self.max_block_lines < 1:
             raise ValueError("max_block_lines must be a positive integer")
+        # Source files are read and validated concurrently, one file per worker.
+        self.max_workers = max(1, int(max_workers or min(8, os.cpu_count() or 1)))
+        # Line-block results keyed by the content digests they depend on.
+        self.result_cache_size = max(0, int(result_cache_size))
+        self._block_results = OrderedDict()
+        self._block_results_lock = threading.Lock()
+        self._file_timing = {}
         # Checker keeps callback storage on the class for historical reasons;
         # isolate this batcher's lifecycle callbacks per instance.
         self._cb_list = {}
@@ -452,31 +468,60 @@ class UnityChipBatchCheckerFileLineMap(Checker):
             seen_mapping_files[map_file] = source_file
         return files
 
+    def _run_per_file(self, func, items):
+        """Run func on each item in a bounded worker pool, keeping the input order."""
+        if self.max_workers < 2 or len(items) < 2:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)),
+                                thread_name_prefix="ucagent-linemap") as pool:
+            return list(pool.map(func, items))
+
+    def _add_file_timing(self, source_file, start):
+        cost = (time.monotonic() - start) * 1000
+        with self._block_results_lock:
+            self._file_timing[source_file] = self._file_timing.get(source_file, 0.0) + cost
+
+    def get_file_timing(self):
+        """Return the time (ms) spent per source file by the last check, slowest first."""
+        with self._block_results_lock:
+            return OrderedDict(sorted(self._file_timing.items(), key=lambda x: -x[1]))
+
+    def _get_file_line_blocks(self, source_file):
+        """Return (line-block tasks, error) of one source file."""
+        start = time.monotonic()
+        source_path = os.path.abspath(self.workspace + os.path.sep + source_file)
+        try:
+            with open(source_path, "r", encoding="utf-8") as source_handle:
+                source_lines = source_handle.readlines()
+        except Exception as exc:
+            return [], f"Cannot read source file '{source_file}': {exc}"
+        finally:
+            self._add_file_timing(source_file, start)
+        source_digest = hashlib.sha256(
+            "".join(source_lines).encode("utf-8")
+        ).hexdigest()
+        blocks = []
+        for start_line in range(1, len(source_lines) + 1, self.max_block_lines):
+            end_line = min(start_line + self.max_block_lines - 1, len(source_lines))
+            if self.ignore_blank_lines and all(
+                not source_lines[line_num - 1].strip()
+                for line_num in range(start_line, end_line + 1)
+            ):
+                continue
+            blocks.append(
+                f"{source_file}:{start_line}-{end_line}"
+                f"{_TASK_DIGEST_SEPARATOR}{source_digest}"
+            )
+        return blocks, None
+
     def _get_all_line_blocks(self):
         blocks = []
         self._source_files = self._get_all_source_files()
-        for source_file in self._source_files:
-            source_path = os.path.abspath(self.workspace + os.path.sep + source_file)
-            try:
-                with open(source_path, "r", encoding="utf-8") as source_handle:
-                    source_lines = source_handle.readlines()
-            except Exception as exc:
-                self._task_errors.append(f"Cannot read source file '{source_file}': {exc}")
+        for file_blocks, error in self._run_per_file(self._get_file_line_blocks, self._source_files):
+            if error:
+                self._task_errors.append(error)
                 continue
-            source_digest = hashlib.sha256(
-                "".join(source_lines).encode("utf-8")
-            ).hexdigest()
-            for start_line in range(1, len(source_lines) + 1, self.max_block_lines):
-                end_line = min(start_line + self.max_block_lines - 1, len(source_lines))
-                if self.ignore_blank_lines and all(
-                    not source_lines[line_num - 1].strip()
-                    for line_num in range(start_line, end_line + 1)
-                ):
-                    continue
-                blocks.append(
-                    f"{source_file}:{start_line}-{end_line}"
-                    f"{_TASK_DIGEST_SEPARATOR}{source_digest}"
-                )
+            blocks.extend(file_blocks)
         return blocks
 
     @staticmethod
@@ -534,7 +579,59 @@ class UnityChipBatchCheckerFileLineMap(Checker):
             for unexpected_file in sorted(unexpected)
         ]
 
-    def _validate_line_block(self, task, ck_list):
+    @staticmethod
+    def _ck_list_digest(ck_list):
+        return hashlib.blake2b("\n".join(ck_list).encode("utf-8"), digest_size=16).hexdigest()
+
+    def _validate_line_block(self, task, ck_list, ck_digest=None):
+        """Validate one line block, reusing the result while the source, mapping and CK list are unchanged."""
+        source_file, _, _ = self._split_line_block(task)
+        map_file = _mapping_file_for_source(source_file, self.map_location, self.map_suffix)
+        key = (
+            task,
+            file_content_digest(os.path.abspath(self.workspace + os.path.sep + source_file)),
+            file_content_digest(os.path.abspath(self.workspace + os.path.sep + map_file)),
+            ck_digest or self._ck_list_digest(ck_list),
+        )
+        with self._block_results_lock:
+            cached = self._block_results.get(key)
+            if cached is not None:
+                self._block_results.move_to_end(key)
+                return cached[0], copy.deepcopy(cached[1])
+        result = self._check_line_block(task, ck_list)
+        if self.result_cache_size > 0:
+            with self._block_results_lock:
+                self._block_results[key] = (result[0], copy.deepcopy(result[1]))
+                while len(self._block_results) > self.result_cache_size:
+                    self._block_results.popitem(last=False)
+        return result
+
+    def _validate_line_blocks(self, tasks, ck_list, stop_on_invalid=False):
+        """Validate line blocks concurrently per source file, return {task: (valid, message)}.
+
+        With stop_on_invalid, a file's remaining blocks are skipped after its first invalid one.
+        """
+        ck_digest = self._ck_list_digest(ck_list)
+        by_file = OrderedDict()
+        for task in tasks:
+            by_file.setdefault(self._split_line_block(task)[0], []).append(task)
+
+        def validate_file(source_file):
+            start = time.monotonic()
+            ret = {}
+            for task in by_file[source_file]:
+                ret[task] = self._validate_line_block(task, ck_list, ck_digest)
+                if stop_on_invalid and not ret[task][0]:
+                    break
+            self._add_file_timing(source_file, start)
+            return ret
+
+        results = {}
+        for file_results in self._run_per_file(validate_file, list(by_file)):
+            results.update(file_results)
+        return results
+
+    def _check_line_block(self, task, ck_list):
         source_file, start_line, end_line = self._split_line_block(task)
         map_file = _mapping_file_for_source(source_file, self.map_location, self.map_suffix)
         return line_map_check_one_file(
@@ -703,6 +800,8 @@ class UnityChipBatchCheckerFileLineMap(Checker):
     def _refresh_batch_state(self, ck_list=None):
         self._task_errors = []
         self._completed_validation_errors = []
+        with self._block_results_lock:
+            self._file_timing = {}
         source_tasks = self._get_all_line_blocks()
         current_by_base = {_line_block_base(task): task for task in source_tasks}
         previous_tasks = list(self.batch_task.gen_task_list)
@@ -720,6 +819,13 @@ class UnityChipBatchCheckerFileLineMap(Checker):
                 f"Recorded completed line block '{task_base}' does not match a current target."
             )
 
+        validated = {}
+        if ck_list is not None:
+            validated = self._validate_line_blocks([
+                task for task in source_tasks
+                if _line_block_digest(previous_by_base.get(_line_block_base(task), "")) == _line_block_digest(task)
+            ], ck_list, stop_on_invalid=True)
+
         completed_tasks = []
         found_incomplete = False
         checkpoint_gap = False
@@ -746,7 +852,8 @@ class UnityChipBatchCheckerFileLineMap(Checker):
                 found_incomplete = True
                 continue
             if ck_list is not None:
-                valid, message = self._validate_line_block(current_task, ck_list)
+                valid, message = validated.get(current_task) or \
+                    self._validate_line_block(current_task, ck_list)
                 if not valid:
                     self._completed_validation_errors.append({
                         "line_block": task_base,
@@ -901,8 +1008,13 @@ class UnityChipBatchCheckerFileLineMap(Checker):
             }
 
         invalid_current = []
+        validated = self._validate_line_blocks(current_batch, ck_list)
+        slowest = list(self.get_file_timing().items())[:3]
+        if slowest:
+            info(f"Line-map check of {len(self._source_files)} file(s), slowest: " +
+                 ", ".join(f"{f} ({ms:.1f} ms)" for f, ms in slowest))
         for task in current_batch:
-            valid, message = self._validate_line_block(task, ck_list)
+            valid, message = validated[task]
             if not valid:
                 invalid_current.append({"line_block": task, "details": message})
                 self._add_validation_diagnostics(diagnostics, task, message)
@@ -258,6 +258,9 @@ class MustHaveCKs(Checker):
         self.funcs_and_checks_doc = funcs_and_checks_doc
         self.leaf_node = leaf_node
 
+    def get_check_inputs(self, *a, **kw):
+        return [*self.source_files, self.funcs_and_checks_doc]
+
     def _load_labels(self, doc_file, return_line_block=False, file_kind="documentation file"):
         try:
             return fc.get_unity_chip_doc_marks(
@@ -335,6 +335,9 @@ class UnityChipCheckerStaticBugFormat(Checker):
         self.static_doc               = static_doc
         self.functions_and_checks_doc = functions_and_checks_doc
 
+    def get_check_inputs(self, *a, **kw):
+        return [self.static_doc, self.functions_and_checks_doc]
+
     def do_check(self, timeout=0, empty_is_ok=False, **kw) -> Tuple[bool, object]:
         """Validate static bug tag format and mandatory LINK-BUG/FILE child tags."""
         real_path = self.get_path(self.static_doc)
@@ -499,6 +502,7 @@ class UnityChipCheckerStaticBugFormat(Checker):
             else:
                 src_filepath = parsed_location["path"]
                 abs_src = self.get_path(src_filepath)
+                self.add_check_input(abs_src)
                 if not os.path.exists(abs_src):
                     errors.append(
                         f"FILE tag '<{file_key}>' in path '{file_path}': "
@@ -72,6 +72,9 @@ class UnityChipCheckerMarkdownFileFormat(Checker):
         self.markdown_file_list = markdown_file_list if isinstance(markdown_file_list, list) else [markdown_file_list]
         self.no_line_break = no_line_break
 
+    def get_check_inputs(self, *a, **kw):
+        return list(self.markdown_file_list)
+
     def do_check(self, timeout=0, **kw) -> Tuple[bool, object]:
         """Check the markdown file format."""
         msg = f"{self.__class__.__name__} check pass."
@@ -109,6 +112,18 @@ class UnityChipCheckerLabelStructure(Checker):
         self.leaf_count = None
         self.set_human_check_needed(need_human_check)
 
+    def get_check_inputs(self, *a, **kw):
+        return [self.doc_file]
+
+    def get_check_state(self):
+        return {"data_val": self.data_val, "leaf_count": self.leaf_count}
+
+    def restore_check_state(self, state):
+        self.data_val = state["data_val"]
+        self.leaf_count = state["leaf_count"]
+        if self.leaf_count is not None and self.data_key and self.need_save_data:
+            self.smanager_set_value(self.data_key, copy.deepcopy(self.data_val))
+
     def do_check(self, timeout=0, **kw) -> Tuple[bool, object]:
         """Check the label structure in the documentation file."""
         self.leaf_count = None
@@ -176,6 +191,9 @@ class UnityChipCheckerLabelStructureRefine(UnityChipCheckerLabelStructure):
         self.refine_result = {}
         self.batch_task = UnityChipBatchTask("CK", self)
 
+    def get_check_inputs(self, *a, **kw):
+        return None  # batch progress is stateful
+
     def on_init(self):
         if not self.batch_task.source_task_list:
             source_task_list = self.smanager_get_value(self.data_key, [])
@@ -662,9 +680,7 @@ class UnityChipCheckerTestMustPass(Checker):
             if test_dir_full_path not in self.get_path(tfile):
                 error_cases.append(f"The test file '{tfile}' is not under the test directory '{self.test_dir}'.")
                 continue
-            test_func_list = fc.get_target_from_file(self.get_path(tfile), f"test*",
-                                                         ex_python_path=self.workspace,
-                                                         dtype="FUNC")
+            test_func_list = fc.discover_functions_in_file(self.get_path(tfile), f"test*")
             for test_func in test_func_list:
                 if test_func.__name__.startswith(self.test_prefix) is False:
                     error_cases.append(f"The '{test_func.__name__}' test function's name must start with '{self.test_prefix}'.")
@@ -735,9 +751,7 @@ class UnityChipCheckerDutApi(Checker):
         """Check the DUT API implementation for correctness."""
         if not os.path.exists(self.get_path(self.target_file)):
             return False, {"error": f"DUT API file '{self.target_file}' does not exist."}
-        func_list = fc.get_target_from_file(self.get_path(self.target_file), f"{self.api_prefix}*",
-                                         ex_python_path=self.workspace,
-                                         dtype="FUNC")
+        func_list = fc.discover_functions_in_file(self.get_path(self.target_file), f"{self.api_prefix}*")
         failed_apis = []
         for func in func_list:
             args = fc.get_func_arg_list(func)
@@ -948,7 +962,7 @@ class BaseUnityChipCheckerTestCase(Checker):
     def __init__(self, doc_func_check=None, test_dir=None, doc_bug_analysis=None, min_tests=1, timeout=15, ignore_tc_prefix="",
                  data_key=None, ret_std_error=True, ret_std_out=True, batch_size=1000, need_human_check=False,
                  args_check=False, args_pattern=None, args_test_func_prefix=None,
-                 args_error_msg=None,
+                 args_error_msg=None, test_impact=None,
                  **extra_kwargs):
         self.doc_func_check = doc_func_check
         self.doc_bug_analysis = doc_bug_analysis
@@ -967,6 +981,10 @@ class BaseUnityChipCheckerTestCase(Checker):
         self.args_pattern = args_pattern
         self.args_test_func_prefix = args_test_func_prefix
         self.args_error_msg = args_error_msg
+        # Re-run only tests impacted by file changes since the last run (env UCA_TEST_IMPACT if not set)
+        if test_impact is None:
+            test_impact = os.environ.get("UCA_TEST_IMPACT", "false").lower() in ("1", "true", "yes")
+        self.test_impact = test_impact
 
     def set_workspace(self, workspace: str):
         """
@@ -1054,10 +1072,13 @@ class BaseUnityChipCheckerTestCase(Checker):
             str_out = ""
         return report, str_out, str_err
 
-    def do_check(self, pytest_args="", timeout=0, is_complete=False, **kw) -> Tuple[bool, str]:
+    def do_check(self, pytest_args="", timeout=0, is_complete=False, force_full=False, **kw) -> Tuple[bool, str]:
         """
         Perform the check for test cases.
 
+        With test impact enabled, only tests affected by changed files are re-run and the
+        others are merged from the last report; `force_full` or `is_complete` runs all tests.
+
         Returns:
             report, str_out, str_err: A tuple where the first element is a boolean indicating success or failure,
         """
@@ -1077,6 +1098,7 @@ class BaseUnityChipCheckerTestCase(Checker):
             self.test_dir,
             pytest_ex_args=pytest_args,
             return_stdout=True, return_stderr=True, return_all_checks=True, timeout=timeout,
+            test_impact=self.test_impact, force_full=force_full or is_complete,
             **kw
         )
         report, str_out, str_err = self._check_test_func_args(report, str_out, str_err)
@@ -1116,6 +1138,15 @@ class UnityChipCheckerTestFree(BaseUnityChipCheckerTestCase):
                         line_coverage_file,
                         self.workspace
                     )
+                    index = fc.get_line_coverage_index(self.get_path(line_coverage_file))
+                    last_index = getattr(self, "_last_line_coverage_index", None)
+                    if last_index is not None and last_index is not index:
+                        diff = index.diff(last_index)
+                        line_coverage_data["changes_since_last_run"] = OrderedDict({
+                            "newly_covered_lines": diff["newly_covered_lines"],
+                            "newly_uncovered_lines": diff["newly_uncovered_lines"],
+                        })
+                    self._last_line_coverage_index = index
                 except Exception as e:
                     line_coverage_data["error"] = f"Failed to parse line coverage file '{line_coverage_file}': {str(e)}."
         ret = OrderedDict({
@@ -1204,6 +1235,7 @@ class UnityChipCheckerTestTemplate(BaseUnityChipCheckerTestCase):
         report, str_out, str_err = super().do_check(
             pytest_ex_env=pytest_ex_env,
             timeout=timeout,
+            is_complete=is_complete,
             **kw,
         )
         test_pass, test_msg = fc.is_run_report_pass(report, str_out, str_err)
@@ -1633,9 +1665,7 @@ class UnityChipCheckerDutApiTest(BaseUnityChipCheckerTestCase):
         if not test_pass:
             return False, test_msg
         report_copy = fc.clean_report_with_keys(report)
-        func_list = fc.get_target_from_file(self.get_path(self.target_file_api), f"{self.api_prefix}*",
-                                         ex_python_path=self.workspace,
-                                         dtype="FUNC")
+        func_list = fc.discover_functions_in_file(self.get_path(self.target_file_api), f"{self.api_prefix}*")
         if len(func_list) == 0:
             return False, {"error": f"No DUT API functions with prefix '{self.api_prefix}' found in '{self.target_file_api}'. "+\
                                      "Note: the api name is case-sensitive."}
@@ -1822,7 +1852,7 @@ class UnityChipCheckerBatchTestsImplementation(BaseUnityChipCheckerTestCase):
             return False, {"error": f"The following test files do not exist: {fc.list_str_abbr(failed_tests_files)}. " + \
                             "Please check your test case names and ensure they are correct."}
         info(f"Checking {len(self.current_test_cases)} test cases: {target_tests}")
-        report, str_out, str_err = super().do_check(pytest_args=target_tests, timeout=timeout, **kw)
+        report, str_out, str_err = super().do_check(pytest_args=target_tests, timeout=timeout, is_complete=is_complete, **kw)
         test_pass, test_msg = fc.is_run_report_pass(report, str_out, str_err)
         if not test_pass:
             return False, test_msg
@@ -123,9 +123,7 @@ class UnityChipCheckerTestMockTestBatch(Checker):
             if test_dir_full_path not in self.get_path(tfile):
                 error_cases.append(f"The test file '{tfile}' is not under the test directory '{self.test_dir}'.")
                 continue
-            test_func_list = fc.get_target_from_file(self.get_path(tfile), f"test*",
-                                                         ex_python_path=self.workspace,
-                                                         dtype="FUNC")
+            test_func_list = fc.discover_functions_in_file(self.get_path(tfile), f"test*")
             for test_func in test_func_list:
                 if test_func.__name__.startswith(self.test_prefix) is False:
                     error_cases.append(f"The '{test_func.__name__}' test function's name must start with '{self.test_prefix}'.")
@@ -9,7 +9,6 @@ import ucagent.util.functions as fc
 from ucagent.checkers.base import UnityChipBatchTask, format_stage_args_examples
 from ucagent.checkers.unity_test import BaseUnityChipCheckerTestCase
 from typing import Tuple
-import inspect
 from ucagent.checkers.toffee_report import check_report
 from ucagent.util.log import warning
 
@@ -51,15 +50,13 @@ class RandomTestCasesChecker(BaseUnityChipCheckerTestCase):
                           f"expected at least {self.mini_file_count} files with pattern: {self.target_test_file}."
         total_test_count = 0
         for tfile in test_files:
-            random_tc_list = fc.get_target_from_file(self.get_path(tfile), self.test_case_name_pattern,
-                                           ex_python_path=self.workspace,
-                                           dtype="FUNC")
+            random_tc_list = fc.discover_functions_in_file(self.get_path(tfile), self.test_case_name_pattern)
             total_test_count += len(random_tc_list)
             for tfunc in random_tc_list:
                 args = fc.get_func_arg_list(tfunc)
                 if len(args) < 1 or args[0] != "env":
                     return False, {"error": f"The '{tfile + ':' + tfunc.__name__}' Env test function's first arg must be 'env', but got ({', '.join(args)})."}
-                func_source = inspect.getsource(tfunc)
+                func_source = fc.get_func_source(tfunc)
                 for mc, v in self.must_func_code_snippet.items():
                     if mc == ".mark_function":
                         snippet_found = fc.has_executable_mark_function_call(func_source)
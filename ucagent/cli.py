@@ -33,6 +33,10 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 os.environ['PYTHONPYCACHEPREFIX'] = os.path.join(os.path.expanduser('~'), ".ucagent/__pycache__")
+# Installed before anything else is imported, so the profile covers the whole start
+if "--profile-startup" in sys.argv[1:]:
+    from ucagent.util.startup_profile import enable_startup_profile
+    enable_startup_profile()
 
 from ucagent.version import __version__
 
@@ -975,6 +979,20 @@ def get_args() -> argparse.Namespace:
         help="Check current default configurations and exit"
     )
 
+    parser.add_argument(
+        "--check-config-cache",
+        action="store_true",
+        default=False,
+        help="Check whether the merged config of this command line is cached and up to date, then exit (1 if not)"
+    )
+
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        default=False,
+        help="Print the import time of the most expensive modules to stderr once the agent is created (or at exit)"
+    )
+
     parser.add_argument(
         "--hook-message",
         type=str,
@@ -1318,6 +1336,13 @@ def run() -> None:
         for tool_str in args.ex_tools:
             ex_tools.extend(get_list_from_str(tool_str))
 
+    if args.check_config_cache:
+        # After all overrides and config defaults are applied: same cache key as VerifyAgent
+        from ucagent.util.config import check_config_cache
+        fresh, reason = check_config_cache(args.config, args.override, os.path.abspath(args.workspace))
+        info(f"Config cache {'is fresh' if fresh else 'is stale'}: {reason}")
+        sys.exit(0 if fresh else 1)
+
     # Create and configure the agent
     agent = VerifyAgent(
         workspace=args.workspace,
@@ -1349,6 +1374,9 @@ def run() -> None:
         exit_on_completion=args.exit_on_completion,
         meta=args.meta,
     )
+    if args.profile_startup:
+        from ucagent.util.startup_profile import report_startup_profile
+        report_startup_profile()
     if args.web_console_session_host is not None or \
        args.web_console_session_port is not None:
         agent.web_console_session_info = {
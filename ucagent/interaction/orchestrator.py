@@ -43,7 +43,7 @@ class ToolRecommendationEngine:
             ],
             ToolCategory.FILE_OPS: [
                 'ReadTextFile', 'EditTextFile', 'DeleteTextLines',
-                'ReplaceStringInFile', 'MoveFile', 'DeleteFile',
+                'ReplaceStringInFile', 'MultiEditFiles', 'MoveFile', 'DeleteFile',
                 'CreateDirectory', 'PathList'
             ],
             ToolCategory.VERIFICATION: [
@@ -61,7 +61,7 @@ class ToolRecommendationEngine:
             ],
             ToolCategory.EXECUTION: [
                 'RunTestCases', 'EditTextFile', 'DeleteTextLines',
-                'ReplaceStringInFile'
+                'ReplaceStringInFile', 'MultiEditFiles'
             ]
         }
     
@@ -1550,10 +1550,14 @@ class PdbCmdApiServer:
                 if is_sub_workspace:
                     return {"status": "ok", "data": []}
                 tools = pdb.api_tool_status()
+                cache_status = pdb.api_tool_cache_status()
                 data = [
                     {"name": name, "call_count": count, "is_hot": is_hot}
                     for name, count, is_hot in tools
                 ]
+                for item in data:
+                    if item["name"] in cache_status:
+                        item["cache"] = cache_status[item["name"]]
                 return {"status": "ok", "data": data}
             except HTTPException:
                 raise
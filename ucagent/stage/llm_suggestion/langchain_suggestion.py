@@ -4,7 +4,6 @@ import asyncio
 import threading
 from typing import Any, Optional
 from ucagent.stage.llm_suggestion.base_suggestion import BaseLLMSuggestion
-from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 from ucagent.stage.vstage import VerifyStage
 from ucagent.util.functions import make_llm_tool_ret
@@ -117,6 +116,7 @@ class OpenAILLMFailSuggestion(BaseLLMSuggestion):
         self.min_fail_count = min_fail_count
         self.summary_trigger_tokens = summary_trigger_tokens
         self.summary_keep_messages = summary_keep_messages
+        from langchain_openai import ChatOpenAI  # imported on first use, it is slow to import
         self.llm = ChatOpenAI(model_name=self.model_name,
                               openai_api_key=self.openai_api_key,
                               openai_api_base=self.openai_api_base,
@@ -232,6 +232,7 @@ class OpenAILLMPassSuggestion(BaseLLMSuggestion):
         self.ignore_labels = ignore_labels
         self.summary_trigger_tokens = summary_trigger_tokens
         self.summary_keep_messages = summary_keep_messages
+        from langchain_openai import ChatOpenAI  # imported on first use, it is slow to import
         self.llm = ChatOpenAI(model_name=self.model_name,
                               openai_api_key=self.openai_api_key,
                               openai_api_base=self.openai_api_base,
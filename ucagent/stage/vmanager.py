@@ -585,6 +585,9 @@ class StageManager(object):
         vstage = self.get_current_stage()
         if vstage is None:
             return "No current stage available."
+        if vstage._cfg_bool("hist_commit_batch", False):
+            vstage.hist_commit(commit_message, defer=True)
+            return f"Stage '{vstage.name}' changes recorded, they are committed when the stage completes."
         vstage.hist_commit(commit_message)
         return f"Stage '{vstage.name}' changes committed."
 
@@ -902,6 +905,19 @@ class StageManager(object):
             return True
         return False
 
+    def invalidate_check_cache(self, index=None):
+        """Drop cached checker results of stage `index` (default: current stage), or of all stages if index is 'all'."""
+        if index == "all":
+            stages = self.stages
+        else:
+            index = self.stage_index if index is None else index
+            if not 0 <= index < len(self.stages):
+                return False
+            stages = [self.stages[index]]
+        for stage in stages:
+            stage.invalidate_check_cache()
+        return True
+
     def check(self, timeout, stage_args=None):
         if not self.stage_index < len(self.stages):
             return OrderedDict({
@@ -2,17 +2,26 @@
 """Verification stage management for UCAgent."""
 
 from ucagent.util.functions import import_class_from_str, find_files_by_pattern
+from ucagent.util.file_index import index_generation
 import ucagent.util.functions as fc
 import ucagent.util.diff_ops as diff_ops
+import ucagent.util.snapshot as snapshot
 from ucagent.util.log import info, warning, message
 from ucagent.util.config import Config
 import ucagent.checkers as checkers
 from collections import OrderedDict
 import copy
+import threading
 import time
 import os
 from typing import Dict, Any
 
+# Per history repository: repo relative paths synced since its last commit (None until the
+# first full commit of this process) and the messages of deferred commits.
+_hist_pending_paths = {}
+_hist_deferred_messages = {}
+_hist_pending_lock = threading.Lock()
+
 def update_dict(d, u):
     d.update(u)
     return d
@@ -76,6 +85,7 @@ class VerifyStage(object):
                 **c.extra_args.as_dict()
             ).set_workspace(workspace).set_stage(self) for c in self._checker
         ]
+        self._init_check_cache()
         if not self.need_human_check:
             for c in self.checker:
                 if c.is_human_check_needed():
@@ -111,6 +121,7 @@ class VerifyStage(object):
         self.vmanager = None
         self.meta_data = {}
         self._cached_stage_outcome = None
+        self._cached_stage_outcome_key = None
         self.last_do_check_info_fail = None
         self.last_do_check_info_pass = None
         self._on_complete_callbacks = []
@@ -126,6 +137,23 @@ class VerifyStage(object):
         if not self.cfg.skill.use_skill and skill_list and force_use_skill:
             raise ValueError(f"Enable the arg(--use-skill) to use skill, or remove the skill_list and force_use_skill specified in stage '{self.name}'.")
 
+    def _init_check_cache(self):
+        try:
+            enable = self.cfg.get_value("vmanager.check_cache.enable", False)
+            max_entries = self.cfg.get_value("vmanager.check_cache.max_entries", 8)
+        except Exception:
+            enable, max_entries = False, 8
+        for c in self.checker:
+            c.set_check_cache(bool(enable), max_entries)
+
+    def invalidate_check_cache(self):
+        """Drop cached checker results of this stage, the next check runs all checkers in full."""
+        for c in self.checker:
+            c.clear_check_cache()
+
+    def get_check_cache_statistics(self):
+        return {c.__class__.__name__: c.get_check_cache_statistics() for c in self.checker}
+
     def meta_set_journal(self, journal):
         self.meta_data['journal'] = copy.deepcopy(journal)
 
@@ -216,15 +244,41 @@ class VerifyStage(object):
         if not os.path.exists(src_path):
             info(f"[{self.__class__.__name__}] History sync: source dir {self.hist_src_dir} does not exist, skip sync.")
             return
-        fc.sync_dir_to(src_path,
-                       self.hist_tgt_dir,
-                       self.hist_ign_list)
+        changed_paths = set()
+        try:
+            fc.sync_dir_to(src_path,
+                           self.hist_tgt_dir,
+                           self.hist_ign_list,
+                           manifest_path=fc.get_abs_path_cwd_ucagent(self.workspace, "history_sync_manifest.json"),
+                           changed_paths=changed_paths)
+        finally:
+            with _hist_pending_lock:
+                pending = _hist_pending_paths.get(self.hist_sav_dir)
+                if pending is not None:
+                    pending.update(os.path.join(self.hist_src_dir, p) for p in changed_paths)
         self._cached_stage_outcome = None
 
-    def hist_commit(self, msg="Auto commit"):
+    def hist_commit(self, msg="Auto commit", defer=False):
+        """
+        Sync the output dir to the history repository and commit it.
+        :param defer: Only sync and keep the message, the next commit includes the changes.
+        """
         self.hist_sync()
-        info(f"[{self.__class__.__name__}] History commit: {msg}")
         stage_commit_str = self.title_short() + ":\n\n" + msg
+        with _hist_pending_lock:
+            deferred = _hist_deferred_messages.setdefault(self.hist_sav_dir, [])
+            if defer:
+                deferred.append(stage_commit_str)
+                info(f"[{self.__class__.__name__}] History commit deferred: {msg}")
+                return
+            if deferred:
+                stage_commit_str += "\n\nIncludes deferred commits:\n\n" + "\n\n".join(deferred)
+            _hist_deferred_messages[self.hist_sav_dir] = []
+            # Only the paths synced since the last commit are staged, the first commit of
+            # the process adds the whole tree (changes of a previous run may be uncommitted)
+            pending = _hist_pending_paths.get(self.hist_sav_dir)
+            _hist_pending_paths[self.hist_sav_dir] = set()
+        info(f"[{self.__class__.__name__}] History commit: {msg}")
         previous_commit = self.meta_data.get('commit', {})
         previous_stage_hash = previous_commit.get("hash")
         previous_has_changes = previous_commit.get("has_changes", True)
@@ -233,7 +287,18 @@ class VerifyStage(object):
             old_hash = diff_ops.get_latest_commit_hash(self.hist_sav_dir)
         except Exception:
             old_hash = None
-        new_hash = diff_ops.git_add_and_commit(self.hist_sav_dir, stage_commit_str)
+        try:
+            if pending is None:
+                new_hash = diff_ops.git_add_and_commit(self.hist_sav_dir, stage_commit_str)
+            else:
+                new_hash = diff_ops.git_commit_paths(self.hist_sav_dir, stage_commit_str, pending)
+        except Exception:
+            with _hist_pending_lock:
+                if pending is None:
+                    _hist_pending_paths.pop(self.hist_sav_dir, None)
+                else:
+                    _hist_pending_paths[self.hist_sav_dir].update(pending)
+            raise
         has_changes = old_hash != new_hash
         if not has_changes and previous_stage_hash == new_hash:
             has_changes = previous_has_changes
@@ -245,6 +310,38 @@ class VerifyStage(object):
         }
         self._cached_stage_outcome = None
 
+    def hist_checkpoint_dir(self):
+        name = "".join(c if c.isalnum() or c in "-_." else "_" for c in self.title_short())
+        return fc.get_abs_path_cwd_ucagent(self.workspace, os.path.join("checkpoints", name))
+
+    def hist_checkpoint(self):
+        """
+        Snapshot the output dir into this stage's checkpoint. Files unchanged since the
+        latest checkpoint are hard links to it, others are reflinked or copied.
+        """
+        src_path = os.path.abspath(os.path.join(self.workspace, self.hist_src_dir))
+        if not os.path.exists(src_path):
+            info(f"[{self.__class__.__name__}] History checkpoint: source dir {self.hist_src_dir} does not exist, skip.")
+            return None
+        checkpoint_dir = self.hist_checkpoint_dir()
+        base_dir = snapshot.latest_snapshot(os.path.dirname(checkpoint_dir))
+        count = snapshot.take_snapshot(src_path, checkpoint_dir, self.hist_ign_list, base_dir=base_dir)
+        info(f"[{self.__class__.__name__}] History checkpoint of {self.title_short()}: "
+             f"{count['linked']} linked, {count['reflinked']} reflinked, {count['copied']} copied in {count['seconds']}s")
+        return count
+
+    def hist_checkpoint_restore(self):
+        """Restore the output dir to this stage's checkpoint, only the differing files are rewritten."""
+        checkpoint_dir = self.hist_checkpoint_dir()
+        if snapshot.load_snapshot_manifest(checkpoint_dir) is None:
+            raise ValueError(f"Stage {self.title_short()} has no checkpoint.")
+        src_path = os.path.abspath(os.path.join(self.workspace, self.hist_src_dir))
+        count = snapshot.restore_snapshot(checkpoint_dir, src_path, self.hist_ign_list)
+        info(f"[{self.__class__.__name__}] History checkpoint restore of {self.title_short()}: "
+             f"{count['restored']} restored, {count['removed']} removed, {count['unchanged']} unchanged in {count['seconds']}s")
+        self._cached_stage_outcome = None
+        return count
+
     def hist_diff(self, target_file=".", show_diff=False,
                   start_line=1, line_count=-1, max_line_limit=500):
         self.hist_sync()
@@ -266,8 +363,9 @@ class VerifyStage(object):
         hash_id = commit_meta.get('hash', None)
         has_stage_changes = self._commit_has_stage_changes(commit_meta, hash_id)
         use_workspace_dry_run = self.is_curent_active() and not self.is_completed() and hash_id is None
-        if self._cached_stage_outcome is not None and use_cache and not use_workspace_dry_run:
-            if hash_id == self._cached_stage_outcome.get("commit_hash", None):
+        cache_key = self._stage_outcome_cache_key(hash_id, has_stage_changes, use_workspace_dry_run)
+        if self._cached_stage_outcome is not None and use_cache and cache_key is not None:
+            if cache_key == self._cached_stage_outcome_key:
                 return self._cached_stage_outcome
         output_files = {p:find_files_by_pattern(self.workspace, p, ignore_warn=True) for p in self.output_files}
         changed_file_statuses = {}
@@ -288,10 +386,27 @@ class VerifyStage(object):
             "commit_message": commit_meta.get('message', None),
             "commit_has_changes": has_stage_changes,
         }
-        if not use_workspace_dry_run:
+        if cache_key is not None:
             self._cached_stage_outcome = outcome
+            self._cached_stage_outcome_key = cache_key
         return outcome
 
+    def _stage_outcome_cache_key(self, hash_id, has_stage_changes, use_workspace_dry_run):
+        """
+        Key the stage outcome is valid for, None if it cannot be cached.
+        The output files depend on the workspace listing, which the workspace file index
+        tracks (inotify or directory mtimes); the dry run of an active stage also reads
+        file contents, which only inotify reports.
+        """
+        generation = index_generation(self.workspace)
+        if generation is None:
+            # without the file index only the committed outcome is cached, as before
+            return None if use_workspace_dry_run else (hash_id, has_stage_changes, None)
+        generation, watches_file_content = generation
+        if use_workspace_dry_run and not watches_file_content:
+            return None
+        return (hash_id, has_stage_changes, use_workspace_dry_run, generation)
+
     def _workspace_output_changed_files(self):
         return list(self._workspace_output_changed_file_statuses().keys())
 
@@ -495,6 +610,15 @@ class VerifyStage(object):
         self.time_end = time.time()
         self.is_complete = True
         self.hist_commit(msg="Stage completed.")
+        try:
+            checkpoint = self._cfg_bool("hist_checkpoint.enable", False)
+        except Exception:
+            checkpoint = False
+        if checkpoint:
+            try:
+                self.hist_checkpoint()
+            except Exception as e:
+                warning(f"[{self.__class__.__name__}] History checkpoint of {self.title_short()} failed: {e}")
         if self.vmanager:
             self.vmanager.agent.backend.on_stage_complete(self)
         self._run_on_complete_callbacks()
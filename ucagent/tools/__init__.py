@@ -1,13 +1,59 @@
 #coding=utf-8
+"""UCAgent tools, the tool modules are imported on first access of their names."""
 
-from .extool import *
-from .fileops import *
-from .human import *
-from .testops import *
-from .uctool import *
-from .memory import *
-from .planning import *
-from .workdiff import *
-from .bash import *
-from .skill import *
-from .waveform import *
+import importlib
+
+# Module -> public names, in the order the modules used to be star-imported
+_TOOL_MODULES = {
+    "extool": ["ReflectionTool", "SimpleReflectionTool", "SqThink"],
+    "fileops": ["ArgCopyFile", "ArgCreateDirectory", "ArgDeleteFile", "ArgDeleteTextLines",
+                "ArgEditTextFile", "ArgFindFiles", "ArgGetFileInfo", "ArgMoveFile",
+                "ArgMultiEditFiles", "ArgPathList", "ArgReadBinFile", "ArgReadTextFile",
+                "ArgReplaceStringInFile", "ArgSearchText", "BaseReadWrite", "CopyFile",
+                "CreateDirectory", "DeleteFile", "DeleteTextLines", "EditTextFile", "FindFiles",
+                "GetFileInfo", "MoveFile", "MultiEditFiles", "PathList", "ReadBinFile",
+                "ReadTextFile", "ReplaceStringInFile", "SearchText", "StrictToolArgs",
+                "ToolResultCache", "cached_read_result", "is_file_writeable"],
+    "human": ["ArgHumanHelp", "HumanHelp"],
+    "testops": ["ArgRunPyTest", "RunPyTest", "RunUnityChipTest"],
+    "uctool": ["EmptyArgs", "RoleInfo", "UCTool", "to_fastmcp"],
+    "memory": ["ArgsMemSearch", "ArgsMemoryGet", "ArgsMemoryPut", "MemoryGet", "MemoryPut",
+               "MemoryTool", "SemanticSearchInGuidDoc", "new_embed"],
+    "planning": ["ArgsCompleteToDoSteps", "ArgsToDoCreate", "ArgsUndoToDoSteps", "CompleteToDoSteps",
+                 "CreateToDo", "GetToDoSummary", "ResetToDo", "ToDoPanel", "ToDoState", "ToDoTool",
+                 "UndoToDoSteps"],
+    "workdiff": ["ArgsWorkCommit", "ArgsWorkDiff", "WorkCommit", "WorkDiff"],
+    "bash": ["RunBashCommand", "RunBashCommandInput"],
+    "skill": ["ListSkill", "RunSkillScript"],
+    "waveform": ["ApplyWaveInfoEvidence", "ArgApplyWaveInfoEvidence", "ArgWaveInfo", "WaveInfo",
+                 "WaveInfoAnalysisArgs", "WaveInfoToolPattern", "WaveSignalGroups", "WaveSignalPattern"],
+}
+_SUBMODULES = set(_TOOL_MODULES) | {"context"}
+_NAME_TO_MODULE = {name: module for module, names in _TOOL_MODULES.items() for name in names}
+
+__all__ = list(_NAME_TO_MODULE)
+
+
+def __getattr__(name):
+    if name.startswith("_"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    module = _NAME_TO_MODULE.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    else:
+        # Other names the star imports used to re-export, the last module wins as before
+        for module in reversed(list(_TOOL_MODULES)):
+            mod = importlib.import_module(f"{__name__}.{module}")
+            if hasattr(mod, name) and name in getattr(mod, "__all__", [name]):
+                value = getattr(mod, name)
+                break
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_NAME_TO_MODULE) | _SUBMODULES)
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 """File operations tools for UCAgent."""
 
-from typing import Annotated, Optional, List, Tuple, Union
+from typing import Annotated, Dict, Optional, List, Tuple, Union
 from ucagent.util.log import info, str_info, str_return, str_error, str_data, warning
 from ucagent.util.functions import is_text_file, get_file_size, bytes_to_human_readable
 from ucagent.util.functions import get_diff, match_pattern_list
+from ucagent.util.file_index import index_walk
+from ucagent.util.line_index import open_text_view
+from ucagent.util.text_index import TrigramIndex
 from .uctool import UCTool
 
 from langchain_core.callbacks import (
@@ -13,12 +16,15 @@ from langchain_core.callbacks import (
 from langchain_core.tools.base import ArgsSchema
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
+import functools
 import hashlib
+import inspect
 import os
 import fnmatch
 import shutil
 import tempfile
-from collections import deque
+import threading
+from collections import OrderedDict, deque
 from pathlib import Path, PurePosixPath
 
 try:
@@ -234,6 +240,159 @@ def is_file_writeable(path: str, un_write_dirs: list=None, write_dirs: list=None
     return True, "Not implemented yet."
 
 
+_callback_recorder = threading.local()
+
+
+def _stat_signature(st) -> Tuple[int, int, int, int]:
+    return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_mode)
+
+
+def _path_fingerprint(real_path: str, mode: str) -> Optional[str]:
+    """Return a digest of the (mtime, size, inode) stats a cached result depends on.
+
+    mode "file" stats only the path itself, "dirs" every directory below it
+    (enough for name-based listings) and "tree" every directory and file below it.
+    """
+    try:
+        st = os.stat(real_path)
+    except OSError:
+        return None
+    digest = hashlib.blake2b(repr(_stat_signature(st)).encode(), digest_size=16)
+    if mode == "file" or not os.path.isdir(real_path):
+        return digest.hexdigest()
+    pending = [real_path]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = sorted(os.scandir(current), key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif mode != "tree":
+                    continue
+                digest.update(f"{entry.path}\0{_stat_signature(entry.stat(follow_symlinks=False))}\n".encode())
+            except OSError:
+                digest.update(f"{entry.path}\0?\n".encode())
+    return digest.hexdigest()
+
+
+class ToolResultCache:
+    """LRU cache of read-only tool results, validated against file stats on every hit.
+
+    Entries are keyed by tool name and normalized arguments. A hit requires the
+    stat fingerprint of the scoped path to be unchanged, so edits made outside the
+    file tools (bash commands, test runs) are detected as well. Write tools report
+    modified paths through `on_file_changed` to drop affected entries early.
+    """
+
+    def __init__(self, workspace: str, max_entries: int = 256):
+        self.workspace = os.path.abspath(workspace)
+        self.max_entries = max(1, int(max_entries))
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _count(self, tool_name: str, key: str):
+        stat = self.stats.setdefault(tool_name, {"hits": 0, "misses": 0, "invalidations": 0})
+        stat[key] += 1
+
+    def get(self, key: tuple, fingerprint: str):
+        """Return the cached (result, callbacks) for key if the fingerprint still matches."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == fingerprint:
+                self.entries.move_to_end(key)
+                self._count(key[0], "hits")
+                return entry[2], entry[3]
+            if entry is not None:
+                del self.entries[key]
+            self._count(key[0], "misses")
+            return None
+
+    def put(self, key: tuple, fingerprint: str, scope: str, result, callbacks: list):
+        with self.lock:
+            self.entries[key] = (scope, fingerprint, result, callbacks)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, path: str) -> int:
+        """Drop entries whose scope contains or is contained in path (relative to the workspace)."""
+        real_path = os.path.realpath(os.path.join(self.workspace, str(path)))
+        with self.lock:
+            stale = [k for k, v in self.entries.items()
+                     if _path_is_at_or_below(real_path, v[0]) or _path_is_at_or_below(v[0], real_path)]
+            for key in stale:
+                del self.entries[key]
+                self._count(key[0], "invalidations")
+        return len(stale)
+
+    def on_file_changed(self, success, path, msg):
+        """`BaseReadWrite` callback for write tools."""
+        if success and isinstance(path, str):
+            self.invalidate(path)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_statistics(self, tool_name: Optional[str] = None) -> dict:
+        with self.lock:
+            if tool_name is not None:
+                return dict(self.stats.get(tool_name, {"hits": 0, "misses": 0, "invalidations": 0}))
+            return {"entries": len(self.entries), "tools": {k: dict(v) for k, v in self.stats.items()}}
+
+
+def cached_read_result(scope_argument: str, fingerprint: str = "file", default_scope: str = "."):
+    """Cache the result of a read-only `_run` when the tool has a `ToolResultCache`.
+
+    The callbacks fired by the original call are replayed on a hit, so read
+    tracking (e.g. stage `on_file_read`) still sees every read.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, run_manager: Optional[CallbackManagerForToolRun] = None, **kwargs):
+            cache = self.result_cache
+            if cache is None:
+                return func(self, *args, run_manager=run_manager, **kwargs)
+            try:
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                arguments = {k: v for k, v in bound.arguments.items() if k not in ("self", "run_manager")}
+                scope = os.path.realpath(self.get_real_path(arguments.get(scope_argument) or default_scope,
+                                                            allow_workspace=True))
+                key = (self.name, repr(sorted({**arguments, scope_argument: scope}.items())))
+            except (TypeError, ValueError):
+                return func(self, *args, run_manager=run_manager, **kwargs)
+            digest = _path_fingerprint(scope, fingerprint)
+            if digest is None:
+                return func(self, *args, run_manager=run_manager, **kwargs)
+            cached = cache.get(key, digest)
+            if cached is not None:
+                result, callbacks = cached
+                for cb_args, cb_kwargs in callbacks:
+                    self.do_callback(*cb_args, **cb_kwargs)
+                return dict(result) if isinstance(result, dict) else result
+            previous = getattr(_callback_recorder, "calls", None)
+            _callback_recorder.calls = []
+            try:
+                result = func(self, *args, run_manager=run_manager, **kwargs)
+                callbacks = _callback_recorder.calls
+            finally:
+                _callback_recorder.calls = previous
+            # A file changed during the read makes the result unreliable for its fingerprint
+            if _path_fingerprint(scope, fingerprint) == digest:
+                cache.put(key, digest, scope, result, callbacks)
+            return result
+        return wrapper
+    return decorator
+
+
 class BaseReadWrite:
     """Base class for write operations."""
 
@@ -262,6 +421,10 @@ class BaseReadWrite:
         default=[],
         description="List of callbacks to use for tool run management."
     )
+    result_cache: Optional[ToolResultCache] = Field(
+        default=None,
+        description="Shared result cache of read-only tools, None to disable caching."
+    )
 
     def append_callback(self, callback):
         """Append a callback to the tool run callbacks."""
@@ -277,10 +440,24 @@ class BaseReadWrite:
 
     def do_callback(self, *args, **kwargs):
         """Run all callbacks with the provided arguments."""
+        recorded = getattr(_callback_recorder, "calls", None)
+        if recorded is not None:
+            recorded.append((args, kwargs))
         for cb in self.call_backs:
             # func(success, path, msg)
             cb(*args, **kwargs)
 
+    def set_result_cache(self, cache: Optional[ToolResultCache]):
+        """Attach a shared result cache (read-only tools) and return self."""
+        self.result_cache = cache
+        return self
+
+    def get_cache_statistics(self) -> Optional[dict]:
+        """Return the hit/miss counters of this tool, None if caching is disabled."""
+        if self.result_cache is None:
+            return None
+        return self.result_cache.get_statistics(self.name)
+
     def refine_dirs(self, workspace, dirs):
         if not dirs:
             return dirs
@@ -490,9 +667,20 @@ class SearchText(UCTool, BaseReadWrite):
     )
     args_schema: Optional[ArgsSchema] = ArgSearchText
     return_direct: bool = False
+    call_lock_arguments: Tuple[str, ...] = ("directory",)
     ignore_hidden: bool = True
     ignore_pattern_list: list[str] = []
+    search_index: Optional[TrigramIndex] = Field(
+        default=None,
+        description="Trigram index used to skip files that cannot match, None to scan every file."
+    )
 
+    def set_search_index(self, index: Optional[TrigramIndex]):
+        """Attach a trigram index (shared with the write tool callbacks) and return self."""
+        self.search_index = index
+        return self
+
+    @cached_read_result("directory", fingerprint="tree")
     def _run(self, pattern: str, directory: str = "", max_match_lines: int = 20, max_match_files: int = 10,
              use_regex: bool = False, case_sensitive: bool = False, include_line_numbers: bool = True,
              context_before: int = 1, context_after: int = 1,
@@ -651,7 +839,10 @@ class SearchText(UCTool, BaseReadWrite):
                 return str_error(msg)
             info(f"Searching for text '{pattern}' in {real_path}")
             resolved_workspace = str(Path(self.workspace).resolve())
-            for root, dirs, files in os.walk(real_path):
+            index_query = None
+            if self.search_index is not None:
+                index_query = self.search_index.query(pattern, use_regex, case_sensitive)
+            for root, dirs, files in index_walk(real_path, self.workspace):
                 relative_root = os.path.relpath(root, resolved_workspace)
                 dirs[:] = sorted([
                     directory_name for directory_name in dirs
@@ -672,6 +863,9 @@ class SearchText(UCTool, BaseReadWrite):
                     if match_pattern_list(relative_file, self.ignore_pattern_list):
                         continue
                     file_path = os.path.join(root, file)
+                    if index_query is not None and \
+                       not self.search_index.may_match(file_path, relative_file, index_query):
+                        continue
                     if not is_text_file(file_path):
                         continue
                     try:
@@ -685,6 +879,8 @@ class SearchText(UCTool, BaseReadWrite):
                         break
                 if count_files >= max_match_files:
                     break
+            if index_query is not None:
+                self.search_index.schedule_update()
             if result:
                 file_label = "file" if count_files == 1 else "files"
                 line_label = "line" if count_lines == 1 else "lines"
@@ -735,9 +931,11 @@ class FindFiles(UCTool, BaseReadWrite):
     )
     args_schema: Optional[ArgsSchema] = ArgFindFiles
     return_direct: bool = False
+    call_lock_arguments: Tuple[str, ...] = ("directory",)
     ignore_hidden: bool = True
     ignore_pattern_list: list[str] = []
 
+    @cached_read_result("directory", fingerprint="dirs")
     def _run(self, pattern: str, directory: str = "", max_match_files: int = 10,
              run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         """Find files in a directory of the workspace."""
@@ -751,7 +949,7 @@ class FindFiles(UCTool, BaseReadWrite):
         result = []
         count_files = 0
         info(f"Finding files with pattern '{pattern}' in {real_path}")
-        for root, dirs, files in os.walk(real_path):
+        for root, dirs, files in index_walk(real_path, self.workspace):
             relative_root = os.path.relpath(root, self.workspace)
             dirs[:] = [
                 name for name in dirs
@@ -816,6 +1014,7 @@ class PathList(UCTool, BaseReadWrite):
     )
     args_schema: Optional[ArgsSchema] = ArgPathList
     return_direct: bool = False
+    call_lock_arguments: Tuple[str, ...] = ("path",)
 
     # custom variables
     ignore_pattern: list = Field(
@@ -828,6 +1027,7 @@ class PathList(UCTool, BaseReadWrite):
         description="List of subdirectory names and files to ignore when listing files. "
     )
 
+    @cached_read_result("path", fingerprint="tree")
     def _run(
         self, path: str = ".", depth: int = -1, run_manager: Optional[CallbackManagerForToolRun] = None
     ) -> str:
@@ -843,7 +1043,7 @@ class PathList(UCTool, BaseReadWrite):
         count_directories = 0
         count_files = 0
         index = 0
-        for root, _, files in os.walk(real_path):
+        for root, _, files in index_walk(real_path, self.workspace):
             level = root.replace(real_path, '').count(os.sep)
             if level > depth:
                 continue
@@ -916,6 +1116,7 @@ class ReadBinFile(UCTool, BaseReadWrite):
     )
     args_schema: Optional[ArgsSchema] = ArgReadBinFile
     return_direct: bool = False
+    call_lock_arguments: Tuple[str, ...] = ("path",)
 
     def _run(self,
              path: str, start: int, end:int, run_manager: Optional[CallbackManagerForToolRun] = None
@@ -998,7 +1199,9 @@ class ReadTextFile(UCTool, BaseReadWrite):
     )
     args_schema: Optional[ArgsSchema] = ArgReadTextFile
     return_direct: bool = False
+    call_lock_arguments: Tuple[str, ...] = ("path",)
 
+    @cached_read_result("path")
     def _run(self, path: str, start: int = 1, count: int = -1,
              include_line_numbers: bool = True,
              structured_output: bool = False,
@@ -1021,9 +1224,9 @@ class ReadTextFile(UCTool, BaseReadWrite):
             self.do_callback(False, path, emsg)
             return str_error(emsg)
         try:
-            file_sha256 = _sha256_file(real_path)
             newline, has_final_newline = _text_file_metadata(real_path)
-            with open(real_path, 'r', encoding='utf-8', newline='') as f:
+            with open_text_view(real_path) as view:
+                file_sha256 = view.sha256
                 if count == 0:
                     self.do_callback(True, path, "")
                     if structured_output:
@@ -1046,15 +1249,13 @@ class ReadTextFile(UCTool, BaseReadWrite):
                     ) + str_data("", "TXT_DATA")
                 requested_start = max(1, start)
                 selected_lines = []
-                lines_count = 0
                 selected_size = 0
                 too_large = False
-                for line_number, line in enumerate(f, start=1):
-                    lines_count = line_number
-                    if line_number < requested_start:
-                        continue
+                # Only the requested lines are decoded, the line count comes from the index
+                lines_count = view.total_lines
+                for line_number, line in view.iter_lines(requested_start):
                     if count != -1 and len(selected_lines) >= count:
-                        continue
+                        break
                     selected_lines.append((line_number, line))
                     selected_size += len(line) + len(str(line_number)) + 2
                     if selected_size > self.max_read_size:
@@ -2098,6 +2299,156 @@ class ReplaceStringInFile(UCTool, BaseReadWrite):
         self.init_base_rw(workspace, write_dirs, un_write_dirs)
 
 
+class _FileEdit(StrictToolArgs):
+    path: str = Field(
+        ...,
+        description="Existing text file path to modify, relative to the workspace.")
+    old_string: str = Field(
+        ...,
+        min_length=1,
+        description="Non-empty exact literal text that appears exactly once in the file after the previous edits of the same file.")
+    new_string: str = Field(
+        ...,
+        description="The exact literal text to replace old_string with.")
+
+
+class ArgMultiEditFiles(StrictToolArgs):
+    edits: List[_FileEdit] = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        description=(
+            "Ordered string replacements, each {path, old_string, new_string}. Edits of the "
+            "same file apply one after another to its updated content."
+        ),
+    )
+    expected_sha256: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="Optional map of path to the SHA-256 returned by ReadTextFile. All edits fail if any of these files changed since it was read."
+    )
+    dry_run: bool = Field(
+        default=False,
+        description="Validate all edits and return their diffs without writing any file."
+    )
+
+
+class MultiEditFiles(UCTool, BaseReadWrite):
+    """Apply ordered exact string replacements across one or more text files, all or nothing."""
+    name: str = "MultiEditFiles"
+    description: str = (
+        "Apply an ordered list of exact string replacements to one or more existing UTF-8 "
+        "text files in a single call. Every edit follows the ReplaceStringInFile rules: "
+        "old_string must match exactly once, in the content left by the previous edits of "
+        "the same file. All edits are validated before anything is written; if any edit "
+        "fails, no file is modified. Each file is read once and written once atomically. "
+        "Prefer it over many sequential ReplaceStringInFile calls."
+    )
+    args_schema: Optional[ArgsSchema] = ArgMultiEditFiles
+    return_direct: bool = False
+    call_lock_arguments: Tuple[str, ...] = ("edits",)
+
+    def _run(self, edits: List[_FileEdit], expected_sha256: Optional[dict] = None,
+             dry_run: bool = False,
+             run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        """Apply the edits to their files."""
+        edits = [edit if isinstance(edit, dict) else edit.model_dump() for edit in edits]
+        expected_sha256 = expected_sha256 or {}
+        files = OrderedDict()  # real path -> state of the file
+        for index, edit in enumerate(edits, start=1):
+            path = edit["path"]
+            success, msg, real_path = self.check_file(path, for_write=True)
+            if success and real_path not in files and not is_text_file(real_path):
+                success, msg = False, f"File {path} is not a text file."
+            if not success:
+                error_msg = f"Edit {index} ({path}): {msg} No file was modified."
+                self.do_callback(False, path, error_msg)
+                return str_error(error_msg)
+            state = files.get(real_path)
+            if state is None:
+                try:
+                    content, sha256, newline = _read_text_snapshot(real_path)
+                    mode = os.stat(real_path).st_mode & 0o7777
+                except (UnicodeDecodeError, IOError) as e:
+                    error_msg = f"Edit {index} ({path}): failed to read file: {str(e)}. No file was modified."
+                    self.do_callback(False, path, error_msg)
+                    return str_error(error_msg)
+                state = files[real_path] = {
+                    "path": path, "original": content, "content": content, "sha256": sha256,
+                    "newline": newline, "mode": mode, "edits": [],
+                }
+            old_content = _convert_newlines(edit["old_string"], state["newline"])
+            occurrence_count = state["content"].count(old_content)
+            if occurrence_count != 1:
+                error_msg = (
+                    f"Edit {index} ({path}): the specified old_string "
+                    + ("was not found" if occurrence_count == 0 else f"appears {occurrence_count} times")
+                    + " in the file after the previous edits. Read the current file and retry with "
+                    "exact, unique text. No file was modified."
+                )
+                self.do_callback(False, path, error_msg)
+                return str_error(error_msg)
+            state["content"] = state["content"].replace(
+                old_content, _convert_newlines(edit["new_string"], state["newline"]), 1)
+            state["edits"].append({"old_string": edit["old_string"], "new_string": edit["new_string"]})
+        for path, sha256 in expected_sha256.items():
+            success, msg, real_path = self.check_file(path)
+            state = files.get(real_path) if success else None
+            if state is None:
+                error_msg = f"expected_sha256 names {path}, which is not edited. No file was modified."
+                self.do_callback(False, path, error_msg)
+                return str_error(error_msg)
+            if sha256 != state["sha256"]:
+                error_msg = (
+                    f"File {path} changed after it was read. Expected SHA256 {sha256}, current SHA256 "
+                    f"{state['sha256']}. Read it again and retry. No file was modified."
+                )
+                self.do_callback(False, path, error_msg)
+                return str_error(error_msg)
+            state["expected"] = True
+
+        diffs = []
+        for state in files.values():
+            state["new_sha256"] = _sha256_bytes(state["content"].encode("utf-8"))
+            if state["content"] != state["original"]:
+                diffs.append(_bounded_diff(state["original"], state["content"], state["path"])[0])
+        summary = ", ".join(
+            f"{state['path']} ({len(state['edits'])} edits, SHA256: {state['sha256']} -> {state['new_sha256']})"
+            for state in files.values()
+        )
+        if dry_run:
+            return str_info(f"Dry run successful for {len(edits)} edits: {summary}.") + "".join(diffs)
+        written = []
+        try:
+            for real_path, state in files.items():
+                if state["content"] == state["original"]:
+                    continue
+                if state.get("expected") and _sha256_file(real_path) != state["sha256"]:
+                    raise IOError(f"file {state['path']} changed while the edits were being prepared")
+                _atomic_write_text(real_path, state["content"], existing_mode=state["mode"])
+                written.append(real_path)
+        except (IOError, OSError) as e:
+            # Put back the files already written, so a failed call leaves no partial change
+            for real_path in written:
+                state = files[real_path]
+                _atomic_write_text(real_path, state["original"], existing_mode=state["mode"])
+            error_msg = f"Failed to apply the edits: {str(e)}. No file was modified."
+            self.do_callback(False, next(iter(files.values()))["path"], error_msg)
+            return str_error(error_msg)
+        for state in files.values():
+            self.do_callback(True, state["path"], {
+                "edits": state["edits"],
+                "before_sha256": state["sha256"],
+                "after_sha256": state["new_sha256"],
+            })
+        info(f"Applied {len(edits)} edits to {len(files)} files")
+        return str_info(f"Successfully applied {len(edits)} edits: {summary}.") + "".join(diffs)
+
+    def __init__(self, workspace: str, write_dirs=None, un_write_dirs=None, **kwargs):
+        """Initialize the tool."""
+        super().__init__(**kwargs)
+        self.init_base_rw(workspace, write_dirs, un_write_dirs)
+
+
 class ArgGetFileInfo(StrictToolArgs):
     path: str = Field(
         ...,
@@ -2118,7 +2469,9 @@ class GetFileInfo(UCTool, BaseReadWrite):
     )
     args_schema: Optional[ArgsSchema] = ArgGetFileInfo
     return_direct: bool = False
+    call_lock_arguments: Tuple[str, ...] = ("path",)
 
+    @cached_read_result("path")
     def _run(self, path: str, include_stats: bool = True,
              run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
         """Get information about a file or directory."""
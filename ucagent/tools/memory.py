@@ -1,12 +1,11 @@
 # -*- coding: utf-8 -*-
 """Memory management tools for UCAgent."""
 
-from mem0 import Memory
 import time
 from .uctool import UCTool
 from langchain_core.tools.base import ArgsSchema
 
-from typing import Optional, List, Union
+from typing import Any, Optional, List, Union
 from pydantic import BaseModel, Field
 
 import os
@@ -14,8 +13,12 @@ from ucagent.util.log import info
 
 
 from langgraph.store.memory import InMemoryStore
-from langchain_openai import OpenAIEmbeddings
-from langmem import utils
+
+
+def _langmem_utils():
+    # langmem and langchain_openai take seconds to import, only tools in use pay for them
+    from langmem import utils
+    return utils
 
 
 class ArgsMemSearch(BaseModel):
@@ -25,6 +28,7 @@ class ArgsMemSearch(BaseModel):
 
 
 def new_embed(config) -> dict:
+    from langchain_openai import OpenAIEmbeddings
     info(f"Creating new embedding with model: {config['model_name']}, base_url: {config['openai_api_base']}")
     return {"embed":OpenAIEmbeddings(model   = config["model_name"],
                             base_url= config["openai_api_base"],
@@ -44,13 +48,13 @@ class SemanticSearchInGuidDoc(UCTool):
     workspace: str = Field(str, description="The workspace directory to search in")
     doc_path: str = Field(str, description="The path to the documentation directory relative to the workspace")
     store: InMemoryStore = Field(InMemoryStore, description="In-memory store for document references")
-    namespace: utils.NamespaceTemplate = Field(utils.NamespaceTemplate,
+    namespace: Any = Field(None,
         description="Namespace template for document references"
     )
 
     def __init__(self, config, workspace, doc_path, file_extension: List[str] = [".md", ".py", ".v"]):
         super().__init__()
-        self.namespace = utils.NamespaceTemplate("doc_reference")
+        self.namespace = _langmem_utils().NamespaceTemplate("doc_reference")
         self.store = InMemoryStore(
             index=new_embed(config)
         )
@@ -75,7 +79,7 @@ class SemanticSearchInGuidDoc(UCTool):
             limit=limit,
             offset=0,
         )
-        return utils.dumps([m.dict() for m in memories])
+        return _langmem_utils().dumps([m.dict() for m in memories])
 
 
 class ArgsMemoryPut(BaseModel):
@@ -124,7 +128,7 @@ class MemoryPut(MemoryTool):
         """Save the content to the memory store."""
         key = str(time.time_ns())
         self.store.put(
-            utils.NamespaceTemplate(scope)(),
+            _langmem_utils().NamespaceTemplate(scope)(),
             key=key,  # Use a unique key based on the current time
             value={"content": data}
         )
@@ -144,6 +148,7 @@ class MemoryGet(MemoryTool):
 
     def _run(self, scope: str, query: str, limit: int = 3, run_manager = None) -> str:
         """Search for content in the memory store."""
+        utils = _langmem_utils()
         memories = self.store.search(
             utils.NamespaceTemplate(scope)(),
             query=query,
@@ -11,13 +11,24 @@ from pydantic import BaseModel, Field
 
 from ucagent.util.test_tools import ucagent_lib_path
 from ucagent.util.functions import get_toffee_json_test_case, load_toffee_report
+from ucagent.util.functions import merge_toffee_reports, merge_line_coverage_reports, merge_toffee_report_subset
+from ucagent.util.functions import get_abs_path_cwd_ucagent, load_json_file
+from ucagent.util.pytest_pool import WarmPytestPool
+from ucagent.util.stream_capture import BoundedOutputCapture
 from ucagent.util.log import debug, info, warning
 import os
 import shutil
 import psutil
 from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
+import threading
+import socket
+import ast
+import hashlib
+import glob
 import json
+import re
 
 
 class ArgRunPyTest(BaseModel):
@@ -44,6 +55,60 @@ class ArgRunPyTest(BaseModel):
     )
 
 
+# Warm pool settings (tools.RunTestCases.warm_pool), applied to all RunPyTest instances
+_warm_pool_config = {"enable": None, "preload": []}
+
+
+def set_warm_pool_config(enable: bool = None, preload: list = None):
+    """Set the warm pool default of all RunPyTest tools and extra modules to preload.
+
+    `enable` None keeps the `warm_pool` field of each tool, env UCA_PYTEST_WARM_POOL
+    still takes precedence.
+    """
+    _warm_pool_config["enable"] = None if enable is None else bool(enable)
+    _warm_pool_config["preload"] = [str(m) for m in (preload or []) if m]
+
+
+def warm_pool_summary() -> str:
+    """One line summary of the warm pool latency statistics, empty if no pool was started."""
+    stats = WarmPytestPool.get_all_statistics()
+    if not stats:
+        return ""
+    cold = sum(s["cold_starts"] for s in stats.values())
+    warm = sum(s["warm_runs"] for s in stats.values())
+    cold_ms = sum(s["cold_start_ms"] for s in stats.values()) / max(1, cold)
+    warm_ms = sum(s["warm_start_ms"] for s in stats.values()) / max(1, warm)
+    return f"cold starts {cold} (avg {cold_ms:.0f}ms), warm runs {warm} (avg {warm_ms:.0f}ms), pools {len(stats)}"
+
+
+class FailureLimit:
+    """`stop_when` policy of `RunPyTest.do`: stop the run once `max_failures` tests failed.
+
+    Failures are counted from the FAILED result lines pytest prints per test in
+    verbose mode (`-v` is added to the command while the policy is active). One
+    instance can be shared by the shards of a run, `reason` is set once it stopped.
+    """
+
+    FAILED_LINE = re.compile(r"(?:^|\s)FAILED(?:\s|$)")
+
+    def __init__(self, max_failures: int):
+        self.max_failures = max_failures
+        self.failures = 0
+        self.reason = ""
+        self.lock = threading.Lock()
+
+    def __call__(self, stream_name: str, line: str):
+        if self.reason:
+            return self.reason  # stopped by another shard
+        if not self.FAILED_LINE.search(line):
+            return None
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.max_failures and not self.reason:
+                self.reason = f"{self.failures} tests failed, reached max_failures ({self.max_failures})"
+            return self.reason or None
+
+
 class RunPyTest(UCTool):
     """Tool to run pytest tests in a specified directory or a test file."""
 
@@ -61,6 +126,22 @@ class RunPyTest(UCTool):
         default={},
         description="Additional arguments to pass to pytest, e.g., {'verbose': True, 'capture': 'no'}."
     )
+    warm_pool: bool = Field(
+        default=False,
+        description="Run pytest in forked workers of a pre-warmed process that has pytest, toffee and "
+                    "the DUT packages imported, overridden by env UCA_PYTEST_WARM_POOL."
+    )
+    output_limit: int = Field(
+        default=65536,
+        description="Maximum characters of stdout/stderr kept per test run (head and tail), "
+                    "overridden by env UCA_PYTEST_OUTPUT_LIMIT. The full output is spilled to disk."
+    )
+    max_failures: int = Field(
+        default=0,
+        description="Stop a test run after this many failed tests (0 runs all tests), overridden by "
+                    "env UCA_PYTEST_MAX_FAILURES. A stopped run fails and its report is incomplete. "
+                    "Runs with a failure limit do not use the warm pool."
+    )
 
     def do(self,
              test_dir_or_file: str,
@@ -69,11 +150,18 @@ class RunPyTest(UCTool):
              return_stderr: bool = False,
              timeout: int = 15,
              pytest_ex_env: dict = {},
-             run_manager: CallbackManagerForToolRun = None, python_paths: list = None) -> Tuple[int, str, str]:
-        """Run the Python tests."""
+             run_manager: CallbackManagerForToolRun = None, python_paths: list = None,
+             pytest_args: dict = None, pre_call=None, stop_when=None) -> Tuple[int, str, str]:
+        """Run the Python tests.
+
+        `pytest_args` overrides entries of `self.pytest_args` for this run only, and
+        `pre_call` replaces `self.pre_call` to receive the started process.
+        `stop_when(stream_name, line)` can terminate the run early, see `stream_process_output`,
+        it defaults to the `max_failures` policy (`new_stop_when()`). A stopped run returns False.
+        Returned output is bounded by `get_output_limit()` characters per stream.
+        """
         assert os.path.exists(test_dir_or_file), \
             f"Test directory or file does not exist: {test_dir_or_file}"
-        ret_stdout, ret_stderr = "", ""
         env = os.environ.copy()
         pythonpath = env.get("PYTHONPATH", "")
         python_path_str = os.path.abspath(os.getcwd()) + ":" + ucagent_lib_path()
@@ -113,27 +201,122 @@ class RunPyTest(UCTool):
                 else:
                     raise ValueError(f"pytest_ex_args ({pytest_ex_args}) must be a string or a list.")
 
+        if stop_when is None:
+            stop_when = self.new_stop_when()
         ENV_ARGS = env.get("UCA_PYTEST_ARGS", "").replace(";", " ").strip().split()
-        cmd = ["pytest", *ENV_ARGS, "-s", *self.get_pytest_args(), *test_target]
+        if isinstance(stop_when, FailureLimit):
+            ENV_ARGS.append("-v")
+        cmd = ["pytest", *ENV_ARGS, "-s", *self.get_pytest_args(pytest_args), *test_target]
         info(f"Run command: PYTHONPATH={env['PYTHONPATH']} {' '.join(cmd)} (in {work_dir})\n")
+        # stdout is read (but not returned) when a stop policy watches it
+        captures = self.new_output_captures(work_dir, env, return_stdout or stop_when is not None, return_stderr)
+        if self.use_warm_pool() and stop_when is None:
+            try:
+                return self.do_warm(cmd[1:], env, work_dir, python_paths, captures, timeout,
+                                    pre_call or self.pre_call)
+            except Exception as e:
+                warning(f"Warm pytest pool failed, run pytest in a new process: {e}")
+                captures = self.new_output_captures(work_dir, env, return_stdout, return_stderr)
         try:
             worker = subprocess.Popen(
                 cmd,
-                stdout=subprocess.PIPE if return_stdout else None,
-                stderr=subprocess.PIPE if return_stderr else None,
+                stdout=subprocess.PIPE if "stdout" in captures else None,
+                stderr=subprocess.PIPE if "stderr" in captures else None,
                 text=True,
+                errors="replace",
                 env=env,
-                bufsize=10,
+                bufsize=1,
                 cwd=work_dir
             )
-            self.pre_call(worker)
-            ret_stdout, ret_stderr = worker.communicate(timeout=timeout)  # Set a timeout for the test run
-            if not return_stdout:
-                ret_stdout = ""
-            if not return_stderr:
-                ret_stderr = ""
-            return True, ret_stdout, ret_stderr
-        except subprocess.TimeoutExpired as e:
+            (pre_call or self.pre_call)(worker)
+            timed_out, stop_reason = self.stream_process_output(worker, captures, timeout, stop_when)
+        except Exception as e:
+            for capture in captures.values():
+                capture.close()
+            return False, "Test Fail", f"\nException: {e}"
+        ret_stdout = captures["stdout"].getvalue() if return_stdout else ""
+        ret_stderr = captures["stderr"].getvalue() if "stderr" in captures else ""
+        if timed_out:
+            return False, ret_stdout, ret_stderr + f"\nTest run timed out after {timeout} seconds. You may try increasing the timeout argment."
+        if stop_reason:
+            return False, ret_stdout, ret_stderr + f"\nTest run stopped early: {stop_reason}. Its test report is incomplete."
+        return True, ret_stdout, ret_stderr
+
+    def get_max_failures(self) -> int:
+        """Get the failed test limit of a run (0 for none), env UCA_PYTEST_MAX_FAILURES takes precedence."""
+        try:
+            return max(0, int(os.environ.get("UCA_PYTEST_MAX_FAILURES", self.max_failures)))
+        except ValueError:
+            warning(f"Invalid UCA_PYTEST_MAX_FAILURES value: {os.environ.get('UCA_PYTEST_MAX_FAILURES')}, use {self.max_failures}")
+            return max(0, self.max_failures)
+
+    def new_stop_when(self):
+        """Get the `stop_when` policy of a new run, None if runs are never stopped early."""
+        max_failures = self.get_max_failures()
+        return FailureLimit(max_failures) if max_failures > 0 else None
+
+    def get_output_limit(self) -> int:
+        """Get the number of characters kept per output stream, env UCA_PYTEST_OUTPUT_LIMIT takes precedence."""
+        try:
+            return max(1024, int(os.environ.get("UCA_PYTEST_OUTPUT_LIMIT", self.output_limit)))
+        except ValueError:
+            warning(f"Invalid UCA_PYTEST_OUTPUT_LIMIT value: {os.environ.get('UCA_PYTEST_OUTPUT_LIMIT')}, use {self.output_limit}")
+            return self.output_limit
+
+    def new_output_captures(self, work_dir: str, env: dict, return_stdout: bool, return_stderr: bool) -> dict:
+        """Create the bounded captures of the returned output streams.
+
+        The full output is spilled to .ucagent/pytest_output/, one file per stream,
+        test directory and shard, overwritten by the next run.
+        """
+        key = hashlib.sha1(f"{work_dir}:{env.get('UCA_PYTEST_SHARD', '')}".encode("utf-8")).hexdigest()[:16]
+        spill_dir = get_abs_path_cwd_ucagent(getattr(self, "workspace", os.getcwd()), "pytest_output")
+        os.makedirs(spill_dir, exist_ok=True)
+        captures = {}
+        for name, enabled in (("stdout", return_stdout), ("stderr", return_stderr)):
+            if enabled:
+                captures[name] = BoundedOutputCapture(self.get_output_limit(),
+                                                      os.path.join(spill_dir, f"{key}.{name}.log"),
+                                                      on_line=self.forward_output_line)
+        return captures
+
+    def forward_output_line(self, line: str):
+        """Forward a test output line to the console log and, in streaming mode, to the client."""
+        debug(f"[{self.name}] {line.rstrip()}")
+        if self.is_in_streaming:
+            self.put_alive_data(line.rstrip())
+
+    def stream_process_output(self, worker, captures: dict, timeout: int, stop_when=None) -> Tuple[bool, str]:
+        """Read the output of `worker` line by line into `captures` until it exits.
+
+        `stop_when(stream_name, line)` is called for every captured line, a truthy return
+        value terminates the run early. Returns (timed out, early stop reason).
+        """
+        stop = {}
+
+        def pump(name):
+            capture = captures[name]
+            try:
+                for line in getattr(worker, name):
+                    capture.write(line)
+                    if stop_when is not None and not stop:
+                        reason = stop_when(name, line)
+                        if reason:
+                            stop["reason"] = reason if isinstance(reason, str) else line.strip()
+                            worker.kill()
+            except Exception as e:
+                warning(f"Error reading test {name}: {e}")
+            finally:
+                capture.close()
+
+        readers = [threading.Thread(target=pump, args=(name,), daemon=True) for name in captures]
+        for reader in readers:
+            reader.start()
+        timed_out = False
+        try:
+            worker.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
             try:
                 worker.terminate()
                 _, alive = psutil.wait_procs([worker], timeout=3)
@@ -141,16 +324,9 @@ class RunPyTest(UCTool):
                     worker.kill()
             except Exception as ex:
                 warning(f"Error terminating process: {ex}")
-            ret_stdout, ret_stderr = worker.communicate()
-            return False, ret_stdout, ret_stderr + f"\nTest run timed out after {e.timeout} seconds. You may try increasing the timeout argment."
-        except subprocess.CalledProcessError as e:
-            if return_stdout:
-                ret_stdout += e.stdout
-            if return_stderr:
-                ret_stderr += e.stderr
-            return False, ret_stdout, ret_stderr + f"\nCalledProcessError: {e}"
-        except Exception as e:
-            return False, "Test Fail", ret_stderr + f"\nException: {e}"
+        for reader in readers:
+            reader.join(timeout=5)
+        return timed_out, stop.get("reason", "")
 
     def _run(self,
              test_dir_or_file: str,
@@ -175,10 +351,75 @@ class RunPyTest(UCTool):
             ret_str += f"Stderr:\n{pyt_err}\n"
         return ret_str
 
-    def get_pytest_args(self) -> list:
+    def use_warm_pool(self) -> bool:
+        """Whether to run pytest in the warm worker pool, env UCA_PYTEST_WARM_POOL takes precedence."""
+        if not (hasattr(os, "fork") and hasattr(socket, "AF_UNIX")):
+            return False
+        value = os.environ.get("UCA_PYTEST_WARM_POOL")
+        if value is None:
+            if _warm_pool_config["enable"] is not None:
+                return _warm_pool_config["enable"]
+            return self.warm_pool
+        return value.lower() in ("1", "true", "yes")
+
+    def get_warm_preload(self, work_dir: str, python_paths: list = None) -> list:
+        """Modules the warm pool imports once: pytest, toffee and the workspace packages
+        (e.g. the DUT) imported by `*api.py` and `conftest.py` of the test directory.
+        Test code itself is never preloaded, workers always collect it from disk.
+        Modules from `set_warm_pool_config(preload=...)` are preloaded too."""
+        preload = ["pytest", "toffee", "toffee_test"]
+        preload += [m for m in _warm_pool_config["preload"] if m not in preload]
+        search_dirs = [os.path.abspath(p) for p in (python_paths or [])
+                       if os.path.isdir(p) and os.path.abspath(p) != work_dir]
+        for path in glob.glob(os.path.join(work_dir, "*api.py")) + glob.glob(os.path.join(work_dir, "conftest.py")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    tree = ast.parse(f.read(), filename=path)
+            except (OSError, SyntaxError, ValueError) as e:
+                debug(f"Skip warm preload scan of {path}: {e}")
+                continue
+            for node in tree.body:
+                if isinstance(node, ast.Import):
+                    names = [a.name for a in node.names]
+                elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                    names = [node.module]
+                else:
+                    continue
+                for name in (n.split(".")[0] for n in names):
+                    if name in preload:
+                        continue
+                    if any(os.path.isfile(os.path.join(d, name, "__init__.py")) for d in search_dirs):
+                        preload.append(name)
+        return preload
+
+    def do_warm(self, args: list, env: dict, work_dir: str, python_paths: list,
+                captures: dict, timeout: int, pre_call) -> Tuple[bool, str, str]:
+        """Run pytest with `args` in a forked worker of the warm pool.
+
+        The worker writes its output to the spill files of `captures`, which are read
+        back bounded after the run.
+        """
+        root = os.path.abspath(python_paths[0]) if python_paths else work_dir
+        pool = WarmPytestPool.get(work_dir, env, root, self.get_warm_preload(work_dir, python_paths))
+        paths = {name: capture.spill_path for name, capture in captures.items()}
+        for capture in captures.values():
+            capture.close()
+        code = pool.run(args, env, work_dir, timeout, paths.get("stdout"), paths.get("stderr"), pre_call)
+        ret = {name: BoundedOutputCapture.from_file(path, self.get_output_limit()).getvalue()
+               for name, path in paths.items() if os.path.exists(path)}
+        ret_stdout, ret_stderr = ret.get("stdout", ""), ret.get("stderr", "")
+        if code is None:
+            return False, ret_stdout, ret_stderr + f"\nTest run timed out after {timeout} seconds. You may try increasing the timeout argment."
+        return True, ret_stdout, ret_stderr
+
+    def get_warm_pool_statistics(self) -> dict:
+        """Cold start and warm run latency of the warm pytest pools, keyed by working directory."""
+        return WarmPytestPool.get_all_statistics()
+
+    def get_pytest_args(self, overrides: dict = None) -> list:
         """Get additional arguments for pytest."""
         args = []
-        for key, value in self.pytest_args.items():
+        for key, value in {**self.pytest_args, **(overrides or {})}.items():
             if isinstance(value, bool):
                 if value:
                     args.append(f"--{key}")
@@ -192,6 +433,40 @@ class RunPyTest(UCTool):
         return self
 
 
+IMPACT_MAP_FILE = "impact_map.json"
+
+
+class _ShardProcesses:
+    """Process handle of all test shards, so a checker can kill them as one."""
+
+    def __init__(self):
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def add(self, worker):
+        with self.lock:
+            self.workers.append(worker)
+
+    @property
+    def pid(self):
+        with self.lock:
+            return self.workers[0].pid if self.workers else None
+
+    def poll(self):
+        with self.lock:
+            codes = [w.poll() for w in self.workers]
+        return None if any(c is None for c in codes) else max(codes, default=0)
+
+    def kill(self):
+        with self.lock:
+            workers = list(self.workers)
+        for w in workers:
+            try:
+                w.kill()
+            except Exception as e:
+                warning(f"Error killing test shard {w.pid}: {e}")
+
+
 class RunUnityChipTest(RunPyTest):
     """Tool to run tests in a specified directory or a test file."""
 
@@ -218,6 +493,15 @@ class RunUnityChipTest(RunPyTest):
         default="toffee_report.json",
         description="Path to save the JSON results of the Unity tests."
     )
+    line_coverage_json_path: str = Field(
+        default=os.path.join("line_dat", "code_coverage.json"),
+        description="Path of the line coverage JSON inside the result directory."
+    )
+    shards: int = Field(
+        default=1,
+        description="Number of parallel pytest subprocesses to split the test cases across, "
+                    "overridden by env UCA_PYTEST_SHARDS. 1 runs all tests in one process."
+    )
 
     def do(self,
              test_dir_or_file: str,
@@ -231,15 +515,29 @@ class RunUnityChipTest(RunPyTest):
         """Run the Unity chip tests."""
         return_test_details = kw.get("return_test_details", False)
         shutil.rmtree(self.result_dir, ignore_errors=True)
-        all_pass, pyt_out, pyt_err = RunPyTest.do(self,
-                                          os.path.join(self.workspace, test_dir_or_file),
-                                          pytest_ex_args,
-                                          return_stdout,
-                                          return_stderr,
-                                          timeout,
-                                          pytest_ex_env,
-                                          run_manager,
-                                          python_paths = [self.workspace, os.path.join(self.workspace, test_dir_or_file)])
+        impact_dir, impact_select = None, False
+        if kw.get("test_impact", False):
+            impact_dir = self.get_impact_dir(test_dir_or_file, pytest_ex_args, pytest_ex_env)
+            impact_select = not kw.get("force_full", False) and \
+                os.path.exists(os.path.join(impact_dir, self.result_json_path))
+            pytest_ex_env = self.get_impact_env(impact_dir, impact_select, pytest_ex_env)
+        run_args = (os.path.join(self.workspace, test_dir_or_file),
+                    pytest_ex_args,
+                    return_stdout,
+                    return_stderr,
+                    timeout,
+                    pytest_ex_env,
+                    run_manager)
+        python_paths = [self.workspace, os.path.join(self.workspace, test_dir_or_file)]
+        stop_when = self.new_stop_when()
+        if self.get_shards() > 1:
+            all_pass, pyt_out, pyt_err = self.do_sharded(*run_args, python_paths=python_paths, stop_when=stop_when)
+        else:
+            all_pass, pyt_out, pyt_err = RunPyTest.do(self, *run_args, python_paths=python_paths, stop_when=stop_when)
+        stop_reason = stop_when.reason if stop_when is not None else ""
+        impact_note = ""
+        if impact_dir is not None and not stop_reason:
+            impact_note = self.update_impact_cache(impact_dir, impact_select)
         result_json_path = os.path.join(self.result_dir, self.result_json_path)
         ret_data = {
             "run_test_success": all_pass,
@@ -252,9 +550,153 @@ class RunUnityChipTest(RunPyTest):
                 return_all_checks,
                 return_test_details=return_test_details,
             )
+        if impact_note:
+            ret_data["test_impact"] = impact_note
+        if stop_reason:
+            # The report only covers the tests run before the stop
+            ret_data["run_incomplete"] = f"Test run stopped early: {stop_reason}"
         info(f"Run UnityChip test report:\n{json.dumps(ret_data, indent=2)}\n")
         return ret_data, pyt_out, pyt_err
 
+    def get_shards(self) -> int:
+        """Get the number of test shards, env UCA_PYTEST_SHARDS takes precedence."""
+        try:
+            return max(1, int(os.environ.get("UCA_PYTEST_SHARDS", self.shards)))
+        except ValueError:
+            warning(f"Invalid UCA_PYTEST_SHARDS value: {os.environ.get('UCA_PYTEST_SHARDS')}, use {self.shards}")
+            return max(1, self.shards)
+
+    def set_shards(self, shards: int):
+        """Set the number of test shards."""
+        self.shards = max(1, int(shards))
+        return self
+
+    def do_sharded(self, test_dir_or_file, pytest_ex_args, return_stdout, return_stderr,
+                   timeout, pytest_ex_env, run_manager, python_paths=None, stop_when=None) -> Tuple[bool, str, str]:
+        """Run the tests in parallel shards and merge their reports into `self.result_dir`.
+
+        Each shard runs the same pytest command in its own report directory and keeps
+        a contiguous slice of the collected items (see ucagent.util.pytest_shard), so
+        the merged report lists the test cases in the order of a serial run.
+        """
+        shards = self.get_shards()
+        processes = _ShardProcesses()
+        self.pre_call(processes)
+        shard_dirs = [os.path.join(self.result_dir, f"shard_{i}") for i in range(shards)]
+        plugins = ",".join(p for p in [pytest_ex_env.get("PYTEST_PLUGINS", os.environ.get("PYTEST_PLUGINS", "")),
+                                      "ucagent.util.pytest_shard"] if p)
+
+        def run_shard(index):
+            return RunPyTest.do(self, test_dir_or_file, pytest_ex_args, return_stdout, return_stderr, timeout,
+                                {**pytest_ex_env, "PYTEST_PLUGINS": plugins, "UCA_PYTEST_SHARD": f"{index}/{shards}"},
+                                run_manager, python_paths=python_paths,
+                                pytest_args={"report-dir": shard_dirs[index]}, pre_call=processes.add,
+                                stop_when=stop_when)
+
+        info(f"Run tests in {shards} shards")
+        with ThreadPoolExecutor(max_workers=shards, thread_name_prefix="ucagent-test-shard") as pool:
+            results = list(pool.map(run_shard, range(shards)))
+        all_pass = all(r[0] for r in results)
+        pyt_out = "".join(f"[Shard {i}]:\n{r[1]}\n" for i, r in enumerate(results) if r[1])
+        pyt_err = "".join(f"[Shard {i}]:\n{r[2]}\n" for i, r in enumerate(results) if r[2])
+        self.merge_shard_reports(shard_dirs)
+        return all_pass, pyt_out, pyt_err
+
+    def merge_shard_reports(self, shard_dirs: list):
+        """Merge the toffee JSON and line coverage reports of the shards into `self.result_dir`."""
+        for rel_path, merge in ((self.result_json_path, merge_toffee_reports),
+                                (self.line_coverage_json_path, merge_line_coverage_reports)):
+            paths = [os.path.join(d, rel_path) for d in shard_dirs if os.path.exists(os.path.join(d, rel_path))]
+            if not paths:
+                continue
+            target = os.path.join(self.result_dir, rel_path)
+            try:
+                data = merge(paths)
+            except Exception as e:
+                warning(f"Failed to merge shard reports {paths}: {e}")
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+
+    def get_impact_dir(self, test_dir_or_file, pytest_ex_args, pytest_ex_env) -> str:
+        """Get the test impact cache directory of a test target, its arguments and env."""
+        key = json.dumps([test_dir_or_file, pytest_ex_args, sorted(pytest_ex_env.items())], default=str)
+        return get_abs_path_cwd_ucagent(self.workspace, os.path.join(
+            "test_impact", hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]))
+
+    def get_impact_env(self, impact_dir: str, select: bool, pytest_ex_env: dict) -> dict:
+        """Get the pytest env loading ucagent.util.pytest_impact."""
+        for stale in glob.glob(os.path.join(impact_dir, "run_*.json")):
+            os.remove(stale)
+        plugins = ",".join(p for p in [pytest_ex_env.get("PYTEST_PLUGINS", os.environ.get("PYTEST_PLUGINS", "")),
+                                      "ucagent.util.pytest_impact"] if p)
+        return {**pytest_ex_env,
+                "PYTEST_PLUGINS": plugins,
+                "UCA_TEST_IMPACT_DIR": impact_dir,
+                "UCA_TEST_IMPACT_MAP": os.path.join(impact_dir, IMPACT_MAP_FILE),
+                "UCA_TEST_IMPACT_ROOT": self.workspace,
+                "UCA_TEST_IMPACT_SELECT": "1" if select else "0"}
+
+    def update_impact_cache(self, impact_dir: str, select: bool) -> str:
+        """Merge a partial re-run with the cached report, then cache the result and test dependencies.
+
+        With `select`, only impacted tests ran: their results replace those of the
+        cached report in `self.result_dir`, so checkers read a complete report.
+        Line coverage and the hints of bins no test marks are not attributed to tests:
+        the merge keeps what the previous run of the re-run tests covered, so they
+        can be over-reported until the next full run (see `merge_toffee_report_subset`).
+        Returns a note on the merged report for the tool output, empty for a full run.
+        """
+        run_files = sorted(glob.glob(os.path.join(impact_dir, "run_*.json")),
+                           key=lambda p: int(os.path.basename(p)[4:-5]))
+        if not run_files:
+            warning(f"No test impact data recorded in {impact_dir}, pytest may have failed to start.")
+            return ""
+        order, rerun, items, deps = [], {}, {}, {}
+        for run in map(load_json_file, run_files):
+            order += [n for n in run["order"] if n not in items]
+            items.update(run["items"])
+            rerun.update(dict.fromkeys(run["rerun"]))
+            deps.update(run["deps"])
+        report_path = os.path.join(self.result_dir, self.result_json_path)
+        line_path = os.path.join(self.result_dir, self.line_coverage_json_path)
+        cached_report = os.path.join(impact_dir, self.result_json_path)
+        cached_line = os.path.join(impact_dir, os.path.basename(self.line_coverage_json_path))
+        note = ""
+        if select:
+            if rerun and not os.path.exists(report_path):
+                warning("No report generated by the impacted tests, the test impact cache is not updated.")
+                return ""
+            current = load_json_file(report_path) if os.path.exists(report_path) else {}
+            merged = merge_toffee_report_subset(load_json_file(cached_report), current,
+                                                [items[n] for n in order], [items[n] for n in rerun])
+            os.makedirs(os.path.dirname(report_path), exist_ok=True)
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f, indent=2)
+            line_paths = [p for p in (cached_line, line_path) if os.path.exists(p)]
+            if line_paths:
+                merged_line = merge_line_coverage_reports(line_paths)
+                os.makedirs(os.path.dirname(line_path), exist_ok=True)
+                with open(line_path, "w", encoding="utf-8") as f:
+                    json.dump(merged_line, f, indent=2)
+            note = (f"Re-ran {len(rerun)} of {len(order)} tests (test impact), other results are from the last run. "
+                    "Line coverage and hints of bins not marked by any test may still include what the "
+                    "previous run of the re-run tests covered, run all tests for exact coverage.")
+            info(f"Test impact: {note}")
+        for src, dst in ((report_path, cached_report), (line_path, cached_line)):
+            if os.path.exists(src):
+                shutil.copyfile(src, dst)
+            elif os.path.exists(dst):
+                os.remove(dst)
+        map_path = os.path.join(impact_dir, IMPACT_MAP_FILE)
+        impact_map = load_json_file(map_path) if os.path.exists(map_path) else {}
+        impact_map = {n: impact_map[n] for n in order if n in impact_map}
+        impact_map.update({n: {"deps": d} for n, d in deps.items()})
+        with open(map_path, "w", encoding="utf-8") as f:
+            json.dump(impact_map, f)
+        return note
+
     def _run(self,
              test_dir_or_file: str,
              pytest_ex_args: str = "",
@@ -6,10 +6,7 @@ from langchain_core.tools import BaseTool
 from langchain_core.tools.base import ArgsSchema
 from langchain_core.messages import ToolMessage
 from pydantic import Field, BaseModel, ConfigDict, PrivateAttr, ValidationError
-from typing import Callable, Optional, Any
-from mcp.server.fastmcp import Context
-from langchain_mcp_adapters.tools import _get_injected_args, create_model, ArgModelBase, FuncMetadata
-from mcp.server.fastmcp.tools import Tool as FastMCPTool
+from typing import TYPE_CHECKING, Callable, Optional, Any
 import ucagent.util.functions as fc
 
 import threading
@@ -17,12 +14,19 @@ import concurrent.futures
 import asyncio
 import os
 import weakref
+import sys
 from ucagent.util.cqueque import CircularOverwriteQueue
 import time
 
+if TYPE_CHECKING:
+    from mcp.server.fastmcp import Context
+    from mcp.server.fastmcp.tools import Tool as FastMCPTool
+
 
 _keyed_async_locks = weakref.WeakValueDictionary()
 _keyed_async_locks_guard = threading.Lock()
+_keyed_thread_locks = weakref.WeakValueDictionary()
+_keyed_thread_locks_guard = threading.Lock()
 
 
 class EmptyArgs(BaseModel):
@@ -30,21 +34,44 @@ class EmptyArgs(BaseModel):
     pass
 
 
-class ExtraArgModelBase(ArgModelBase):
-    """FastMCP argument model base that preserves undeclared tool arguments."""
+def _is_mcp_context(ctx) -> bool:
+    # A FastMCP Context only exists once mcp is imported, so there is no need to import it here
+    mcp_fastmcp = sys.modules.get("mcp.server.fastmcp")
+    return mcp_fastmcp is not None and isinstance(ctx, mcp_fastmcp.Context)
+
+
+_fastmcp_arg_model_bases = {}
+
+
+def _get_fastmcp_arg_model_base(extra_mode):
+    """FastMCP argument model base for an args_schema extra mode, mcp is imported on first use."""
+    if not _fastmcp_arg_model_bases:
+        from langchain_mcp_adapters.tools import ArgModelBase
 
-    model_config = ConfigDict(arbitrary_types_allowed=True, extra="allow")
+        class ExtraArgModelBase(ArgModelBase):
+            """FastMCP argument model base that preserves undeclared tool arguments."""
 
-    def model_dump_one_level(self) -> dict[str, Any]:
-        kwargs = super().model_dump_one_level()
-        kwargs.update(getattr(self, "__pydantic_extra__", None) or {})
-        return kwargs
+            model_config = ConfigDict(arbitrary_types_allowed=True, extra="allow")
 
+            def model_dump_one_level(self) -> dict[str, Any]:
+                kwargs = super().model_dump_one_level()
+                kwargs.update(getattr(self, "__pydantic_extra__", None) or {})
+                return kwargs
 
-class ForbidExtraArgModelBase(ArgModelBase):
-    """FastMCP argument model base that rejects undeclared tool arguments."""
+        class ForbidExtraArgModelBase(ArgModelBase):
+            """FastMCP argument model base that rejects undeclared tool arguments."""
 
-    model_config = ConfigDict(arbitrary_types_allowed=True, extra="forbid")
+            model_config = ConfigDict(arbitrary_types_allowed=True, extra="forbid")
+
+        _fastmcp_arg_model_bases.update({None: ArgModelBase, "allow": ExtraArgModelBase,
+                                         "forbid": ForbidExtraArgModelBase})
+    return _fastmcp_arg_model_bases.get(extra_mode, _fastmcp_arg_model_bases[None])
+
+
+def __getattr__(name):
+    if name in ("ExtraArgModelBase", "ForbidExtraArgModelBase"):
+        return _get_fastmcp_arg_model_base("allow" if name == "ExtraArgModelBase" else "forbid")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class UCTool(BaseTool):
@@ -119,6 +146,7 @@ class UCTool(BaseTool):
         description="Tool input paths used to serialize conflicting asynchronous calls."
     )
     _async_lock: asyncio.Lock = PrivateAttr(default=None)
+    _thread_lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
 
     @property
     def async_lock(self) -> asyncio.Lock:
@@ -214,22 +242,46 @@ class UCTool(BaseTool):
             status="error",
         )
 
-    def _get_call_locks(self, input) -> list[asyncio.Lock]:
+    def _get_call_lock_keys(self, input) -> list[str]:
         tool_arguments = self._tool_arguments(input)
         if not self.call_lock_arguments or not isinstance(tool_arguments, dict):
-            return [self.async_lock]
+            return []
         workspace = os.path.realpath(str(getattr(self, "workspace", "")))
         lock_keys = set()
         for argument in self.call_lock_arguments:
             value = tool_arguments.get(argument)
-            if isinstance(value, str) and value.strip():
-                lock_keys.add(os.path.realpath(os.path.join(workspace, value)))
+            # A list argument (e.g. batched edits) locks the paths of all its items
+            values = value if isinstance(value, list) else [value]
+            for value in values:
+                if isinstance(value, dict):
+                    value = value.get("path")
+                if isinstance(value, str) and value.strip():
+                    lock_keys.add(os.path.realpath(os.path.join(workspace, value)))
+        return sorted(lock_keys)
+
+    def _get_call_thread_locks(self, input) -> list[threading.RLock]:
+        """Thread counterpart of `_get_call_locks` for concurrent synchronous tool calls."""
+        lock_keys = self._get_call_lock_keys(input)
+        if not lock_keys:
+            return [self._thread_lock]
+        locks = []
+        with _keyed_thread_locks_guard:
+            for key in lock_keys:
+                lock = _keyed_thread_locks.get(key)
+                if lock is None:
+                    lock = threading.RLock()
+                    _keyed_thread_locks[key] = lock
+                locks.append(lock)
+        return locks
+
+    def _get_call_locks(self, input) -> list[asyncio.Lock]:
+        lock_keys = self._get_call_lock_keys(input)
         if not lock_keys:
             return [self.async_lock]
         loop_id = id(asyncio.get_running_loop())
         locks = []
         with _keyed_async_locks_guard:
-            for key in sorted(lock_keys):
+            for key in lock_keys:
                 registry_key = (loop_id, key)
                 lock = _keyed_async_locks.get(registry_key)
                 if lock is None:
@@ -239,6 +291,24 @@ class UCTool(BaseTool):
         return locks
 
     def invoke(self, input, config = None, **kwargs):
+        # Tool calls of one AI message may run in a thread pool: calls that
+        # share a lock key (same canonical path, or same tool without lock
+        # arguments) are serialized, the others run concurrently. Calls of a
+        # tool without lock arguments (e.g. RunTestCases) wait for each other
+        # without timeout, as if they ran one after another.
+        call_locks = self._get_call_thread_locks(input)
+        acquired_locks = []
+        deadline = time.monotonic() + self.lock_time_out
+        for call_lock in call_locks:
+            if call_lock is self._thread_lock:
+                call_lock.acquire()
+            elif not call_lock.acquire(timeout=max(0, deadline - time.monotonic())):
+                for acquired in reversed(acquired_locks):
+                    acquired.release()
+                error_msg = f"[ERROR] Tool ({self.__class__.__name__}) is busy, get lock timeout ({self.lock_time_out} seconds). Please try again later."
+                fc.warning(error_msg)
+                return self._error_output(input, error_msg)
+            acquired_locks.append(call_lock)
         self.call_count += 1
         self.is_in_call = True
         try:
@@ -250,11 +320,13 @@ class UCTool(BaseTool):
         finally:
             self.is_in_call = False
             self.last_call_time = time.time()
+            for call_lock in reversed(acquired_locks):
+                call_lock.release()
 
     def put_alive_data(self, data):
         self.stream_queue.put(data)
 
-    def __alive_loop(self, timeout: int, ctx: Context):
+    def __alive_loop(self, timeout: int, ctx: "Context"):
         import asyncio
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
@@ -265,7 +337,7 @@ class UCTool(BaseTool):
         finally:
             loop.close()
 
-    async def __async_alive_loop(self, timeout: int, ctx: Context):
+    async def __async_alive_loop(self, timeout: int, ctx: "Context"):
         self.is_alive_loop = True
         count_down = timeout
         while count_down > 0:
@@ -346,7 +418,7 @@ class UCTool(BaseTool):
         tool_input.pop("ctx", None)
         # Short file operations use path-scoped locks and do not need the shared
         # streaming heartbeat state, which would serialize unrelated paths.
-        if not isinstance(ctx, Context) or self.call_lock_arguments:
+        if not _is_mcp_context(ctx) or self.call_lock_arguments:
             try:
                 self.is_in_call = True
                 return await super().ainvoke(tool_input, config, **kwargs), None
@@ -418,8 +490,10 @@ class RoleInfo(UCTool):
             self.role_info = role_info
 
 
-def to_fastmcp(tool: BaseTool) -> FastMCPTool:
+def to_fastmcp(tool: BaseTool) -> "FastMCPTool":
     """Convert a LangChain tool to a FastMCP tool."""
+    from langchain_mcp_adapters.tools import _get_injected_args, create_model, FuncMetadata
+    from mcp.server.fastmcp.tools import Tool as FastMCPTool
     if not issubclass(tool.args_schema, BaseModel):
         raise ValueError(
             "Tool args_schema must be a subclass of pydantic.BaseModel. "
@@ -447,11 +521,7 @@ def to_fastmcp(tool: BaseTool) -> FastMCPTool:
             if parameters.get("description")
             else raw_parameters["description"]
         )
-    arg_model_base = ArgModelBase
-    if extra_mode == "allow":
-        arg_model_base = ExtraArgModelBase
-    elif extra_mode == "forbid":
-        arg_model_base = ForbidExtraArgModelBase
+    arg_model_base = _get_fastmcp_arg_model_base(extra_mode)
     arg_model = create_model(
         f"{tool.name}Arguments",
         **field_definitions,
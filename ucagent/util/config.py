@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import json
 import os
 import re
 import yaml
@@ -14,7 +16,7 @@ from .functions import (
     load_json_file,
     save_json_file,
 )
-from .log import info
+from .log import info, warning
 import base64
 
 
@@ -28,6 +30,18 @@ REQUIRED_RUNTIME_BOOL_OPTIONS = (
     "need_ref_model",
     "mock_components_enabled",
 )
+CONFIG_CACHE_VERSION = 2
+CONFIG_CACHE_MAX_ENTRIES = 128
+# Environment variables whose values are never written to the config cache
+_SECRET_ENV_PATTERN = re.compile(
+    r"(^|_)(API_?KEY|KEY|SECRET|SECRET_KEY|PASSWORD|PASSWD|CREDENTIALS?|(AUTH|ACCESS|API|BEARER)_TOKEN)$",
+    re.IGNORECASE,
+)
+# Config keys whose literal values keep a config out of the cache
+_SECRET_CONFIG_KEY_PATTERN = re.compile(
+    r"(api_?key|secret|password|passwd|credential|(auth|access|bearer)_token)", re.IGNORECASE)
+_SECRET_MARKER = "\x00UCSECRET{}\x00"
+_SECRET_MARKER_PATTERN = re.compile("\x00UCSECRET(\\d+)\x00")
 
 
 class UCAgentConfigLoader(yaml.SafeLoader):
@@ -593,35 +607,59 @@ def load_runtime_config(workspace: str) -> Dict[str, Any]:
     return validate_runtime_config(load_json_file(str(runtime_path)))
 
 
-def find_file_in_paths(filename, search_paths):
+def _probe_file(path, probes=None):
+    exists = os.path.isfile(path)
+    if probes is not None:
+        probes[os.path.abspath(path)] = exists
+    return exists
+
+
+def find_file_in_paths(filename, search_paths, probes=None):
     """
     Search for a file in a list of directories.
     :param filename: Name of the file to search for.
     :param search_paths: List of directories to search in.
+    :param probes: Optional dict to record {checked path: is file} in.
     :return: Full path to the file if found, otherwise None.
     """
     if filename.startswith('/'):
         # If the filename is an absolute path, return it directly
-        if os.path.isfile(filename):
+        if _probe_file(filename, probes):
             return filename
         else:
             return None
     for path in search_paths:
         full_path = os.path.join(path, filename)
-        if os.path.isfile(full_path):
+        if _probe_file(full_path, probes):
             return full_path
     return None
 
 
+class _SecretRecordingEnviron:
+    """os.environ for replace_bash_var that records the lookups of secret variables."""
+
+    def __init__(self, secrets):
+        self.secrets = secrets
+
+    def get(self, key, default=None):
+        value = os.environ.get(key, default)
+        if _SECRET_ENV_PATTERN.search(key):
+            self.secrets.setdefault((key, default), str(value))
+        return value
+
+
+def _render_config_file(file_path, secrets=None):
+    environ = os.environ if secrets is None else _SecretRecordingEnviron(secrets)
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return replace_bash_var(file.read(), environ)
+
+
 def load_yaml_with_env_vars(file_path):
     """Load YAML after environment-variable substitution.
 
     Supports negated boolean scalars like ``not true`` and ``-false``.
     """
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-        rendered_content = replace_bash_var(content, os.environ)
-        return yaml.load(rendered_content, Loader=UCAgentConfigLoader)
+    return yaml.load(_render_config_file(file_path), Loader=UCAgentConfigLoader)
 
 
 def _normalize_include_value(include_value, config_file):
@@ -637,15 +675,15 @@ def _normalize_include_value(include_value, config_file):
     return include_value
 
 
-def _resolve_include_file(include_file, parent_config_file):
+def _resolve_include_file(include_file, parent_config_file, probes=None):
     include_file = os.path.expanduser(include_file)
     if os.path.isabs(include_file):
-        if os.path.isfile(include_file):
+        if _probe_file(include_file, probes):
             return os.path.abspath(include_file)
         raise FileNotFoundError(f"Included config file '{include_file}' not found.")
 
     parent_dir = os.path.dirname(os.path.abspath(parent_config_file))
-    found_file = find_file_in_paths(include_file, [parent_dir, os.getcwd()])
+    found_file = find_file_in_paths(include_file, [parent_dir, os.getcwd()], probes)
     if found_file is not None:
         return os.path.abspath(found_file)
     raise FileNotFoundError(
@@ -654,7 +692,16 @@ def _resolve_include_file(include_file, parent_config_file):
     )
 
 
-def _merge_config_file(cfg, config_file, loaded_configs, loading_stack=None):
+class _ConfigSources:
+    """What a merged config depends on: the files it was built from and the other paths looked up."""
+
+    def __init__(self):
+        self.files = {}   # path -> SHA-256 of the content after environment-variable substitution
+        self.probes = {}  # path -> whether it was a file
+        self.secrets = {}  # (secret variable, default) -> substituted value
+
+
+def _merge_config_file(cfg, config_file, loaded_configs, loading_stack=None, sources=None):
     config_file = os.path.abspath(config_file)
     if config_file in loaded_configs:
         info(f"Config file '{config_file}' already loaded, ignore.")
@@ -667,13 +714,17 @@ def _merge_config_file(cfg, config_file, loaded_configs, loading_stack=None):
 
     loading_stack.append(config_file)
     try:
-        data = load_yaml_with_env_vars(config_file) or {}
+        content = _render_config_file(config_file, None if sources is None else sources.secrets)
+        if sources is not None:
+            sources.files[config_file] = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        data = yaml.load(content, Loader=UCAgentConfigLoader) or {}
         if not isinstance(data, dict):
             raise TypeError(f"Config file '{config_file}' must contain a YAML mapping.")
 
+        probes = sources.probes if sources is not None else None
         for include_file in _normalize_include_value(data.get("include"), config_file):
-            include_config_file = _resolve_include_file(include_file, config_file)
-            _merge_config_file(cfg, include_config_file, loaded_configs, loading_stack)
+            include_config_file = _resolve_include_file(include_file, config_file, probes)
+            _merge_config_file(cfg, include_config_file, loaded_configs, loading_stack, sources)
 
         cfg.merge_from_dict(data, skip_include=True)
         loaded_configs.append(config_file)
@@ -683,45 +734,252 @@ def _merge_config_file(cfg, config_file, loaded_configs, loading_stack=None):
         loading_stack.pop()
 
 
+def _config_cache_enabled():
+    return os.environ.get("UC_CONFIG_CACHE", "true").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _config_cache_path(config_file, cfg_override, workspace):
+    """Cache file of a get_config call, keyed by its arguments and the paths they are resolved against."""
+    from ucagent.version import __version__
+    key = repr((CONFIG_CACHE_VERSION, __version__, os.path.abspath(__file__), os.getcwd(),
+                os.path.expanduser('~'), config_file,
+                None if workspace is None else os.path.abspath(workspace), cfg_override))
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(os.path.expanduser('~'), ".ucagent", "config_cache", f"{digest}.json")
+
+
+def _config_cache_stale_reason(entry):
+    """Why a cache entry is outdated, None if every source file and probed path is unchanged."""
+    if not isinstance(entry, dict) or entry.get("version") != CONFIG_CACHE_VERSION:
+        return "cache format changed"
+    for path, exists in entry["probes"].items():
+        if os.path.isfile(path) != exists:
+            return f"'{path}' was {'removed' if exists else 'created'}"
+    for path, digest in entry["files"].items():
+        try:
+            content = _render_config_file(path)
+        except OSError:
+            return f"'{path}' cannot be read"
+        if hashlib.sha256(content.encode("utf-8")).hexdigest() != digest:
+            return f"'{path}' changed"
+    return None
+
+
+class _UncacheableConfig(ValueError):
+    """The config holds a value that cannot or must not be written to the cache."""
+
+
+def _is_secret_literal(key, value):
+    return isinstance(key, str) and isinstance(value, str) and bool(_SECRET_CONFIG_KEY_PATTERN.search(key)) \
+        and value.strip() != "" and "\x00UCSECRET" not in value and "$(" not in value \
+        and not re.fullmatch(r"\s*(\$\{?\w+\}?|[\[<].*[\]>])\s*", value)  # $VAR references, placeholders
+
+
+def _encode_cached_config(value, hide):
+    """
+    Encode a config tree as JSON data, keeping Config vs dict, tuple and key types.
+    :param hide: Function replacing secret values in a string by markers.
+    """
+    if isinstance(value, Config):
+        items = []
+        for key, item in value.__dict__.items():
+            if key in {"_freeze", "_loaded_config_files"}:
+                continue
+            encoded = _encode_cached_config(item, hide)
+            if _is_secret_literal(key, encoded):
+                raise _UncacheableConfig(f"'{key}' holds a literal secret")
+            items.append([key, encoded])
+        return {"c": items, "f": bool(value.__dict__.get("_freeze", False))}
+    if isinstance(value, dict):
+        items = []
+        for key, item in value.items():
+            encoded = _encode_cached_config(item, hide)
+            if _is_secret_literal(key, encoded):
+                raise _UncacheableConfig(f"'{key}' holds a literal secret")
+            items.append([_encode_cached_config(key, hide), encoded])
+        return {"d": items}
+    if isinstance(value, list):
+        return [_encode_cached_config(item, hide) for item in value]
+    if isinstance(value, tuple):
+        return {"t": [_encode_cached_config(item, hide) for item in value]}
+    if isinstance(value, str):
+        if "\x00UCSECRET" in value:
+            raise _UncacheableConfig("a value contains the secret marker")
+        return hide(value)
+    if value is None or isinstance(value, (bool, int, float)):
+        if hide(str(value)) != str(value):
+            raise _UncacheableConfig("a secret was parsed as a non-string value")
+        return value
+    raise _UncacheableConfig(f"values of type {type(value).__name__} are not cached")
+
+
+def _decode_cached_config(data, reveal):
+    if isinstance(data, list):
+        return [_decode_cached_config(item, reveal) for item in data]
+    if isinstance(data, str):
+        return reveal(data)
+    if not isinstance(data, dict):
+        return data
+    if "c" in data:
+        cfg = Config()
+        for key, item in data["c"]:
+            setattr(cfg, key, _decode_cached_config(item, reveal))
+        object.__setattr__(cfg, "_freeze", data["f"])
+        return cfg
+    if "d" in data:
+        return {_decode_cached_config(key, reveal): _decode_cached_config(item, reveal)
+                for key, item in data["d"]}
+    return tuple(_decode_cached_config(item, reveal) for item in data["t"])
+
+
+def _load_config_cache(cache_path):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        info(f"Config cache '{cache_path}' is unreadable ({e}), rebuild it.")
+        return None
+
+
+def _config_from_cache_entry(entry):
+    """The config of a fresh cache entry, with the secrets rendered from the environment again."""
+    values = [str(os.environ.get(var, default)) for var, default in entry["secrets"]]
+
+    def reveal(text):
+        if "\x00UCSECRET" not in text:
+            return text
+        return _SECRET_MARKER_PATTERN.sub(lambda m: values[int(m.group(1))], text)
+    cfg = _decode_cached_config(entry["config"], reveal)
+    object.__setattr__(cfg, "_loaded_config_files", list(entry["loaded_configs"]))
+    return cfg
+
+
+def _save_config_cache(cache_path, cfg, sources, loaded_configs):
+    secrets = [(key, value) for key, value in sources.secrets.items() if value]
+    markers = {value: _SECRET_MARKER.format(i) for i, (_, value) in enumerate(secrets)}
+    secret_pattern = re.compile("|".join(re.escape(v) for v in sorted(markers, key=len, reverse=True))) \
+        if markers else None
+
+    def hide(text):
+        return secret_pattern.sub(lambda m: markers[m.group(0)], text) if secret_pattern else text
+    try:
+        entry = {"version": CONFIG_CACHE_VERSION, "files": sources.files, "probes": sources.probes,
+                 "loaded_configs": list(loaded_configs), "secrets": [list(key) for key, _ in secrets],
+                 "config": _encode_cached_config(cfg, hide)}
+    except _UncacheableConfig as e:
+        info(f"Config is not cached: {e}.")
+        return
+    cache_dir = os.path.dirname(cache_path)
+    tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+    try:
+        # the cache stays private to the user, like the files it is built from should be
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        os.chmod(cache_dir, 0o700)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, cache_path)
+        entries = []
+        for item in os.scandir(cache_dir):
+            if item.name.endswith(".pkl"):
+                os.remove(item.path)  # caches of older versions, they may hold secrets
+            elif item.name.endswith(".json"):
+                entries.append(item)
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        for stale in entries[CONFIG_CACHE_MAX_ENTRIES:]:
+            os.remove(stale.path)
+    except Exception as e:
+        warning(f"Cannot write config cache '{cache_path}': {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def check_config_cache(config_file=None, cfg_override=None, workspace=None):
+    """
+    Check whether get_config with these arguments would be served from the cache, without building it.
+    :return: (is_fresh, reason)
+    """
+    if not _config_cache_enabled():
+        return False, "config cache is disabled (UC_CONFIG_CACHE)"
+    cache_path = _config_cache_path(config_file, cfg_override, workspace)
+    entry = _load_config_cache(cache_path)
+    if entry is None:
+        return False, f"no cache entry '{cache_path}'"
+    reason = _config_cache_stale_reason(entry)
+    if reason is not None:
+        return False, reason
+    return True, f"'{cache_path}' is up to date with {len(entry['files'])} config files"
+
+
 def get_config(config_file=None, cfg_override=None, workspace=None):
     """
     Get the configuration for the agent.
+    The merged config is cached as JSON in ~/.ucagent/config_cache (readable by the user only),
+    keyed by the arguments and checked against the content of every contributing file. Values of
+    secret variables (*_API_KEY, *_AUTH_TOKEN, ...) are not written, they are rendered from the
+    environment again on load, and a config with a literal secret is not cached at all
+    (set UC_CONFIG_CACHE=false to disable).
     :param config_file: Path to the configuration file.
     :return: Configuration dictionary.
     """
+    if not _config_cache_enabled():
+        return _build_config(config_file, cfg_override, workspace)
+    cache_path = _config_cache_path(config_file, cfg_override, workspace)
+    entry = _load_config_cache(cache_path)
+    if entry is not None:
+        reason = _config_cache_stale_reason(entry)
+        if reason is None:
+            cfg = _config_from_cache_entry(entry)
+            info(f"Load config from cache '{cache_path}' ({len(entry['files'])} config files unchanged).")
+            return cfg
+        info(f"Config cache is outdated: {reason}, rebuild it.")
+    sources = _ConfigSources()
+    cfg = _build_config(config_file, cfg_override, workspace, sources)
+    _save_config_cache(cache_path, cfg, sources, cfg._loaded_config_files)
+    return cfg
+
+
+def _build_config(config_file=None, cfg_override=None, workspace=None, sources=None):
+    """
+    Merge the default, user, language, workspace and given config files and apply the overrides.
+    :param sources: Optional _ConfigSources to record the files and paths the config depends on.
+    """
     # ignore repeated loaded configs
     loaded_configs = []
+    probes = sources.probes if sources is not None else None
 
     # 1. load default config
     default_config_file = os.path.abspath(os.path.join(os.path.dirname(__file__), "../setting.yaml"))
     assert os.path.isfile(default_config_file), f"Default configuration file '{default_config_file}' not found."
     cfg = Config()
-    _merge_config_file(cfg, default_config_file, loaded_configs)
+    _merge_config_file(cfg, default_config_file, loaded_configs, sources=sources)
 
     # 2. load user config
     user_home = os.path.expanduser('~')
     user_config_file = os.path.abspath(os.path.join(user_home, '.ucagent/setting.yaml'))
-    if os.path.isfile(user_config_file):
-        _merge_config_file(cfg, user_config_file, loaded_configs)
-    else:
+    if not os.path.isfile(user_config_file):
+        # created before it is probed, so the cache entry of this build stays valid
         info(f"User config file '{user_config_file}' not found, touch an empty one.")
         os.makedirs(os.path.dirname(user_config_file), exist_ok=True)
         with open(user_config_file, 'w') as f:
             f.write("# UCAgent user configuration file\n")
-        loaded_configs.append(user_config_file)
+    if _probe_file(user_config_file, probes):
+        _merge_config_file(cfg, user_config_file, loaded_configs, sources=sources)
 
     # 3. load lang config
     lang = cfg.get_value('lang', 'zh')
     lang_config_file = os.path.abspath(os.path.join(os.path.dirname(__file__), f"../lang/{lang}/config/default.yaml"))
     info(f"Load config from '{lang_config_file}'")
     assert os.path.isfile(lang_config_file), f"Language configuration file '{lang_config_file}' not found."
-    _merge_config_file(cfg, lang_config_file, loaded_configs)
+    _merge_config_file(cfg, lang_config_file, loaded_configs, sources=sources)
 
     # 4. load workspace config
     if workspace is not None:
         cwd_setting_file = get_abs_path_cwd_ucagent(workspace, "setting.yaml")
-        if os.path.isfile(cwd_setting_file):
-            _merge_config_file(cfg, cwd_setting_file, loaded_configs)
+        if _probe_file(cwd_setting_file, probes):
+            _merge_config_file(cfg, cwd_setting_file, loaded_configs, sources=sources)
         else:
             info(f"Workspace config file '{cwd_setting_file}' not found, ignore.")
 
@@ -732,14 +990,14 @@ def get_config(config_file=None, cfg_override=None, workspace=None):
     user_config_file_path = find_file_in_paths(target_file, [os.getcwd(),
                                                              os.path.join(user_home, '.ucagent/'),
                                                              os.path.join(os.path.dirname(__file__), f"../lang/{lang}/config/")
-                                                      ])
+                                                      ], probes)
     if config_file is not None:
         assert user_config_file_path is not None, f"Config file '{config_file}' not found in current directory or default config path."
     if user_config_file_path is None:
         info(f"Default user config file '{config_file}' not found, ignore.")
     else:
         user_config_file_path = os.path.abspath(user_config_file_path)
-        _merge_config_file(cfg, user_config_file_path, loaded_configs)
+        _merge_config_file(cfg, user_config_file_path, loaded_configs, sources=sources)
 
     # set override values
     cfg.set_values(cfg_override)
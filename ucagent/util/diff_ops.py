@@ -73,6 +73,32 @@ def append_ignore_file(path: str, patterns: list[str]) -> None:
             gitignore_file.write(f"{pattern}\n")
 
 
+def _ensure_user_config(repo) -> None:
+    """Set a default git user if the repository has none, so commits can be written."""
+    config_reader = repo.config_reader()
+    try:
+        try:
+            user_name = config_reader.get_value("user", "name")
+        except:
+            user_name = None
+        try:
+            user_email = config_reader.get_value("user", "email")
+        except:
+            user_email = None
+    finally:
+        config_reader.release()
+    if user_name and user_email:
+        return
+    config_writer = repo.config_writer()
+    try:
+        if not user_name:
+            config_writer.set_value("user", "name", "UCAgent")
+        if not user_email:
+            config_writer.set_value("user", "email", "ucagent@localhost")
+    finally:
+        config_writer.release()
+
+
 def git_add_and_commit(path: str, message: str, target_suffix_list: list = ["*"]) -> str:
     """Add all changes and commit in the Git repository at the given path.
 
@@ -87,27 +113,7 @@ def git_add_and_commit(path: str, message: str, target_suffix_list: list = ["*"]
     try:
         with _open_repo(path) as repo:
             # Check and set default git user config if not configured
-            config_reader = repo.config_reader()
-            try:
-                try:
-                    user_name = config_reader.get_value("user", "name")
-                except:
-                    user_name = None
-                try:
-                    user_email = config_reader.get_value("user", "email")
-                except:
-                    user_email = None
-            finally:
-                config_reader.release()
-            # Set default values if not configured
-            config_writer = repo.config_writer()
-            try:
-                if not user_name:
-                    config_writer.set_value("user", "name", "UCAgent")
-                if not user_email:
-                    config_writer.set_value("user", "email", "ucagent@localhost")
-            finally:
-                config_writer.release()
+            _ensure_user_config(repo)
             if target_suffix_list == ["*"]:
                 repo.git.add(all=True)
             else:
@@ -125,6 +131,75 @@ def git_add_and_commit(path: str, message: str, target_suffix_list: list = ["*"]
         raise ValueError(f"The path '{path}' is not a valid Git repository.")
 
 
+def _chunks(items: list, size: int = 512):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def git_commit_paths(path: str, message: str, changed_paths) -> str:
+    """Commit the changes of the given paths only, without scanning the whole work tree.
+
+    The index entries of the paths are updated with `git update-index`, then the
+    commit is written with `git write-tree`, `git commit-tree` and `git update-ref`.
+    Changes outside `changed_paths` are not committed. Without a HEAD commit it falls
+    back to git_add_and_commit.
+
+    Args:
+        path (str): The file system path of the Git repository.
+        message (str): The commit message.
+        changed_paths (iterable): Repository relative paths of added, modified or removed
+            files or directories.
+
+    Returns:
+        str: The commit hash (new commit if changes were made, current HEAD otherwise).
+    """
+    try:
+        with _open_repo(path) as repo:
+            try:
+                head = repo.head.commit
+            except ValueError:
+                head = None
+            if head is None:
+                return git_add_and_commit(path, message)
+            _ensure_user_config(repo)
+            work_tree = repo.working_tree_dir
+            paths = sorted({os.path.normpath(p).replace(os.sep, "/") for p in changed_paths})
+            paths = [p for p in paths if p not in (".", "") and not p.startswith("../")]
+            if not paths:
+                return head.hexsha
+            files, dirs = [], []
+            for p in paths:
+                full_path = os.path.join(work_tree, p)
+                if os.path.isfile(full_path):
+                    files.append(p)
+                elif os.path.isdir(full_path):
+                    dirs.append(p)
+            for chunk in _chunks(files):
+                ignored = set(repo.ignored(*chunk))
+                chunk = [p for p in chunk if p not in ignored]
+                if chunk:
+                    repo.git.update_index("--add", "--", *chunk)
+            for chunk in _chunks(dirs):
+                repo.git.add("--all", "--", *chunk)
+            # Index entries of removed files, or below paths that are no longer directories
+            stale = []
+            for chunk in _chunks(paths):
+                for tracked in repo.git.ls_files("-z", "--", *chunk).split("\0"):
+                    if tracked and not os.path.isfile(os.path.join(work_tree, tracked)):
+                        stale.append(tracked)
+            for chunk in _chunks(stale):
+                repo.git.update_index("--force-remove", "--", *chunk)
+            tree = repo.git.write_tree()
+            if tree == head.tree.hexsha:
+                return head.hexsha
+            commit = repo.git.commit_tree(tree, "-p", head.hexsha, "-m", message)
+            repo.git.update_ref("-m", f"commit: {message.splitlines()[0] if message else ''}",
+                                "HEAD", commit, head.hexsha)
+            return commit
+    except git.exc.InvalidGitRepositoryError:
+        raise ValueError(f"The path '{path}' is not a valid Git repository.")
+
+
 def has_untracked_files(path: str) -> bool:
     """Check if the Git repository at the given path has untracked files.
 
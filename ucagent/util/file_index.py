@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""In-process index of the files of a workspace.
+
+The index keeps the listing of every directory below the workspace (name,
+type, size, mtime) so glob/regex lookups and directory walks do not list the
+tree again on every call. It is kept fresh by inotify on Linux: pending events
+are applied before each lookup, so a file created just before a lookup is
+always seen. Where inotify is not available (or runs out of watches) the
+directory mtimes are compared on each lookup instead, and the whole tree is
+rescanned every `rescan_interval` seconds in both modes.
+
+Directories in `ignore_dirs` (relative to the workspace), and symbolic links
+to directories, are listed but not indexed: lookups that need their content
+fall back to the file system. Name lookups over the whole index
+(`index_find_by_regex`) do not fall back, so they never return files below
+`.git` or `.ucagent`.
+In directory mtime mode, editing a file in place does not change the mtime of
+its directory: the listing (names) stays exact, but the size and mtime kept for
+that file are only refreshed by the next rescan.
+
+Lookups can be disabled with `tools.file_index.enable` in setting.yaml
+(env UC_FILE_INDEX), applied by `set_file_index_enabled`.
+"""
+
+import atexit
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import glob
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from ucagent.util.log import info, warning
+
+DEFAULT_IGNORE_DIRS = (".git", ".ucagent")
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_DONT_FOLLOW = 0x02000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE |
+               _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR | _IN_DONT_FOLLOW)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class IndexMiss(Exception):
+    """The lookup needs a directory the index does not cover."""
+
+
+class _Inotify:
+    """Minimal non-blocking inotify binding (Linux only)."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(_WATCH_MASK))
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f"inotify_add_watch {path}: {os.strerror(code)}")
+        return wd
+
+    def rm_watch(self, wd: int):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Yield (wd, mask, name) of all pending events."""
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class WorkspaceFileIndex:
+    """File index of one workspace, use `WorkspaceFileIndex.get(workspace)` to share it."""
+
+    _indexes = OrderedDict()
+    _indexes_lock = threading.Lock()
+    max_indexes = 8
+
+    def __init__(self, workspace: str, ignore_dirs=DEFAULT_IGNORE_DIRS, rescan_interval: float = 300.0,
+                 use_inotify: bool = True):
+        self.workspace = os.path.abspath(workspace)
+        self.ignore_dirs = {os.path.normpath(d) for d in ignore_dirs}
+        self.rescan_interval = rescan_interval
+        self.use_inotify = use_inotify
+        self.lock = threading.RLock()
+        # relative dir ("" is the workspace) -> OrderedDict(name -> (is_dir, is_link, size, mtime_ns))
+        self.dirs = {}
+        self.dir_mtimes = {}
+        self.inotify = None
+        self.watches = {}      # wd -> relative dir
+        self.dir_watches = {}  # relative dir -> wd
+        self.last_scan = 0.0
+        self.stats = {"scans": 0, "dir_rescans": 0, "lookups": 0, "fallbacks": 0}
+        # bumped whenever an indexed entry changes, see get_generation
+        self.generation = 0
+
+    @classmethod
+    def get(cls, workspace: str) -> "WorkspaceFileIndex":
+        key = os.path.abspath(workspace)
+        with cls._indexes_lock:
+            index = cls._indexes.get(key)
+            if index is None:
+                index = cls._indexes[key] = cls(key)
+            cls._indexes.move_to_end(key)
+            while len(cls._indexes) > cls.max_indexes:
+                cls._indexes.popitem(last=False)[1].close()
+            return index
+
+    @classmethod
+    def close_all(cls):
+        with cls._indexes_lock:
+            for index in cls._indexes.values():
+                index.close()
+            cls._indexes.clear()
+
+    def close(self):
+        with self.lock:
+            if self.inotify is not None:
+                self.inotify.close()
+                self.inotify = None
+            self.watches.clear()
+            self.dir_watches.clear()
+            self.dirs.clear()
+            self.dir_mtimes.clear()
+            self.last_scan = 0.0
+
+    # -- scanning ---------------------------------------------------------
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.workspace, rel) if rel else self.workspace
+
+    def _is_indexed_dir(self, rel: str, entry) -> bool:
+        return entry[0] and not entry[1] and rel not in self.ignore_dirs
+
+    def _watch(self, rel: str):
+        if self.inotify is None or rel in self.dir_watches:
+            return
+        try:
+            wd = self.inotify.add_watch(self._abs(rel))
+        except OSError as e:
+            if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                return
+            warning(f"File index of {self.workspace} stops using inotify: {e}")
+            self.inotify.close()
+            self.inotify = None
+            self.watches.clear()
+            self.dir_watches.clear()
+            return
+        self.watches[wd] = rel
+        self.dir_watches[rel] = wd
+
+    def _unwatch(self, rel: str):
+        wd = self.dir_watches.pop(rel, None)
+        if wd is not None:
+            self.watches.pop(wd, None)
+            if self.inotify is not None:
+                self.inotify.rm_watch(wd)
+
+    def _drop_tree(self, rel: str):
+        prefix = rel + os.sep
+        for d in [d for d in self.dirs if d == rel or d.startswith(prefix)]:
+            del self.dirs[d]
+            self.dir_mtimes.pop(d, None)
+            self._unwatch(d)
+
+    def _scan_dir(self, rel: str, recursive: bool):
+        """(Re)list one directory, index new subdirectories and drop removed ones."""
+        self._watch(rel)  # watch before listing, so no change is lost in between
+        path = self._abs(rel)
+        entries = OrderedDict()
+        try:
+            dir_mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_link = entry.is_symlink()
+                        is_dir = entry.is_dir()
+                        st = entry.stat(follow_symlinks=False)
+                        entries[entry.name] = (is_dir, is_link, st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            self._drop_tree(rel)
+            return
+        old = self.dirs.get(rel, {})
+        self.dirs[rel] = entries
+        self.dir_mtimes[rel] = dir_mtime
+        self.stats["dir_rescans"] += 1
+        if entries != old:
+            self.generation += 1
+        for name, entry in old.items():
+            sub = os.path.join(rel, name) if rel else name
+            if self._is_indexed_dir(sub, entry) and not (
+                    name in entries and self._is_indexed_dir(sub, entries[name])):
+                self._drop_tree(sub)
+        for name, entry in entries.items():
+            sub = os.path.join(rel, name) if rel else name
+            if self._is_indexed_dir(sub, entry) and (recursive or sub not in self.dirs):
+                self._scan_dir(sub, True)
+
+    def _full_scan(self):
+        start = time.monotonic()
+        self.close()
+        if self.use_inotify:
+            try:
+                self.inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                self.inotify = None
+                info(f"File index of {self.workspace} uses directory mtimes ({e})")
+        self._scan_dir("", True)
+        self.last_scan = time.monotonic()
+        self.stats["scans"] += 1
+        info(f"Indexed {len(self.dirs)} directories of {self.workspace} in "
+             f"{(self.last_scan - start) * 1000:.0f} ms (inotify: {self.inotify is not None})")
+
+    def refresh(self):
+        """Apply the pending changes, called before each lookup."""
+        with self.lock:
+            if not self.dirs or time.monotonic() - self.last_scan > self.rescan_interval:
+                self._full_scan()
+                return
+            dirty = set()
+            if self.inotify is not None:
+                for wd, mask, name in self.inotify.read_events():
+                    if mask & _IN_Q_OVERFLOW:
+                        self._full_scan()
+                        return
+                    rel = self.watches.get(wd)
+                    if rel is None:
+                        continue
+                    if mask & _IN_IGNORED:
+                        self.watches.pop(wd, None)
+                        if self.dir_watches.get(rel) == wd:
+                            del self.dir_watches[rel]
+                        continue
+                    if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                        rel = os.path.dirname(rel) if rel else rel
+                    dirty.add(rel)
+            else:
+                for rel, mtime in list(self.dir_mtimes.items()):
+                    try:
+                        if os.stat(self._abs(rel)).st_mtime_ns != mtime:
+                            dirty.add(rel)
+                    except OSError:
+                        dirty.add(os.path.dirname(rel) if rel else rel)
+            for rel in sorted(dirty, key=len):
+                if rel in self.dirs:
+                    self._scan_dir(rel, False)
+
+    # -- lookups ----------------------------------------------------------
+
+    def _rel(self, path: str) -> str:
+        """Relative path of an absolute path in the workspace, raise IndexMiss if outside."""
+        path = os.path.abspath(path)
+        if path == self.workspace:
+            return ""
+        if not path.startswith(self.workspace + os.sep):
+            raise IndexMiss(path)
+        return path[len(self.workspace) + 1:]
+
+    def _listing(self, rel: str):
+        """Entries of a directory, None if it does not exist, raise IndexMiss if not indexed."""
+        entries = self.dirs.get(rel)
+        if entries is not None:
+            return entries
+        parent, name = os.path.split(rel)
+        if rel and name and name not in (".", ".."):
+            parent_entries = self._listing(parent)
+            if parent_entries is None:
+                return None
+            entry = parent_entries.get(name)
+            if entry is None or not entry[0]:
+                return None
+        raise IndexMiss(rel)
+
+    def _lexists(self, rel: str) -> bool:
+        parent, name = os.path.split(rel)
+        if not name:
+            return self._isdir(parent)
+        entries = self._listing(parent)
+        return entries is not None and name in entries
+
+    def _isdir(self, rel: str) -> bool:
+        rel = rel.rstrip(os.sep)
+        if not rel:
+            return True
+        parent, name = os.path.split(rel)
+        entries = self._listing(parent)
+        return entries is not None and name in entries and entries[name][0]
+
+    def _listdir(self, rel: str, dironly: bool) -> list:
+        if rel and not self._isdir(rel):
+            return []
+        entries = self._listing(rel.rstrip(os.sep))
+        if entries is None:
+            return []
+        return [name for name, entry in entries.items() if not dironly or entry[0]]
+
+    def _glob0(self, rel, basename, dironly):
+        if basename:
+            return [basename] if self._lexists(os.path.join(rel, basename)) else []
+        return [basename] if self._isdir(rel) else []
+
+    def _glob1(self, rel, pattern, dironly):
+        names = self._listdir(rel, dironly)
+        if not pattern.startswith("."):
+            names = [x for x in names if not x.startswith(".")]
+        return fnmatch.filter(names, pattern)
+
+    def _glob2(self, rel, pattern, dironly):
+        yield pattern[:0]
+        yield from self._rlistdir(rel, dironly)
+
+    def _rlistdir(self, rel, dironly):
+        for name in self._listdir(rel, dironly):
+            if not name.startswith("."):
+                yield name
+                path = os.path.join(rel, name) if rel else name
+                for sub in self._rlistdir(path, dironly):
+                    yield os.path.join(name, sub)
+
+    def _iglob(self, pathname, dironly):
+        # Mirrors glob._iglob with recursive=True on the workspace listing
+        dirname, basename = os.path.split(pathname)
+        if not glob.has_magic(pathname):
+            if basename:
+                if self._lexists(pathname):
+                    yield pathname
+            elif self._isdir(dirname):
+                yield pathname
+            return
+        if not dirname:
+            if basename == "**":
+                yield from self._glob2("", basename, dironly)
+            else:
+                yield from self._glob1("", basename, dironly)
+            return
+        if dirname != pathname and glob.has_magic(dirname):
+            dirs = self._iglob(dirname, True)
+        else:
+            dirs = [dirname]
+        if glob.has_magic(basename):
+            glob_in_dir = self._glob2 if basename == "**" else self._glob1
+        else:
+            glob_in_dir = self._glob0
+        for dirname in dirs:
+            for name in glob_in_dir(dirname, basename, dironly):
+                yield os.path.join(dirname, name)
+
+    def glob(self, pattern: str) -> list:
+        """
+        Paths (relative to the workspace) matching a glob pattern relative to the workspace,
+        like glob.glob(os.path.join(workspace, pattern), recursive=True).
+        :raise IndexMiss: the pattern needs a directory the index does not cover.
+        """
+        if not pattern or os.path.isabs(pattern) or \
+           any(p in (".", "..") for p in pattern.split(os.sep)[:-1]) or os.sep * 2 in pattern:
+            raise IndexMiss(pattern)
+        self.refresh()
+        with self.lock:
+            self.stats["lookups"] += 1
+            if pattern.split(os.sep)[-1] in (".", ".."):
+                raise IndexMiss(pattern)
+            return list(self._iglob(pattern, False))
+
+    def iter_files(self):
+        """Yield (relative dir, file name) of all indexed files (including links to files)."""
+        self.refresh()
+        with self.lock:
+            self.stats["lookups"] += 1
+            items = [(rel, name) for rel, entries in self.dirs.items()
+                     for name, entry in entries.items() if not entry[0]]
+        yield from items
+
+    def walk(self, top: str):
+        """
+        Like os.walk(top) (top-down, symbolic links to directories are not followed)
+        on the indexed listing. Changes of the yielded dirs list prune the walk.
+        :raise IndexMiss: top is not an indexed directory (raised before the first item).
+        """
+        rel = self._rel(top)
+        self.refresh()
+        with self.lock:
+            self.stats["lookups"] += 1
+            if rel not in self.dirs:
+                raise IndexMiss(top)
+        return self._walk(top, rel)
+
+    def _walk(self, top, rel):
+        with self.lock:
+            entries = self.dirs.get(rel)
+            if entries is None:
+                return
+            dirs = [n for n, e in entries.items() if e[0]]
+            files = [n for n, e in entries.items() if not e[0]]
+            links = {n for n, e in entries.items() if e[0] and e[1]}
+        yield top, dirs, files
+        for name in dirs:
+            if name in links:
+                continue
+            sub = os.path.join(rel, name) if rel else name
+            path = os.path.join(top, name)
+            if sub in self.dirs:
+                yield from self._walk(path, sub)
+            elif os.path.isdir(path):  # an ignored directory
+                yield from os.walk(path)
+
+    def get_entry(self, path: str):
+        """(is_dir, is_link, size, mtime_ns) of an absolute path as last indexed, None if unknown."""
+        try:
+            rel = self._rel(path)
+            self.refresh()
+            with self.lock:
+                entries = self._listing(os.path.dirname(rel))
+        except IndexMiss:
+            return None
+        return entries.get(os.path.basename(rel)) if entries else None
+
+    def get_generation(self):
+        """
+        Counter of the changes seen in the workspace, to validate results derived from it.
+        Indexed entries carry size and mtime, so with inotify an in place content change
+        also changes it; in the directory mtime mode only added, removed and renamed
+        entries are reliably seen.
+        :return: (generation, watches_file_content)
+        """
+        self.refresh()
+        with self.lock:
+            return self.generation, self.inotify is not None
+
+    def get_statistics(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["dirs"] = len(self.dirs)
+            stats["inotify"] = self.inotify is not None
+            return stats
+
+
+atexit.register(WorkspaceFileIndex.close_all)
+
+
+def index_glob(workspace: str, pattern: str):
+    """Glob through the workspace file index, None if the index cannot answer."""
+    if not _enabled:
+        return None
+    index = WorkspaceFileIndex.get(workspace)
+    try:
+        return index.glob(pattern)
+    except IndexMiss:
+        index.stats["fallbacks"] += 1
+        return None
+
+
+def index_walk(top: str, workspace: str):
+    """os.walk(top) through the workspace file index, falling back to os.walk."""
+    if _enabled:
+        index = WorkspaceFileIndex.get(workspace)
+        try:
+            return index.walk(top)
+        except IndexMiss:
+            index.stats["fallbacks"] += 1
+    return os.walk(top)
+
+
+def index_generation(workspace: str):
+    """WorkspaceFileIndex.get_generation of a workspace, None if the index is disabled."""
+    if not _enabled:
+        return None
+    return WorkspaceFileIndex.get(workspace).get_generation()
+
+
+def index_find_by_regex(workspace: str, regex: "re.Pattern"):
+    """Relative paths of the indexed files whose name matches regex (search), None if disabled."""
+    if not _enabled:
+        return None
+    return [os.path.join(rel, name) if rel else name
+            for rel, name in WorkspaceFileIndex.get(workspace).iter_files() if regex.search(name)]
+
+
+_enabled = os.environ.get("UC_FILE_INDEX", "true").strip().lower() not in ("0", "false", "no", "off")
+
+
+def set_file_index_enabled(enabled: bool):
+    """Enable or disable index lookups (disabled lookups use the file system directly)."""
+    global _enabled
+    _enabled = bool(enabled)
+    if not _enabled:
+        WorkspaceFileIndex.close_all()
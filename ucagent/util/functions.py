@@ -20,7 +20,8 @@ from ucagent.util.bug_analysis_contract import (
     WAVEFORM_LLM_ANALYSIS_FIELDS,
     WAVEFORM_REFERENCE_MARKER,
 )
-from ucagent.util.log import info, warning
+from ucagent.util.log import info, warning, debug
+from ucagent.util.file_index import index_find_by_regex, index_glob
 import os
 from typing import List, Tuple, Union
 import json
@@ -37,6 +38,9 @@ import yaml
 from collections import OrderedDict
 import traceback
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import selectors
 import signal
 import textwrap
@@ -257,6 +261,95 @@ def nested_keys_as_list(
     return ret_data, broken_leaf, ret_lblock
 
 
+_DOC_MODEL_CACHE_SIZE = 64
+_doc_model_cache = OrderedDict()
+_doc_model_cache_lock = threading.Lock()
+
+
+class DocModel:
+    """
+    Parsed view of a documentation file (e.g. the functional spec with <FG-*>, <FC-*>, <CK-*>,
+    <BG-*> and <TC-*> tags), shared by the doc mark checkers and tools. The tag trees
+    (with line positions) and the mark lists are computed on first use and kept with the model.
+    """
+
+    def __init__(self, path: str, signature: tuple, text: str):
+        self.path = path
+        self.signature = signature
+        self.text = text
+        self.lines = text.splitlines()
+        self.raw_lines = text.split("\n")
+        self.memo = {}
+        self.lock = threading.RLock()
+
+    def get_memo(self, key: tuple, build):
+        """Return the memoized result of build(), errors are memoized and raised again."""
+        with self.lock:
+            if key not in self.memo:
+                try:
+                    self.memo[key] = (True, build())
+                except Exception as e:
+                    self.memo[key] = (False, e)
+            ok, value = self.memo[key]
+        if not ok:
+            raise value
+        return value
+
+
+def _file_signature(path: str) -> tuple:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def get_doc_model(path: str) -> DocModel:
+    """
+    Get the parsed model of a documentation file, cached per file by mtime/size.
+    :param path: Path to the documentation file.
+    :return: The document model, callers must not modify it.
+    """
+    real_path = os.path.realpath(path)
+    signature = _file_signature(real_path)
+    with _doc_model_cache_lock:
+        model = _doc_model_cache.get(real_path)
+        if model is not None and model.signature == signature:
+            _doc_model_cache.move_to_end(real_path)
+            return model
+    with open(real_path, "r") as f:
+        text = f.read()
+    model = DocModel(real_path, signature, text)
+    with _doc_model_cache_lock:
+        _doc_model_cache[real_path] = model
+        _doc_model_cache.move_to_end(real_path)
+        while len(_doc_model_cache) > _DOC_MODEL_CACHE_SIZE:
+            _doc_model_cache.popitem(last=False)
+    return model
+
+
+def invalidate_doc_model(path: str = None):
+    """
+    Drop the cached document models of a file, or of all files below a directory.
+    :param path: File or directory path, None to drop all models.
+    """
+    with _doc_model_cache_lock:
+        if path is None:
+            _doc_model_cache.clear()
+            return
+        real_path = os.path.realpath(path)
+        for key in [k for k in _doc_model_cache if k == real_path or k.startswith(real_path + os.sep)]:
+            del _doc_model_cache[key]
+
+
+def doc_model_write_callback(workspace: str):
+    """
+    Create a write tool callback (success, path, msg) that drops the document models of changed files.
+    :param workspace: The workspace directory the tool paths are relative to.
+    """
+    def on_file_changed(success, path, msg):
+        if success and isinstance(path, str):
+            invalidate_doc_model(os.path.join(workspace, path))
+    return on_file_changed
+
+
 def parse_nested_keys(
     target_file: str,
     keyname_list: List[str],
@@ -265,7 +358,28 @@ def parse_nested_keys(
     ignore_chars: List[str] = ["<", ">"],
 ) -> dict:
     """Parse the function points and checkpoints from a file."""
+    return copy.deepcopy(_get_nested_keys(target_file, keyname_list, prefix_list, subfix_list, ignore_chars))
+
+
+def _get_nested_keys(target_file, keyname_list, prefix_list, subfix_list, ignore_chars=["<", ">"]) -> dict:
+    """parse_nested_keys on the cached document model, the result is shared and must not be modified."""
     assert os.path.exists(target_file), f"File {target_file} does not exist. You need to provide a valid file path."
+    return _doc_model_nested_keys(get_doc_model(target_file), keyname_list, prefix_list, subfix_list, ignore_chars)
+
+
+def _doc_model_nested_keys(model, keyname_list, prefix_list, subfix_list, ignore_chars=["<", ">"]) -> dict:
+    key = ("nested_keys", tuple(keyname_list), tuple(prefix_list), tuple(subfix_list), tuple(ignore_chars))
+    return model.get_memo(key, lambda: _parse_nested_keys_lines(
+        model.raw_lines, keyname_list, prefix_list, subfix_list, ignore_chars))
+
+
+def _parse_nested_keys_lines(
+    lines: List[str],
+    keyname_list: List[str],
+    prefix_list: List[str],
+    subfix_list: List[str],
+    ignore_chars: List[str],
+) -> dict:
     assert len(keyname_list) > 0, "Prefix must be provided."
     assert "line" not in keyname_list, "'line' is a reserved key name."
     assert len(prefix_list) == len(subfix_list), "Prefix and subfix lists must have the same length."
@@ -280,40 +394,38 @@ def parse_nested_keys(
         if pre_values[i - 1] is None:
             return None, nkey
         return pre_values[i - 1][keyname_list[i]], nkey
-    with open(target_file, 'r') as f:
-        index = 1
-        lines = f.readlines()
-        pre_pod = {}
-        for line in lines:
-            line = str_remove_blank(line.strip())
-            for i, key in enumerate(keyname_list):
-                prefix = prefix_list[i]
-                subfix = subfix_list[i]
-                pre_key = keyname_list[i - 1] if i > 0 else None
-                pre_prf = prefix_list[i - 1] if i > 0 else None
-                if not prefix in line:
-                    continue
-                # find prefix+*+subfix in line
-                assert line.count(prefix) == 1, f"At line ({index}): '{line}' should contain exactly one {key} '{prefix}'"
-                current_key = rm_blank_in_str(str_replace_to(get_sub_str(line, prefix, subfix), ignore_chars, ""))
-                pod, next_key = get_pod_next_key(i)
-                # Enhanced error message with context
-                if pod is None:
-                    raise ValueError(
-                        f"At line ({index}): Found {key} tag '{prefix}' but its parent {pre_key} tag '{pre_prf}' "
-                        f"was not found in previous lines. Please ensure proper nesting: each '{prefix}' must be "
-                        f"preceded by a '{pre_prf}' tag.\nCurrent line content: {line}"
-                    )
-                assert current_key not in pod, f"At line ({index}): '{current_key}' is defined multiple times."
-                pline = pre_pod.get("line", index - 5) # default 5 lines before if no previous pod
-                pod[current_key] = {"line": index, "pline": pline, "nline": index + 5} # default 5 more lines for a node
-                if pre_pod:
-                    pre_pod["nline"] = index
-                pre_pod = pod[current_key]
-                if next_key is not None:
-                    pod[current_key][next_key] = {}
-                pre_values[i] = pod[current_key]
-            index += 1
+    index = 1
+    pre_pod = {}
+    for line in lines:
+        line = str_remove_blank(line.strip())
+        for i, key in enumerate(keyname_list):
+            prefix = prefix_list[i]
+            subfix = subfix_list[i]
+            pre_key = keyname_list[i - 1] if i > 0 else None
+            pre_prf = prefix_list[i - 1] if i > 0 else None
+            if not prefix in line:
+                continue
+            # find prefix+*+subfix in line
+            assert line.count(prefix) == 1, f"At line ({index}): '{line}' should contain exactly one {key} '{prefix}'"
+            current_key = rm_blank_in_str(str_replace_to(get_sub_str(line, prefix, subfix), ignore_chars, ""))
+            pod, next_key = get_pod_next_key(i)
+            # Enhanced error message with context
+            if pod is None:
+                raise ValueError(
+                    f"At line ({index}): Found {key} tag '{prefix}' but its parent {pre_key} tag '{pre_prf}' "
+                    f"was not found in previous lines. Please ensure proper nesting: each '{prefix}' must be "
+                    f"preceded by a '{pre_prf}' tag.\nCurrent line content: {line}"
+                )
+            assert current_key not in pod, f"At line ({index}): '{current_key}' is defined multiple times."
+            pline = pre_pod.get("line", index - 5) # default 5 lines before if no previous pod
+            pod[current_key] = {"line": index, "pline": pline, "nline": index + 5} # default 5 more lines for a node
+            if pre_pod:
+                pre_pod["nline"] = index
+            pre_pod = pod[current_key]
+            if next_key is not None:
+                pod[current_key][next_key] = {}
+            pre_values[i] = pod[current_key]
+        index += 1
     return key_dict
 
 
@@ -392,6 +504,100 @@ def load_ucagent_info(workspace) -> dict:
     return load_json_file(info_path)
 
 
+_TOFFEE_REPORT_CACHE_SIZE = 8
+_toffee_report_cache = OrderedDict()
+_toffee_report_cache_lock = threading.Lock()
+
+
+def build_toffee_report_index(data: dict, workspace: str) -> dict:
+    """
+    Index a parsed Toffee JSON report in a single pass over tests and coverage bins.
+    :param data: Parsed Toffee JSON report.
+    :param workspace: The workspace directory, used to normalize test case keys.
+    :return: Index with the test results (tests, tests_map, fails) and the functional
+             coverage views (bins, bins_fail, bins_unmarked, bins_funcs, funcs_bins).
+    """
+    test_abstract_info = data.get("test_abstract_info", {})
+    if not isinstance(test_abstract_info, dict):
+        raise ValueError(f"Expected test_abstract_info to be a dict, got {type(test_abstract_info)}")
+    try:
+        tests = get_toffee_json_test_case(workspace, test_abstract_info)
+    except Exception as e:
+        raise RuntimeError(f"Failed to parse test case information: {e}")
+    if not isinstance(tests, list):
+        raise ValueError(f"Expected tests to be a list, got {type(tests)}")
+    for i, test_item in enumerate(tests):
+        if not isinstance(test_item, (list, tuple)) or len(test_item) < 2:
+            raise RuntimeError(f"Failed to process test results: Test item {i} is not a proper tuple/list "
+                               f"with at least 2 elements: {test_item}. Tests data: {tests}")
+    tests_map = {k[0]: k[1] for k in tests}
+    fails = {k[0] for k in tests if k[1] == "FAILED"}
+    fc_data = data.get("coverages", {}).get("functional", {})
+    index = {
+        "tests": tests,
+        "tests_map": tests_map,
+        "fails": fails,
+        "fails_num": sum(1 for k in tests if k[1] == "FAILED"),
+        "raw_tests": data.get("tests", []),
+        "point_num_total": fc_data.get("point_num_total", 0),
+        "point_num_hints": fc_data.get("point_num_hints", 0),
+        "bin_num_total": fc_data.get("bin_num_total", 0),
+        "bin_num_hints": fc_data.get("bin_num_hints", 0),
+        "bins": [],           # all bins: group/point/bin
+        "bins_fail": [],      # bins with no hints
+        "bins_unmarked": [],  # bins not marked by any test function
+        "bins_funcs": {},     # test function -> bins it marks
+        "funcs_bins": {},     # bin -> test functions marking it
+    }
+    func_keys = {}
+    for g in fc_data.get("groups", []):
+        for p in g.get("points", []):
+            cv_funcs = p.get("functions", {})
+            for b in p.get("bins", []):
+                bin_full_name = rm_blank_in_str("%s/%s/%s" % (g["name"], p["name"], b["name"]))
+                if b["hints"] == 0:
+                    index["bins_fail"].append(bin_full_name)
+                test_funcs = cv_funcs.get(b["name"], [])
+                if len(test_funcs) < 1:
+                    index["bins_unmarked"].append(bin_full_name)
+                for tf in test_funcs:
+                    func_key = func_keys.get(tf)
+                    if func_key is None:
+                        func_key = func_keys[tf] = rm_workspace_prefix(workspace, tf)
+                    index["bins_funcs"].setdefault(func_key, []).append(bin_full_name)
+                    index["funcs_bins"].setdefault(bin_full_name, []).append(func_key)
+                index["bins"].append(bin_full_name)
+    return index
+
+
+def get_toffee_report_index(result_json_path: str, workspace: str) -> dict:
+    """
+    Get the index of a Toffee JSON report, cached by the file's mtime and size.
+    :param result_json_path: Path to the Toffee JSON report file.
+    :param workspace: The workspace directory.
+    :return: The report index, see build_toffee_report_index. Callers must not modify it.
+    """
+    st = os.stat(result_json_path)
+    key = (os.path.realpath(result_json_path), os.path.abspath(workspace))
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    with _toffee_report_cache_lock:
+        cached = _toffee_report_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            _toffee_report_cache.move_to_end(key)
+            return cached[1]
+    try:
+        data = load_json_file(result_json_path)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load JSON file {result_json_path}: {e}")
+    index = build_toffee_report_index(data, workspace)
+    with _toffee_report_cache_lock:
+        _toffee_report_cache[key] = (signature, index)
+        _toffee_report_cache.move_to_end(key)
+        while len(_toffee_report_cache) > _TOFFEE_REPORT_CACHE_SIZE:
+            _toffee_report_cache.popitem(last=False)
+    return index
+
+
 def load_toffee_report(
     result_json_path: str,
     workspace: str,
@@ -409,102 +615,37 @@ def load_toffee_report(
     ret_data = {
         "run_test_success": run_test_success,
     }
-    try:
-        data = load_json_file(result_json_path)
-    except Exception as e:
-        raise RuntimeError(f"Failed to load JSON file {result_json_path}: {e}")
-    # Extract relevant information from the JSON data
-    # tests
-    test_abstract_info = data.get("test_abstract_info", {})
-    if not isinstance(test_abstract_info, dict):
-        raise ValueError(f"Expected test_abstract_info to be a dict, got {type(test_abstract_info)}")
-    try:
-        tests = get_toffee_json_test_case(workspace, test_abstract_info)
-    except Exception as e:
-        raise RuntimeError(f"Failed to parse test case information: {e}")
-    if not isinstance(tests, list):
-        raise ValueError(f"Expected tests to be a list, got {type(tests)}")
-    if not tests:
-        # Handle empty test cases
-        tests_map = {}
-        fails = []
-    else:
-        try:
-            # Check if all items in tests are proper tuples with at least 2 elements
-            for i, test_item in enumerate(tests):
-                if not isinstance(test_item, (list, tuple)) or len(test_item) < 2:
-                    raise ValueError(f"Test item {i} is not a proper tuple/list with at least 2 elements: {test_item}")
-            
-            tests_map = {k[0]: k[1] for k in tests}
-            fails = [k[0] for k in tests if k[1] == "FAILED"]
-        except Exception as e:
-            raise RuntimeError(f"Failed to process test results: {e}. Tests data: {tests}")
+    index = get_toffee_report_index(result_json_path, workspace)
+    tests = index["tests"]
     ret_data["tests"] = {
         "total": len(tests),
-        "fails": len(fails),
+        "fails": index["fails_num"],
     }
-    ret_data["tests"]["test_cases"] = tests_map
+    ret_data["tests"]["test_cases"] = dict(index["tests_map"])
     if return_test_details:
         ret_data["tests"]["test_case_details"] = _get_toffee_test_case_details(
-            data, tests
+            {"tests": index["raw_tests"]}, tests
         )
     # coverages
     # functional coverage
-    fc_data = data.get("coverages", {}).get("functional", {})
-    ret_data["total_funct_point"] = fc_data.get("point_num_total", 0)
-    ret_data["total_check_point"] = fc_data.get("bin_num_total",   0)
-    ret_data["failed_funct_point"] = ret_data["total_funct_point"] - fc_data.get("point_num_hints", 0)
-    ret_data["failed_check_point"] = ret_data["total_check_point"] - fc_data.get("bin_num_hints",   0)
-    # failed bins:
-    # groups->points->bins
-    bins_fail = []
-    bins_unmarked = []
-    bins_funcs = {}
-    failed_funcs_bins = {}
-    bins_funcs_reverse = {}
-    bins_all = []
-    for g in fc_data.get("groups", []):
-        for p in g.get("points", []):
-            cv_funcs = p.get("functions", {})
-            for b in p.get("bins", []):
-                bin_full_name = rm_blank_in_str("%s/%s/%s" % (g["name"], p["name"], b["name"]))
-                bin_is_fail = b["hints"] == 0
-                if bin_is_fail:
-                    bins_fail.append(bin_full_name)
-                test_funcs = cv_funcs.get(b["name"], [])
-                if len(test_funcs) < 1:
-                    bins_unmarked.append(bin_full_name)
-                else:
-                    for tf in test_funcs:
-                        func_key = rm_workspace_prefix(workspace, tf)
-                        if func_key not in bins_funcs:
-                            bins_funcs[func_key] = []
-                        if func_key in fails:
-                            if func_key not in failed_funcs_bins:
-                                failed_funcs_bins[func_key] = []
-                            failed_funcs_bins[func_key].append(bin_full_name)
-                        bins_funcs[func_key].append(bin_full_name)
-                        if bin_full_name not in bins_funcs_reverse:
-                            bins_funcs_reverse[bin_full_name] = []
-                        bins_funcs_reverse[bin_full_name].append(
-                            [func_key, tests_map.get(func_key, "Unknown")]
-                        )
-                # all bins
-                bins_all.append(bin_full_name)
-    ret_data["failed_test_case_with_check_point_list"] = failed_funcs_bins
+    ret_data["total_funct_point"] = index["point_num_total"]
+    ret_data["total_check_point"] = index["bin_num_total"]
+    ret_data["failed_funct_point"] = ret_data["total_funct_point"] - index["point_num_hints"]
+    ret_data["failed_check_point"] = ret_data["total_check_point"] - index["bin_num_hints"]
+    fails = index["fails"]
+    ret_data["failed_test_case_with_check_point_list"] = {
+        k: list(v) for k, v in index["bins_funcs"].items() if k in fails
+    }
     if return_all_checks:
-        ret_data["all_check_point_list"] = bins_all
-        ret_data["test_case_with_check_point_list"] = bins_funcs
-    if len(bins_fail) > 0:
-        ret_data["failed_check_point_list"] = bins_fail
-    ret_data["unmarked_check_points"] = len(bins_unmarked)
-    if len(bins_unmarked) > 0:
-        ret_data["unmarked_check_point_list"] = bins_unmarked
+        ret_data["all_check_point_list"] = list(index["bins"])
+        ret_data["test_case_with_check_point_list"] = {k: list(v) for k, v in index["bins_funcs"].items()}
+    if len(index["bins_fail"]) > 0:
+        ret_data["failed_check_point_list"] = list(index["bins_fail"])
+    ret_data["unmarked_check_points"] = len(index["bins_unmarked"])
+    if len(index["bins_unmarked"]) > 0:
+        ret_data["unmarked_check_point_list"] = list(index["bins_unmarked"])
     # functions with no check points
-    test_fc_no_check_points = []
-    for f, _ in tests:
-        if f not in bins_funcs:
-            test_fc_no_check_points.append(f)
+    test_fc_no_check_points = [f for f, _ in tests if f not in index["bins_funcs"]]
     ret_data["test_function_with_no_check_point_mark"] = len(test_fc_no_check_points)
     if len(test_fc_no_check_points) > 0:
         ret_data["test_function_with_no_check_point_mark_list"] = test_fc_no_check_points
@@ -565,6 +706,223 @@ def _get_toffee_test_case_details(data: dict, tests: list) -> dict:
     return details
 
 
+def merge_toffee_func_coverage(coverages: List[dict]) -> dict:
+    """
+    Merge toffee functional coverage data of several runs.
+    Groups, points and bins are matched by name in first-seen order, bin hints
+    are summed and the test functions marking each bin are united.
+    :param coverages: List of `coverages.functional` dicts.
+    :return: The merged `coverages.functional` dict.
+    """
+    merged = {}
+    groups = OrderedDict()
+    for cov in coverages:
+        for key, value in cov.items():
+            if key != "groups":
+                merged.setdefault(key, value)
+        for g in cov.get("groups", []):
+            mg = groups.get(g["name"])
+            if mg is None:
+                groups[g["name"]] = copy.deepcopy(g)
+                continue
+            points = {p["name"]: p for p in mg.get("points", [])}
+            for p in g.get("points", []):
+                mp = points.get(p["name"])
+                if mp is None:
+                    mp = copy.deepcopy(p)
+                    mg.setdefault("points", []).append(mp)
+                    points[p["name"]] = mp
+                    continue
+                bins = {b["name"]: b for b in mp.get("bins", [])}
+                for b in p.get("bins", []):
+                    if b["name"] in bins:
+                        bins[b["name"]]["hints"] = bins[b["name"]].get("hints", 0) + b.get("hints", 0)
+                    else:
+                        mp.setdefault("bins", []).append(copy.deepcopy(b))
+                funcs = mp.setdefault("functions", {})
+                for bin_name, tests in p.get("functions", {}).items():
+                    target = funcs.setdefault(bin_name, [])
+                    target.extend(t for t in tests if t not in target)
+    point_total, point_hints, bin_total, bin_hints, group_hints = 0, 0, 0, 0, 0
+    for g in groups.values():
+        g_points = g.get("points", [])
+        g_point_hints, g_bin_total, g_bin_hints = 0, 0, 0
+        for p in g_points:
+            p_bins = p.get("bins", [])
+            p_bin_hints = sum(1 for b in p_bins if b.get("hints", 0) > 0)
+            if "hinted" in p:
+                p["hinted"] = p_bin_hints == len(p_bins)
+            g_point_hints += int(p_bin_hints == len(p_bins))
+            g_bin_total += len(p_bins)
+            g_bin_hints += p_bin_hints
+        for key, value in (("point_num_total", len(g_points)), ("point_num_hints", g_point_hints),
+                           ("bin_num_total", g_bin_total), ("bin_num_hints", g_bin_hints)):
+            if key in g:
+                g[key] = value
+        if "hinted" in g:
+            g["hinted"] = g_point_hints == len(g_points)
+        group_hints += int(g_point_hints == len(g_points))
+        point_total += len(g_points)
+        point_hints += g_point_hints
+        bin_total += g_bin_total
+        bin_hints += g_bin_hints
+    merged["groups"] = list(groups.values())
+    merged.update({
+        "point_num_total": point_total, "point_num_hints": point_hints,
+        "bin_num_total": bin_total, "bin_num_hints": bin_hints,
+    })
+    for key, value in (("group_num_total", len(groups)), ("group_num_hints", group_hints)):
+        if key in merged:
+            merged[key] = value
+    return merged
+
+
+def merge_toffee_reports(report_paths: List[str]) -> dict:
+    """
+    Merge toffee JSON reports of test shards into the report of one serial run.
+    Test results are concatenated in shard order and functional coverage is merged
+    with `merge_toffee_func_coverage`. Other keys are taken from the first report.
+    :param report_paths: Toffee JSON report files, ordered by shard index.
+    :return: The merged report data.
+    """
+    reports = [load_json_file(p) for p in report_paths]
+    merged = {}
+    for report in reports:
+        for key, value in report.items():
+            merged.setdefault(key, value)
+    merged["test_abstract_info"] = {}
+    merged["tests"] = []
+    for report in reports:
+        merged["test_abstract_info"].update(report.get("test_abstract_info", {}))
+        merged["tests"].extend(report.get("tests", []))
+    coverages = dict(merged.get("coverages", {}))
+    coverages["functional"] = merge_toffee_func_coverage(
+        [r.get("coverages", {}).get("functional", {}) for r in reports])
+    merged["coverages"] = coverages
+    return merged
+
+
+def toffee_test_id(key: str) -> Tuple[str, str]:
+    """
+    Get (file basename, test name) from a toffee test key or a bin function entry,
+    e.g. '/w/tests/test_a.py:10-20::test_x' -> ('test_a.py', 'test_x').
+    """
+    file_part, _, name = str(key).rpartition("::")
+    file_part = file_part.split("::")[0]
+    if re.search(r":\d+-\d+$", file_part):
+        file_part = file_part.rsplit(":", 1)[0]
+    return os.path.basename(file_part), name
+
+
+def merge_toffee_report_subset(cached: dict, current: dict, order: List[Tuple[str, str]],
+                               rerun: List[Tuple[str, str]]) -> dict:
+    """
+    Merge the toffee report of a partial re-run into the report of the last full run.
+    Results of re-run tests come from `current`, the others from `cached`, listed in
+    collection `order`. Cached bin hints are kept only for bins that no re-run test
+    marks, since hints cannot be attributed to single tests.
+    Limitation: hints of bins that no test marks cannot be attributed at all, so the
+    cached hints of such a bin survive even if only the re-run tests hit it, and the
+    merged coverage may be higher than a full run reports. Run all tests for exact
+    coverage.
+    :param cached: Raw toffee report of the previous run.
+    :param current: Raw toffee report of the re-run tests.
+    :param order: (file basename, test name) of all collected tests, in collection order.
+    :param rerun: (file basename, test name) of the re-run tests.
+    :return: The merged raw toffee report.
+    """
+    rerun = set(map(tuple, rerun))
+
+    def index(report):
+        raw_tests = report.get("tests", [])
+        return {toffee_test_id(k): (k, v, raw_tests[i] if i < len(raw_tests) else {})
+                for i, (k, v) in enumerate(report.get("test_abstract_info", {}).items())}
+
+    cached_tests, current_tests = index(cached), index(current)
+    merged = copy.deepcopy(cached)
+    merged.update({k: v for k, v in current.items() if k not in ("test_abstract_info", "tests", "coverages")})
+    merged["test_abstract_info"] = {}
+    merged["tests"] = []
+    for test_id in list(map(tuple, order)) + [t for t in current_tests if t not in set(map(tuple, order))]:
+        entry = current_tests.get(test_id) if test_id in rerun or test_id not in cached_tests \
+            else cached_tests.get(test_id)
+        if entry is None or entry[0] in merged["test_abstract_info"]:
+            continue
+        merged["test_abstract_info"][entry[0]] = entry[1]
+        merged["tests"].append(entry[2])
+    kept = {t for t in map(tuple, order) if t not in rerun}
+    cached_func = copy.deepcopy(cached.get("coverages", {}).get("functional", {}))
+    for g in cached_func.get("groups", []):
+        for p in g.get("points", []):
+            funcs = p.get("functions", {})
+            for b in p.get("bins", []):
+                marks = [toffee_test_id(f) for f in funcs.get(b["name"], [])]
+                if any(m not in kept for m in marks):
+                    b["hints"] = 0
+            for bin_name, tests in funcs.items():
+                funcs[bin_name] = [f for f in tests if toffee_test_id(f) in kept]
+    coverages = dict(merged.get("coverages", {}))
+    coverages["functional"] = merge_toffee_func_coverage(
+        [cached_func, current.get("coverages", {}).get("functional", {})])
+    merged["coverages"] = coverages
+    return merged
+
+
+def _parse_line_ranges(lines: List[str]) -> set:
+    ret = set()
+    for item in lines:
+        start, _, end = str(item).partition("-")
+        ret.update(range(int(start), int(end or start) + 1))
+    return ret
+
+
+def _format_line_ranges(numbers: set, always_range: bool) -> List[str]:
+    ret = []
+    for n in sorted(numbers):
+        if ret and ret[-1][1] == n - 1:
+            ret[-1][1] = n
+        else:
+            ret.append([n, n])
+    return [f"{a}-{b}" if always_range or a != b else f"{a}" for a, b in ret]
+
+
+def merge_line_coverage_reports(coverage_paths: List[str]) -> dict:
+    """
+    Merge line coverage JSON files (uc_test_report/line_dat/code_coverage.json) of test shards.
+    A line is uncovered in the merged data only if every shard left it uncovered.
+    :param coverage_paths: Line coverage JSON files of the shards.
+    :return: The merged line coverage data, in the format parse_un_coverage_json reads.
+    """
+    reports = [load_json_file(p) for p in coverage_paths]
+    merged = copy.deepcopy(reports[0])
+    always_range = True
+    uncovered = []
+    for report in reports:
+        sets = {}
+        for cpath, fdata in report.get("uncovered", {}).get("data", {}).items():
+            for module_name, cover_lines in fdata.get("modules", {}).items():
+                lines = cover_lines.get("line", [])
+                always_range = always_range and all("-" in str(x) for x in lines)
+                sets[(cpath, module_name)] = _parse_line_ranges(lines)
+        uncovered.append(sets)
+    common = {k: v for k, v in uncovered[0].items()}
+    for sets in uncovered[1:]:
+        common = {k: v & sets[k] for k, v in common.items() if k in sets}
+    total_miss = 0
+    data = merged.setdefault("uncovered", {}).setdefault("data", {})
+    for cpath, fdata in data.items():
+        file_miss = 0
+        for module_name, cover_lines in fdata.get("modules", {}).items():
+            lines = common.get((cpath, module_name), set())
+            cover_lines["line"] = _format_line_ranges(lines, always_range)
+            cover_lines.setdefault("miss", {})["line"] = len(lines)
+            file_miss += len(lines)
+        fdata.setdefault("miss", {})["line"] = file_miss
+        total_miss += file_miss
+    merged.setdefault("overview", {}).setdefault("miss", {})["line"] = total_miss
+    return merged
+
+
 def del_report_keys(report: dict, keys: List[str]) -> dict:
     """
     Delete specified keys from a report dictionary.
@@ -707,9 +1065,12 @@ def get_unity_chip_doc_marks(path: str, leaf_node: str, mini_leaf_count: int = 0
     assert leaf_node in keynames, f"Invalid leaf_node '{leaf_node}'. Must be one of {keynames}."
     prefix   = ["<FG-", "<FC-", "<CK-", "<BG-", "<TC-"]
     subfix   = [">"]* len(prefix)
-    data = parse_nested_keys(path, keynames, prefix, subfix)
+    assert os.path.exists(path), f"File {path} does not exist. You need to provide a valid file path."
+    model = get_doc_model(path)
     tindex = keynames.index(leaf_node)
-    klist, blist, klines = nested_keys_as_list(data, leaf_node, keynames)
+    klist, blist, klines = model.get_memo(("doc_marks", leaf_node), lambda: nested_keys_as_list(
+        _doc_model_nested_keys(model, keynames, prefix, subfix), leaf_node, keynames))
+    klist = list(klist)
     assert len(klist) >= mini_leaf_count, f"Need {mini_leaf_count} {leaf_node} at least, but find {len(klist)}"
     fmsg = ", ".join([f"{b[1]} at line {b[2]} need sub node '<{leaf_node}-*>'" for b in blist])
     assert len(blist) == 0, f"Incomplete label '<{leaf_node}-*>' detected: `{fmsg}`, delete the incomplete labels or fix it according to the format requirements: " + \
@@ -727,28 +1088,30 @@ def get_unity_chip_doc_marks(path: str, leaf_node: str, mini_leaf_count: int = 0
         raise ValueError(f"Invalid characters {finded_keys} found in keys: {invalid_char_keys}")
     if not return_line_block:
         return klist
-    return klist, get_file_blocks(path, klines)
+    return klist, _get_line_blocks(model.lines, klines)
 
 
 def get_file_blocks(file_path: str, line_info) -> dict:
+    return _get_line_blocks(get_doc_model(file_path).lines, line_info)
+
+
+def _get_line_blocks(lines: List[str], line_info) -> dict:
     blocks = OrderedDict()
-    with open(file_path, "r") as f:
-        lines = f.read().splitlines()
-        for k, v in line_info.items():
-            blocks[k] = []
-            line = v.get("line", -1)
-            if line < 0:
-                continue
-            pline = v.get("pline", line)
-            nline = v.get("nline", line)
-            nsize = max(1, nline - pline + 1)
-            lnfmt = f"%0" + str(max(len(str(nline)), len(str(pline)))) + "d: %s"
-            for i, l in enumerate(lines[pline - 1: pline - 1 + nsize]):
-                if i == 0 and pline != line:
-                    l = "..."
-                if i == (nsize - 1) and nline != line:
-                    l = "..."
-                blocks[k].append(lnfmt % (i + pline, l))
+    for k, v in line_info.items():
+        blocks[k] = []
+        line = v.get("line", -1)
+        if line < 0:
+            continue
+        pline = v.get("pline", line)
+        nline = v.get("nline", line)
+        nsize = max(1, nline - pline + 1)
+        lnfmt = f"%0" + str(max(len(str(nline)), len(str(pline)))) + "d: %s"
+        for i, l in enumerate(lines[pline - 1: pline - 1 + nsize]):
+            if i == 0 and pline != line:
+                l = "..."
+            if i == (nsize - 1) and nline != line:
+                l = "..."
+            blocks[k].append(lnfmt % (i + pline, l))
     return blocks
 
 
@@ -907,12 +1270,17 @@ def fill_template(data, template_data):
 def find_files_by_regex(workspace, pattern):
     """
     Find files in a workspace that match a given regex pattern.
+    With the workspace file index enabled, files below .git and .ucagent are not returned.
     """
     matched_files = []
     assert os.path.exists(workspace), f"Workspace {workspace} does not exist."
     abs_workspace = os.path.abspath(workspace)
     def __find(p):
         regex = re.compile(p)
+        indexed = index_find_by_regex(abs_workspace, regex)
+        if indexed is not None:
+            matched_files.extend(indexed)
+            return
         for root, dirs, files in os.walk(abs_workspace):
             for filename in files:
                 if regex.search(filename):
@@ -938,6 +1306,10 @@ def find_files_by_glob(workspace, pattern):
     ret = set()
 
     def __find(p):
+        indexed = index_glob(abs_workspace, p)
+        if indexed is not None:
+            ret.update(indexed)
+            return
         for f in glob.glob(os.path.join(abs_workspace, p), recursive=True):
             ret.add(f.removeprefix(abs_workspace + os.sep))
 
@@ -1209,6 +1581,8 @@ def get_func_arg_list(func):
     :param func: The function to inspect.
     :return: A list of argument names.
     """
+    if isinstance(func, StaticPyFunction):
+        return list(func.args)
     if not callable(func):
         raise ValueError("Provided object is not callable.")
     sig = inspect.signature(func)
@@ -1220,6 +1594,100 @@ def get_func_arg_list(func):
     ]
 
 
+def _name_pattern_matcher(func_pattern):
+    """Return a name predicate for an exact name, glob or regex pattern."""
+    regex_chars = set("[]()+?^${}\\|.")
+    if any(char in func_pattern for char in regex_chars):
+        try:
+            regex = re.compile(func_pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid regex pattern '{func_pattern}': {e}")
+        return lambda name: regex.match(name) is not None
+    return lambda name: fnmatch.fnmatch(name, func_pattern)
+
+
+class StaticPyFunction:
+    """A top-level function found by `discover_functions_in_file` without importing its module.
+
+    Provides the attributes the checkers read from function objects
+    (`__name__`, `__doc__`, arguments and source) plus the decorators,
+    requested fixtures and docstring marks.
+    """
+
+    def __init__(self, node, lines, target_file):
+        self.__name__ = node.name
+        self.__qualname__ = node.name
+        self.__doc__ = ast.get_docstring(node, clean=False)
+        self.file = target_file
+        self.is_async = isinstance(node, ast.AsyncFunctionDef)
+        self.args = [a.arg for a in node.args.posonlyargs + node.args.args]
+        self.decorators = [ast.unparse(d) for d in node.decorator_list]
+        self.is_fixture = any(re.search(r"(^|\.)fixture(\(|$)", d) for d in self.decorators)
+        parametrized = set()
+        for d in node.decorator_list:
+            if isinstance(d, ast.Call) and ast.unparse(d.func).endswith("mark.parametrize") and d.args \
+                    and isinstance(d.args[0], ast.Constant) and isinstance(d.args[0].value, str):
+                parametrized.update(n.strip() for n in d.args[0].value.split(","))
+        self.fixtures = [a for a in self.args if a not in parametrized and a not in ("self", "cls")]
+        self.doc_marks = re.findall(r"<([A-Z][A-Z0-9]*-[^<>\s]+)>", self.__doc__ or "")
+        self.lineno = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        self.end_lineno = node.end_lineno
+        self.source = "".join(lines[self.lineno - 1:self.end_lineno])
+
+    def __repr__(self):
+        return f"<function {self.__name__}>"
+
+
+_PY_DISCOVERY_CACHE_SIZE = 256
+_py_discovery_cache = OrderedDict()
+_py_discovery_cache_lock = threading.Lock()
+
+
+def discover_functions_in_file(target_file, func_pattern="*") -> List[StaticPyFunction]:
+    """
+    Find the top-level functions of a Python file matching `func_pattern` by parsing it
+    with `ast`, without importing it (no side effects, no toffee/DUT import cost).
+    Parsed files are cached by content hash.
+    :param target_file: Path to the Python file.
+    :param func_pattern: Exact name, glob or regex pattern, as in `get_target_from_file`.
+    :return: List of StaticPyFunction sorted by name, the last definition of a name wins.
+    """
+    if not os.path.exists(target_file):
+        raise FileNotFoundError(f"Target file {target_file} does not exist.")
+    with open(target_file, "rb") as f:
+        data = f.read()
+    key = (os.path.realpath(target_file), hashlib.blake2b(data, digest_size=16).hexdigest())
+    with _py_discovery_cache_lock:
+        functions = _py_discovery_cache.get(key)
+        if functions is not None:
+            _py_discovery_cache.move_to_end(key)
+    if functions is None:
+        try:
+            text = data.decode("utf-8")
+            tree = ast.parse(text, filename=target_file)
+        except (SyntaxError, ValueError) as e:
+            raise ImportError(f"Failed to parse {target_file}: {e}")
+        lines = text.splitlines(keepends=True)
+        by_name = {}
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"):
+                by_name[node.name] = StaticPyFunction(node, lines, target_file)
+        functions = [by_name[n] for n in sorted(by_name)]
+        with _py_discovery_cache_lock:
+            _py_discovery_cache[key] = functions
+            while len(_py_discovery_cache) > _PY_DISCOVERY_CACHE_SIZE:
+                _py_discovery_cache.popitem(last=False)
+    name_match = _name_pattern_matcher(func_pattern)
+    return [f for f in functions if name_match(f.__name__)]
+
+
+def get_func_source(func) -> str:
+    """Source code of a function object or a StaticPyFunction."""
+    if isinstance(func, StaticPyFunction):
+        return func.source
+    return inspect.getsource(func)
+
+
 def get_target_from_file(target_file, func_pattern, ex_python_path = [], dtype="FUNC"):
     """
     Import target file and get objects (functions, classes, or all) that match the given pattern.
@@ -1293,28 +1761,8 @@ def get_target_from_file(target_file, func_pattern, ex_python_path = [], dtype="
             if is_target_type(obj, dtype):
                 all_objects.append((name, obj))
         # Filter objects based on pattern
-        matched_objects = []
-
-        # Determine if pattern is regex or glob
-        def is_regex_pattern(pattern):
-            """Check if pattern contains regex special characters"""
-            regex_chars = set("[]()+?^${}\\|.")
-            return any(char in pattern for char in regex_chars)
-
-        if is_regex_pattern(func_pattern):
-            # Treat as regex pattern
-            try:
-                regex = re.compile(func_pattern)
-                for name, obj in all_objects:
-                    if regex.match(name):
-                        matched_objects.append(obj)
-            except re.error as e:
-                raise ValueError(f"Invalid regex pattern '{func_pattern}': {e}")
-        else:
-            # Treat as glob pattern or exact string
-            for name, obj in all_objects:
-                if fnmatch.fnmatch(name, func_pattern):
-                    matched_objects.append(obj)
+        name_match = _name_pattern_matcher(func_pattern)
+        matched_objects = [obj for name, obj in all_objects if name_match(name)]
         return matched_objects
     except Exception as e:
         raise ImportError(f"Failed to import and process {target_file}: {e}")
@@ -1724,6 +2172,170 @@ def parse_line_ignore_file(file_path: str) -> dict:
     return ret
 
 
+LINE_COVERAGE_INDEX_SUFFIX = ".lineidx"
+_LINE_COVERAGE_CACHE_SIZE = 8
+_line_coverage_cache = OrderedDict()
+_line_coverage_cache_lock = threading.Lock()
+
+
+def _line_ranges_bitmap(lines: List[str]) -> int:
+    mask = 0
+    for item in lines:
+        start, _, end = str(item).partition("-")
+        start = int(start)
+        mask |= ((1 << (int(end or start) - start + 1)) - 1) << start
+    return mask
+
+
+def _bitmap_line_ranges(mask: int) -> List[str]:
+    ret, n = [], 0
+    while mask:
+        zeros = (mask & -mask).bit_length() - 1
+        mask >>= zeros
+        n += zeros
+        ones = (~mask & (mask + 1)).bit_length() - 1
+        ret.append(f"{n}-{n + ones - 1}" if ones > 1 else f"{n}")
+        mask >>= ones
+        n += ones
+    return ret
+
+
+class LineCoverageIndex:
+    """
+    Compact view of a line coverage JSON report (uc_test_report/line_dat/code_coverage.json):
+    the line totals and, per (source file, module), the uncovered lines as a bitmap
+    (bit n set means line n is uncovered).
+    """
+
+    VERSION = 1
+
+    def __init__(self, lines_total: int, lines_uncovered: int, entries: list,
+                 mtime_ns: int = 0, size: int = 0, digest: str = ""):
+        self.lines_total = lines_total
+        self.lines_uncovered = lines_uncovered
+        # [(file_path, module_name, lines, bitmap)], lines are the raw ranges of the report
+        self.entries = entries
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.bitmaps = {}
+        for cpath, _, _, mask in entries:
+            self.bitmaps[cpath] = self.bitmaps.get(cpath, 0) | mask
+
+    @classmethod
+    def from_report(cls, data: dict, **signature) -> "LineCoverageIndex":
+        lines_total = data["overview"]["total"]["line"]
+        lines_uncovered = data["overview"]["miss"]["line"]
+        entries = []
+        un_covered = data.get("uncovered", {}).get("data", {})
+        if lines_uncovered > 0 and un_covered:
+            for cpath, fdata in un_covered.items():
+                if fdata["total"]["line"] == 0:
+                    continue
+                for module_name, cover_lines in fdata["modules"].items():
+                    if cover_lines["miss"]["line"] == 0:
+                        continue
+                    lines = cover_lines["line"]
+                    entries.append((cpath, module_name, lines, _line_ranges_bitmap(lines)))
+        return cls(lines_total, lines_uncovered, entries, **signature)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LineCoverageIndex":
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported line coverage index version: {data.get('version')}")
+        entries = [(c, m, l, int(b, 16)) for c, m, l, b in data["entries"]]
+        return cls(data["lines_total"], data["lines_uncovered"], entries,
+                   data["mtime_ns"], data["size"], data["digest"])
+
+    def to_dict(self) -> dict:
+        return {
+            "version": self.VERSION,
+            "mtime_ns": self.mtime_ns,
+            "size": self.size,
+            "digest": self.digest,
+            "lines_total": self.lines_total,
+            "lines_uncovered": self.lines_uncovered,
+            "entries": [[c, m, l, format(b, "x")] for c, m, l, b in self.entries],
+        }
+
+    def is_uncovered(self, file_path: str, line: int) -> bool:
+        return bool(self.bitmaps.get(file_path, 0) >> line & 1)
+
+    def uncovered_lines(self, file_path: str) -> List[str]:
+        """Uncovered lines of a source file, as line ranges."""
+        return _bitmap_line_ranges(self.bitmaps.get(file_path, 0))
+
+    def diff(self, previous: "LineCoverageIndex") -> dict:
+        """
+        Compare with the index of a previous run.
+        :return: {"newly_covered": {file: ranges}, "newly_uncovered": {file: ranges}} and the line counts.
+        """
+        ret = {"newly_covered": {}, "newly_uncovered": {},
+               "newly_covered_lines": 0, "newly_uncovered_lines": 0}
+        for cpath in sorted(set(self.bitmaps) | set(previous.bitmaps)):
+            now, before = self.bitmaps.get(cpath, 0), previous.bitmaps.get(cpath, 0)
+            for key, mask in (("newly_covered", before & ~now), ("newly_uncovered", now & ~before)):
+                if mask:
+                    ret[key][cpath] = _bitmap_line_ranges(mask)
+                    ret[key + "_lines"] += bin(mask).count("1")
+        return ret
+
+
+def _file_digest(file_path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_line_coverage_index(file_path: str) -> LineCoverageIndex:
+    """
+    Get the index of a line coverage JSON report. The index is cached in memory and
+    persisted next to the report (<report>.lineidx), keyed by the report's mtime/size and
+    content hash, so the full JSON is only parsed again when the report really changes.
+    :param file_path: Absolute path of the line coverage JSON report.
+    :return: The report index, callers must not modify it.
+    """
+    st = os.stat(file_path)
+    key = os.path.realpath(file_path)
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    with _line_coverage_cache_lock:
+        cached = _line_coverage_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            _line_coverage_cache.move_to_end(key)
+            return cached[1]
+    index_path = file_path + LINE_COVERAGE_INDEX_SUFFIX
+    index, digest = None, None
+    try:
+        index = LineCoverageIndex.from_dict(load_json_file(index_path))
+    except Exception:
+        index = None
+    if index is not None and (index.mtime_ns, index.size) != (st.st_mtime_ns, st.st_size):
+        # e.g. a copied report: the content may still be the same
+        digest = _file_digest(file_path) if index.size == st.st_size else None
+        if digest != index.digest:
+            index = None
+    if index is None:
+        digest = digest or _file_digest(file_path)
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = LineCoverageIndex.from_report(data, mtime_ns=st.st_mtime_ns, size=st.st_size, digest=digest)
+    if digest is not None:
+        index.mtime_ns, index.size = st.st_mtime_ns, st.st_size
+        try:
+            with open(index_path, "w", encoding="utf-8") as f:
+                json.dump(index.to_dict(), f)
+        except OSError as e:
+            debug(f"Cannot write line coverage index {index_path}: {e}")
+    with _line_coverage_cache_lock:
+        _line_coverage_cache[key] = (signature, index)
+        _line_coverage_cache.move_to_end(key)
+        while len(_line_coverage_cache) > _LINE_COVERAGE_CACHE_SIZE:
+            _line_coverage_cache.popitem(last=False)
+    return index
+
+
 def parse_un_coverage_json(file_path: str, workspace: str) -> dict:
     """Parse Unity test coverage data from a file.
 
@@ -1744,27 +2356,18 @@ def parse_un_coverage_json(file_path: str, workspace: str) -> dict:
         file_path = file_path[1:]
     file_path = os.path.abspath(os.path.join(workspace, file_path))
     assert os.path.exists(file_path), f"File {file_path} does not exist."
-    data = json.load(open(file_path, "r", encoding="utf-8"))
-    ret["lines_total"] = data["overview"]["total"]["line"]
-    ret["lines_uncovered"] = data["overview"]["miss"]["line"]
+    index = get_line_coverage_index(file_path)
+    ret["lines_total"] = index.lines_total
+    ret["lines_uncovered"] = index.lines_uncovered
     ret["lines_covered"] = ret["lines_total"] - ret["lines_uncovered"]
-    # Parse uncovered lines details
-    un_covered = data.get("uncovered", {}).get("data", {})
     if ret["lines_total"] > 0:
         ret["coverage_rate"] = float(ret["lines_covered"]) / float(ret["lines_total"])
-    if ret["lines_uncovered"] > 0 and un_covered:
-        for cpath, data in un_covered.items():
-            if data["total"]["line"] == 0:
-                continue
-            for module_name, cover_lines in data["modules"].items():
-                if cover_lines["miss"]["line"] == 0:
-                    continue
-                cpath = rm_workspace_prefix(workspace, cpath)
-                lines = cover_lines["line"]
-                ret["uncoverage_detail"].append(OrderedDict({
-                        "module_name": module_name,
-                        "lines_uncovered": cpath  + ":" + ','.join(lines),
-                    }))
+    # Uncovered lines details
+    for cpath, module_name, lines, _ in index.entries:
+        ret["uncoverage_detail"].append(OrderedDict({
+                "module_name": module_name,
+                "lines_uncovered": rm_workspace_prefix(workspace, cpath) + ":" + ','.join(lines),
+            }))
     return ret
 
 
@@ -2692,67 +3295,179 @@ def match_pattern_list(name: str, pattern_list: list) -> bool:
     return False
 
 
-def sync_dir_to(source_dir, target_dir, ignore_pattern_list=[]):
+SYNC_MANIFEST_VERSION = 1
+
+
+def _load_sync_manifest(manifest_path, source_dir, target_dir) -> dict:
+    """Load the file records of a sync manifest, empty if missing or made for other dirs."""
+    if not manifest_path or not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        warning(f"Ignore broken sync manifest {manifest_path}: {e}")
+        return {}
+    if not isinstance(data, dict) or data.get("version") != SYNC_MANIFEST_VERSION or \
+       data.get("source") != source_dir or data.get("target") != target_dir:
+        return {}
+    return data.get("files", {})
+
+
+def _save_sync_manifest(manifest_path, source_dir, target_dir, files: dict):
+    tmp = f"{manifest_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": SYNC_MANIFEST_VERSION, "source": source_dir,
+                       "target": target_dir, "files": files}, f)
+        os.replace(tmp, manifest_path)
+    except OSError as e:
+        warning(f"Cannot save sync manifest {manifest_path}: {e}")
+
+
+def _copy_file_with_digest(source_file: str, target_file: str) -> str:
+    """shutil.copy2 that also returns the blake2b digest of the copied content."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(source_file, "rb") as fsrc, open(target_file, "wb") as fdst:
+        for chunk in iter(lambda: fsrc.read(1 << 20), b""):
+            h.update(chunk)
+            fdst.write(chunk)
+    shutil.copystat(source_file, target_file)
+    return h.hexdigest()
+
+
+def _remove_path(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def sync_dir_to(source_dir, target_dir, ignore_pattern_list=[], manifest_path=None, max_workers=None,
+                changed_paths=None):
     """Sync source directory to target directory with incremental updates and deletion support.
 
     Args:
         source_dir: Source directory path
         target_dir: Target directory path
         ignore_pattern_list: List of patterns to ignore during sync
+        manifest_path: Optional file to persist the (size, mtime, hash) records of synced files
+        max_workers: Size of the copy thread pool, default min(8, cpu count)
+        changed_paths: Optional set that receives the target-relative paths copied or removed
 
     Returns:
         target_dir: The target directory path
 
     Features:
-        - Only copies files if they don't exist in target or have newer modification time
+        - Files recorded in the manifest are skipped while neither side changed since the
+          last sync, or when only the source mtime changed but not its content
+        - Without a record, only copies files that don't exist in target, differ in size
+          or have a newer modification time
         - Removes files/directories in target that don't exist in source
-        - Recursively syncs subdirectories
+        - Walks both trees with os.scandir and copies files with a thread pool
     """
     if not os.path.exists(source_dir):
         raise Exception(f"Source directory '{source_dir}' does not exist.")
     if not os.path.isdir(source_dir):
         raise Exception(f"Source path '{source_dir}' is not a directory.")
-    if not os.path.exists(target_dir):
-        os.makedirs(target_dir)
-    # Track items in source (excluding ignored ones)
-    source_items = set()
-    # Sync items from source to target
-    for item in os.listdir(source_dir):
-        if match_pattern_list(item, ignore_pattern_list):
-            continue
-        source_items.add(item)
-        s = os.path.join(source_dir, item)
-        d = os.path.join(target_dir, item)
-        if os.path.isdir(s):
-            # Recursively sync subdirectories
-            sync_dir_to(s, d, ignore_pattern_list)
-        else:
-            # Check if file needs to be copied
-            need_copy = False
-            if not os.path.exists(d):
-                need_copy = True
-                info(f"New file to copy: {item}")
-            else:
-                # Compare modification times
-                source_mtime = os.path.getmtime(s)
-                target_mtime = os.path.getmtime(d)
-                if source_mtime > target_mtime:
-                    need_copy = True
-                    info(f"Updated file to copy: {item}")
-            if need_copy:
-                shutil.copy2(s, d)
-    # Remove items in target that don't exist in source
-    for item in os.listdir(target_dir):
-        if match_pattern_list(item, ignore_pattern_list):
-            continue
-        if item not in source_items:
-            d = os.path.join(target_dir, item)
-            if os.path.isdir(d):
-                shutil.rmtree(d)
-                info(f"Removed directory from target: {item}")
-            else:
-                os.remove(d)
-                info(f"Removed file from target: {item}")
+    start_time = time.time()
+    source_dir, target_dir = os.path.abspath(source_dir), os.path.abspath(target_dir)
+    records = _load_sync_manifest(manifest_path, source_dir, target_dir)
+    new_records = {}
+    copy_tasks = []
+    removed = []
+    count = {"unchanged": 0, "hashed": 0}
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        s_dir = os.path.join(source_dir, rel_dir)
+        t_dir = os.path.join(target_dir, rel_dir)
+        if not os.path.isdir(t_dir) or os.path.islink(t_dir):
+            if os.path.lexists(t_dir):
+                os.remove(t_dir)
+                removed.append(rel_dir)
+            os.makedirs(t_dir)
+        with os.scandir(t_dir) as it:
+            target_entries = {entry.name: entry for entry in it}
+        source_items = set()
+        with os.scandir(s_dir) as it:
+            source_entries = list(it)
+        for entry in source_entries:
+            item = entry.name
+            if match_pattern_list(item, ignore_pattern_list):
+                continue
+            source_items.add(item)
+            rel_item = os.path.join(rel_dir, item)
+            target_entry = target_entries.get(item)
+            if entry.is_dir():
+                pending.append(rel_item)
+                continue
+            src_st = entry.stat()
+            target_st = None
+            if target_entry is not None:
+                if target_entry.is_file(follow_symlinks=False):
+                    target_st = target_entry.stat(follow_symlinks=False)
+                else:
+                    _remove_path(target_entry.path)
+                    removed.append(rel_item)
+            record = records.get(rel_item)
+            if target_st is not None:
+                target_sig = [target_st.st_size, target_st.st_mtime_ns]
+                if record is not None and record[2:4] == target_sig:
+                    if record[0:2] == [src_st.st_size, src_st.st_mtime_ns]:
+                        count["unchanged"] += 1
+                        new_records[rel_item] = record
+                        continue
+                    if record[0] == src_st.st_size and record[4]:
+                        count["hashed"] += 1
+                        if _file_digest(entry.path) == record[4]:
+                            count["unchanged"] += 1
+                            new_records[rel_item] = [src_st.st_size, src_st.st_mtime_ns] + record[2:]
+                            continue
+                elif record is None and src_st.st_size == target_st.st_size and \
+                        src_st.st_mtime_ns <= target_st.st_mtime_ns:
+                    count["unchanged"] += 1
+                    new_records[rel_item] = [src_st.st_size, src_st.st_mtime_ns] + target_sig + [None]
+                    continue
+            copy_tasks.append((rel_item, entry.path, os.path.join(t_dir, item),
+                               [src_st.st_size, src_st.st_mtime_ns]))
+        # Remove items in target that don't exist in source
+        for item, target_entry in target_entries.items():
+            if item in source_items or match_pattern_list(item, ignore_pattern_list):
+                continue
+            _remove_path(target_entry.path)
+            removed.append(os.path.join(rel_dir, item))
+
+    def copy_one(task):
+        rel_item, source_file, target_file, src_sig = task
+        digest = _copy_file_with_digest(source_file, target_file)
+        target_st = os.stat(target_file)
+        return rel_item, src_sig + [target_st.st_size, target_st.st_mtime_ns, digest]
+
+    errors = []
+    if copy_tasks:
+        if max_workers is None:
+            max_workers = min(8, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(copy_tasks)))) as pool:
+            futures = [pool.submit(copy_one, task) for task in copy_tasks]
+            for future in futures:
+                try:
+                    rel_item, record = future.result()
+                    new_records[rel_item] = record
+                except Exception as e:
+                    errors.append(e)
+    if changed_paths is not None:
+        # a failed copy may have changed the target too
+        changed_paths.update(task[0] for task in copy_tasks)
+        changed_paths.update(removed)
+    if manifest_path:
+        _save_sync_manifest(manifest_path, source_dir, target_dir, new_records)
+    info(f"Synced {source_dir} to {target_dir}: {len(copy_tasks) - len(errors)} copied, "
+         f"{count['unchanged']} unchanged ({count['hashed']} hashed), {len(removed)} removed, "
+         f"{len(errors)} failed in {time.time() - start_time:.2f}s")
+    if errors:
+        raise errors[0]
     return target_dir
 
 def copy_skill_files(cfg, workspace, root_dir):
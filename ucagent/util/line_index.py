@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Line-offset index of text files for ranged reads.
+
+The byte offset of every `LINE_STRIDE`-th line start is kept, together with
+the line count, the SHA-256 and the UTF-8 validity of the content, keyed by
+the file's (inode, mtime_ns, size). Reading a line range then only reads and
+decodes the lines from the nearest checkpoint on. When a file only grew (same
+inode, same head and tail bytes at the old end) the index is extended from
+where it stopped, so following an append-only log does not scan it again.
+Lines end at '\\n', '\\r' or '\\r\\n', like text files opened with newline=''.
+
+Files are read with positioned reads, not mmap: logs and test outputs are
+rewritten by other processes while they are read, and touching a mapped page
+past the end of a truncated file kills the process with SIGBUS. A file that
+shrinks while it is read raises FileChangedError instead.
+"""
+
+import codecs
+import hashlib
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+LINE_STRIDE = 64
+_LINE_END = re.compile(rb"\r\n|\r|\n")
+_EDGE_SIZE = 64
+_CHUNK_SIZE = 1 << 20
+_READ_ATTEMPTS = 3
+
+
+class FileChangedError(OSError):
+    """The file was truncated or rewritten while it was read."""
+
+
+def _read_at(fd: int, offset: int, length: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(fd, length, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, length)
+
+
+def _iter_line_ends(fd: int, pos: int, size: int):
+    """
+    Yield the end offset of every line end in [pos, size), '\\r\\n' split over two reads counts once.
+    A '\\r' that is the last byte before `size` is not yielded, the file may continue with '\\n'.
+    Raises FileChangedError if the file is shorter than `size`.
+    """
+    skip_until = pos
+    while pos < size:
+        chunk = _read_at(fd, pos, min(_CHUNK_SIZE, size - pos))
+        if not chunk:
+            raise FileChangedError(f"file shrank below {size} bytes while it was read")
+        chunk_end = pos + len(chunk)
+        for match in _LINE_END.finditer(chunk):
+            if pos + match.start() < skip_until:
+                continue  # the '\n' of a '\r\n' split over two reads
+            end = pos + match.end()
+            if match.end() == len(chunk) and match.group() == b"\r":
+                if chunk_end >= size:
+                    return
+                if _read_at(fd, chunk_end, 1) == b"\n":
+                    end += 1
+            skip_until = end
+            yield end
+        pos = chunk_end
+
+
+class LineOffsetIndex:
+    """Line offsets, SHA-256 and UTF-8 state of one file, extended as the file grows."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.signature = None
+        self.size = 0
+        self.head = b""
+        self.tail = b""
+        # checkpoints[i] is the offset of line i * LINE_STRIDE + 1
+        self.checkpoints = array("Q", [0])
+        self.complete_lines = 0  # terminated lines before scan_pos
+        self.scan_pos = 0
+        self.hasher = hashlib.sha256()
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.decode_error = None
+
+    def _is_append(self, fd, st) -> bool:
+        if self.signature is None or st.st_ino != self.signature[0] or st.st_size <= self.size:
+            return False
+        return _read_at(fd, 0, len(self.head)) == self.head and \
+            _read_at(fd, self.size - len(self.tail), len(self.tail)) == self.tail
+
+    def update(self, fd: int, st):
+        """
+        Bring the index up to the content of the open file `fd` with stats `st`.
+        Raises FileChangedError (and forgets the file) if it shrinks while it is read.
+        """
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature == self.signature:
+            return
+        if not self._is_append(fd, st):
+            self._reset()
+        size = st.st_size
+        try:
+            for offset in range(self.size, size, _CHUNK_SIZE):
+                chunk = _read_at(fd, offset, min(_CHUNK_SIZE, size - offset))
+                if not chunk:
+                    raise FileChangedError(f"file shrank below {size} bytes while it was read")
+                self.hasher.update(chunk)
+                if self.decode_error is None:
+                    try:
+                        self.decoder.decode(chunk)
+                    except UnicodeDecodeError as e:
+                        self.decode_error = e
+                if len(chunk) < min(_CHUNK_SIZE, size - offset):
+                    raise FileChangedError(f"file shrank below {size} bytes while it was read")
+            for end in _iter_line_ends(fd, self.scan_pos, size):
+                self.complete_lines += 1
+                self.scan_pos = end
+                if self.complete_lines % LINE_STRIDE == 0:
+                    self.checkpoints.append(end)
+            head = _read_at(fd, 0, min(size, _EDGE_SIZE))
+            tail = _read_at(fd, max(0, size - _EDGE_SIZE), min(size, _EDGE_SIZE))
+        except FileChangedError:
+            self._reset()
+            raise
+        self.signature = signature
+        self.size = size
+        self.head = head
+        self.tail = tail
+
+    @property
+    def total_lines(self) -> int:
+        return self.complete_lines + (1 if self.size > self.scan_pos else 0)
+
+    def utf8_error(self):
+        """The UnicodeDecodeError of the content, None if it is valid UTF-8."""
+        if self.decode_error is not None:
+            return self.decode_error
+        pending = self.decoder.getstate()[0]
+        if pending:
+            try:
+                pending.decode("utf-8")
+            except UnicodeDecodeError as e:
+                return e
+        return None
+
+
+class TextFileView:
+    """An open text file with its up-to-date line index, see `open_text_view`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            fd = self.file.fileno()
+            index = _get_line_index(path)
+            with index.lock:
+                for attempt in range(_READ_ATTEMPTS):
+                    st = os.fstat(fd)
+                    try:
+                        index.update(fd, st)
+                        break
+                    except FileChangedError:
+                        if attempt == _READ_ATTEMPTS - 1:
+                            raise FileChangedError(f"'{path}' keeps changing while it is read, try again later")
+                self.size = st.st_size
+                self.sha256 = index.hasher.hexdigest()
+                self.total_lines = index.total_lines
+                self.checkpoints = index.checkpoints
+                self.decode_error = index.utf8_error()
+        except Exception:
+            self.close()
+            raise
+
+    def iter_lines(self, start: int = 1):
+        """
+        Yield (line_number, line) from line `start` (1-based), lines keep their line ends.
+        Raises FileChangedError if the file was truncated since the view was opened.
+        """
+        if self.decode_error is not None:
+            raise self.decode_error
+        start = max(1, start)
+        if start > self.total_lines:
+            return
+        slot = (start - 1) // LINE_STRIDE
+        pos, line_number = self.checkpoints[slot], slot * LINE_STRIDE + 1
+        fd = self.file.fileno()
+        # the last line may be unterminated (or end with a lone '\r')
+        for end in _chain_end(_iter_line_ends(fd, pos, self.size), self.size):
+            if line_number > self.total_lines:
+                return
+            if line_number >= start:
+                data = _read_at(fd, pos, end - pos)
+                if len(data) < end - pos:
+                    raise FileChangedError(f"'{self.path}' was truncated while it was read")
+                yield line_number, data.decode("utf-8")
+            pos = end
+            line_number += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _chain_end(line_ends, size: int):
+    last = None
+    for end in line_ends:
+        last = end
+        yield end
+    if last != size:
+        yield size
+
+
+_line_index_cache = OrderedDict()
+_line_index_cache_lock = threading.Lock()
+_line_index_cache_size = 32
+
+
+def _get_line_index(path: str) -> LineOffsetIndex:
+    real_path = os.path.realpath(path)
+    with _line_index_cache_lock:
+        index = _line_index_cache.get(real_path)
+        if index is None:
+            index = _line_index_cache[real_path] = LineOffsetIndex(real_path)
+        _line_index_cache.move_to_end(real_path)
+        while len(_line_index_cache) > _line_index_cache_size:
+            _line_index_cache.popitem(last=False)
+        return index
+
+
+def open_text_view(path: str) -> TextFileView:
+    """Map a text file and bring its cached line index up to date, use as a context manager."""
+    return TextFileView(path)
+
+
+def invalidate_line_index(path: str = None):
+    """
+    Drop the cached line indexes of a file, or of all files below a directory.
+    :param path: File or directory path, None to drop all indexes.
+    """
+    with _line_index_cache_lock:
+        if path is None:
+            _line_index_cache.clear()
+            return
+        real_path = os.path.realpath(path)
+        for key in [k for k in _line_index_cache if k == real_path or k.startswith(real_path + os.sep)]:
+            del _line_index_cache[key]
+
+
+def line_index_write_callback(workspace: str):
+    """
+    Create a write tool callback (success, path, msg) that drops the line indexes of changed files.
+    :param workspace: The workspace directory the tool paths are relative to.
+    """
+    def on_file_changed(success, path, msg):
+        if success and isinstance(path, str):
+            invalidate_line_index(os.path.join(workspace, path))
+    return on_file_changed
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""pytest plugin recording which files each test depends on, and re-running only impacted tests.
+
+Loaded by `RunUnityChipTest` through `PYTEST_PLUGINS` with:
+  UCA_TEST_IMPACT_DIR:    directory to write the recorded dependencies to
+  UCA_TEST_IMPACT_MAP:    dependency map of previous runs, {nodeid: {"deps": {path: signature}}}
+  UCA_TEST_IMPACT_ROOT:   workspace, only files below it are recorded
+  UCA_TEST_IMPACT_SELECT: "1" to deselect tests whose dependencies did not change
+
+The dependencies of a test are its test file, the files defining the fixtures it
+uses (`*api.py`, `conftest.py`), the workspace modules those reference or that are
+imported while it runs, and binary build artifacts (*.so) next to those modules.
+Each process writes `run_<shard>.json`; RunUnityChipTest merges them into the map.
+"""
+
+import json
+import os
+import sys
+import types
+
+import pytest
+
+ARTIFACT_EXTS = (".so", ".dylib", ".dll", ".pyd")
+
+_run = {"order": [], "rerun": [], "items": {}, "deps": {}}
+
+
+def file_signature(path: str):
+    """Return [mtime_ns, size] of a file, None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def is_impacted(entry: dict) -> bool:
+    """A test is impacted when any recorded dependency changed or disappeared."""
+    if not entry or not entry.get("deps"):
+        return True
+    return any(file_signature(p) != sig for p, sig in entry["deps"].items())
+
+
+def _root():
+    return os.path.realpath(os.environ.get("UCA_TEST_IMPACT_ROOT", os.getcwd()))
+
+
+def _under_root(path, root):
+    return path is not None and os.path.realpath(path).startswith(root + os.sep)
+
+
+def _module_file(mod):
+    path = getattr(mod, "__file__", None)
+    return os.path.realpath(path) if path else None
+
+
+def _referenced_modules(mod):
+    ret = []
+    for value in list(vars(mod).values()):
+        if isinstance(value, types.ModuleType):
+            ret.append(value)
+        else:
+            ret.append(sys.modules.get(getattr(value, "__module__", None) or ""))
+    return [m for m in ret if m is not None]
+
+
+def _item_dependencies(item, new_modules, root):
+    files = {os.path.realpath(str(item.path))}
+    modules = [getattr(item, "module", None)] + [sys.modules.get(name) for name in new_modules]
+    fixtureinfo = getattr(item, "_fixtureinfo", None)
+    for defs in (fixtureinfo.name2fixturedefs.values() if fixtureinfo else []):
+        for fixturedef in defs:
+            code = getattr(getattr(fixturedef, "func", None), "__code__", None)
+            if code is not None:
+                files.add(os.path.realpath(code.co_filename))
+                modules.append(sys.modules.get(getattr(fixturedef.func, "__module__", "")))
+    for mod in [m for m in modules if m is not None]:
+        for ref in [mod] + _referenced_modules(mod):
+            path = _module_file(ref)
+            if _under_root(path, root):
+                files.add(path)
+    for path in list(files):
+        directory = os.path.dirname(path)
+        if os.path.isfile(os.path.join(directory, "__init__.py")):
+            for name in os.listdir(directory):
+                if name.endswith(ARTIFACT_EXTS):
+                    files.add(os.path.join(directory, name))
+    return {p: file_signature(p) for p in sorted(files) if _under_root(p, root) and file_signature(p)}
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    impact_dir = os.environ.get("UCA_TEST_IMPACT_DIR")
+    if not impact_dir:
+        return
+    _run["order"] = [item.nodeid for item in items]
+    _run["items"] = {item.nodeid: [os.path.basename(str(item.path)), item.name] for item in items}
+    if os.environ.get("UCA_TEST_IMPACT_SELECT") != "1":
+        _run["rerun"] = list(_run["order"])
+        return
+    impact_map = {}
+    map_path = os.environ.get("UCA_TEST_IMPACT_MAP", "")
+    if os.path.exists(map_path):
+        with open(map_path, "r", encoding="utf-8") as f:
+            impact_map = json.load(f)
+    selected, deselected = [], []
+    for item in items:
+        (selected if is_impacted(impact_map.get(item.nodeid)) else deselected).append(item)
+    _run["rerun"] = [item.nodeid for item in selected]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    items[:] = selected
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    if not os.environ.get("UCA_TEST_IMPACT_DIR"):
+        yield
+        return
+    before = set(sys.modules)
+    yield
+    _run["deps"][item.nodeid] = _item_dependencies(item, set(sys.modules) - before, _root())
+
+
+def pytest_sessionfinish(session, exitstatus):
+    impact_dir = os.environ.get("UCA_TEST_IMPACT_DIR")
+    if not impact_dir:
+        return
+    shard = os.environ.get("UCA_PYTEST_SHARD", "0").split("/")[0]
+    os.makedirs(impact_dir, exist_ok=True)
+    with open(os.path.join(impact_dir, f"run_{shard}.json"), "w", encoding="utf-8") as f:
+        json.dump(_run, f)
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""Warm pytest worker pool.
+
+A zygote process imports pytest, toffee and the DUT packages once, then forks a
+fresh worker for every test run requested over a local UNIX socket. Each worker
+applies the requested env and cwd, redirects stdout/stderr to the given files and
+runs `pytest.main`, so a run skips the interpreter and library startup.
+Test files, `*api.py` and `conftest.py` are never preloaded: workers collect them
+from disk like a cold run. The zygote exits (and is restarted by the client) when
+a preloaded workspace file, e.g. a rebuilt DUT library, changes.
+
+Protocol: one JSON line per message, one connection per run.
+  client -> {"args": [...], "env": {...}, "cwd": str, "stdout": path, "stderr": path}
+  worker -> {"status": "started", "pid": int} ... {"status": "exit", "code": int}
+  zygote -> {"status": "stale"} if a preloaded file changed.
+"""
+
+import argparse
+import atexit
+import importlib
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from ucagent.util.log import info, warning
+
+ARTIFACT_EXTS = (".so", ".dylib", ".pyd")
+
+
+def _send(conn, data: dict):
+    conn.sendall((json.dumps(data) + "\n").encode("utf-8"))
+
+
+def _preloaded_signature(root: str) -> dict:
+    """(mtime_ns, size) of the preloaded modules and build artifacts below root."""
+    files = set()
+    for mod in list(sys.modules.values()):
+        path = getattr(mod, "__file__", None)
+        if not path or not os.path.realpath(path).startswith(root + os.sep):
+            continue
+        files.add(os.path.realpath(path))
+        directory = os.path.dirname(os.path.realpath(path))
+        for name in os.listdir(directory):
+            if name.endswith(ARTIFACT_EXTS):
+                files.add(os.path.join(directory, name))
+    ret = {}
+    for path in files:
+        try:
+            st = os.stat(path)
+            ret[path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            ret[path] = None
+    return ret
+
+
+def _is_stale(signature: dict) -> bool:
+    for path, sig in signature.items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        if sig != (st.st_mtime_ns, st.st_size):
+            return True
+    return False
+
+
+def _run_worker(conn, request: dict):
+    """Forked worker: run pytest with the requested env, report the exit code and exit."""
+    code = 1
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        os.setsid()
+        _send(conn, {"status": "started", "pid": os.getpid()})
+        os.environ.clear()
+        os.environ.update(request.get("env", {}))
+        for path in reversed([p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]):
+            if path not in sys.path:
+                sys.path.insert(0, path)
+        os.chdir(request["cwd"])
+        for fd, path in ((1, request["stdout"]), (2, request["stderr"])):
+            target = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            os.dup2(target, fd)
+            os.close(target)
+        import pytest
+        code = int(pytest.main(request["args"]))
+    except BaseException as e:  # the worker must always report and exit
+        print(f"Warm pytest worker error: {e}", file=sys.stderr)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            _send(conn, {"status": "exit", "code": code})
+        finally:
+            os._exit(code)
+
+
+def serve(socket_path: str, root: str, preload: list):
+    """Zygote main loop."""
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Warm pytest pool: preload {name} failed: {e}", file=sys.stderr)
+    signature = _preloaded_signature(os.path.realpath(root))
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # workers are reaped automatically
+    parent = os.getppid()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(16)
+    server.settimeout(1.0)
+    print("READY", flush=True)
+    while os.getppid() == parent:
+        try:
+            conn, _ = server.accept()
+        except socket.timeout:
+            continue
+        conn.settimeout(None)
+        try:
+            request = json.loads(conn.makefile("r", encoding="utf-8").readline())
+        except (OSError, ValueError):
+            conn.close()
+            continue
+        if _is_stale(signature):
+            _send(conn, {"status": "stale"})
+            conn.close()
+            break
+        if os.fork() == 0:
+            server.close()
+            _run_worker(conn, request)
+        conn.close()
+    server.close()
+
+
+class WarmWorker:
+    """Handle of a forked worker, used like a `subprocess.Popen` by tool pre-call backs."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is not None:
+            return
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except OSError:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+
+class WarmPytestPool:
+    """Client side of one zygote, keyed by working directory, PYTHONPATH and preload list."""
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, cwd: str, env: dict, root: str, preload: list):
+        self.cwd = cwd
+        self.env = dict(env)
+        self.root = root
+        self.preload = list(preload)
+        self.lock = threading.Lock()
+        self.process = None
+        self.socket_path = None
+        self.stats = {"cold_starts": 0, "cold_start_ms": 0.0, "warm_runs": 0, "warm_start_ms": 0.0}
+
+    @classmethod
+    def get(cls, cwd: str, env: dict, root: str, preload: list) -> "WarmPytestPool":
+        key = (cwd, env.get("PYTHONPATH", ""), root, tuple(preload))
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls(cwd, env, root, preload)
+                cls._pools[key] = pool
+            return pool
+
+    @classmethod
+    def shutdown_all(cls):
+        with cls._pools_lock:
+            for pool in cls._pools.values():
+                pool.shutdown()
+            cls._pools.clear()
+
+    @classmethod
+    def get_all_statistics(cls) -> dict:
+        with cls._pools_lock:
+            return {pool.cwd: pool.get_statistics() for pool in cls._pools.values()}
+
+    def get_statistics(self) -> dict:
+        stats = dict(self.stats)
+        stats["avg_cold_start_ms"] = stats["cold_start_ms"] / max(1, stats["cold_starts"])
+        stats["avg_warm_start_ms"] = stats["warm_start_ms"] / max(1, stats["warm_runs"])
+        return stats
+
+    def _start(self):
+        self.shutdown()
+        start = time.monotonic()
+        self.socket_path = os.path.join(tempfile.mkdtemp(prefix="ucagent_pytest_pool_"), "zygote.sock")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "ucagent.util.pytest_pool", "--socket", self.socket_path,
+             "--root", self.root, "--preload", ",".join(self.preload)],
+            cwd=self.cwd, env=self.env, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        if self.process.stdout.readline().strip() != "READY":
+            self.shutdown()
+            raise RuntimeError("warm pytest pool failed to start")
+        cost = (time.monotonic() - start) * 1000
+        self.stats["cold_starts"] += 1
+        self.stats["cold_start_ms"] += cost
+        info(f"Warm pytest pool started in {self.cwd} ({cost:.0f} ms, preload: {', '.join(self.preload)})")
+
+    def shutdown(self):
+        if self.process is not None:
+            try:
+                self.process.kill()
+                self.process.wait(timeout=3)
+            except Exception as e:
+                warning(f"Error stopping warm pytest pool: {e}")
+            self.process = None
+        if self.socket_path:
+            try:
+                os.remove(self.socket_path)
+                os.rmdir(os.path.dirname(self.socket_path))
+            except OSError:
+                pass
+            self.socket_path = None
+
+    def _connect(self, request: dict):
+        for _ in range(2):
+            if self.process is None or self.process.poll() is not None:
+                self._start()
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(self.socket_path)
+            _send(conn, request)
+            reader = conn.makefile("r", encoding="utf-8")
+            reply = json.loads(reader.readline() or "{}")
+            if reply.get("status") == "started":
+                return conn, reader, reply["pid"]
+            conn.close()
+            info(f"Warm pytest pool in {self.cwd} is stale ({reply.get('status')}), restart it")
+            self.shutdown()
+        raise RuntimeError("warm pytest pool did not start a worker")
+
+    def run(self, args: list, env: dict, cwd: str, timeout: float,
+            stdout_path: str = None, stderr_path: str = None, pre_call=None):
+        """Run pytest in a warm worker writing its output to the given files (discarded if None).
+        Return the exit code, None on timeout."""
+        with tempfile.TemporaryDirectory(prefix="ucagent_pytest_run_") as tmp:
+            start = time.monotonic()
+            with self.lock:
+                conn, reader, pid = self._connect({"args": args, "env": env, "cwd": cwd,
+                                                   "stdout": stdout_path or os.path.join(tmp, "stdout"),
+                                                   "stderr": stderr_path or os.path.join(tmp, "stderr")})
+            cost = (time.monotonic() - start) * 1000
+            self.stats["warm_runs"] += 1
+            self.stats["warm_start_ms"] += cost
+            info(f"Warm pytest worker {pid} started in {cost:.1f} ms")
+            worker = WarmWorker(pid)
+            if pre_call is not None:
+                pre_call(worker)
+            conn.settimeout(timeout)
+            try:
+                reply = json.loads(reader.readline() or '{"code": -1}')
+                worker.returncode = reply.get("code", -1)
+            except socket.timeout:
+                worker.kill()
+            finally:
+                conn.close()
+            return worker.returncode
+
+
+atexit.register(WarmPytestPool.shutdown_all)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UCAgent warm pytest pool zygote")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--root", required=True)
+    parser.add_argument("--preload", default="")
+    args = parser.parse_args()
+    serve(args.socket, args.root, [m for m in args.preload.split(",") if m])
+
+
+if __name__ == "__main__":
+    main()
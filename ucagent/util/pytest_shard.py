@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""pytest plugin that keeps one contiguous shard of the collected test items.
+
+Loaded by `RunUnityChipTest` through `PYTEST_PLUGINS` with
+`UCA_PYTEST_SHARD=<index>/<count>`. Every shard collects the same items with
+the same filters, so concatenating the shards in index order reproduces the
+order of a serial run.
+"""
+
+import os
+
+import pytest
+
+
+def parse_shard_spec(spec: str):
+    """Parse '<index>/<count>' into (index, count), None if invalid."""
+    try:
+        index, count = (int(x) for x in str(spec).split("/"))
+    except ValueError:
+        return None
+    if count < 1 or not 0 <= index < count:
+        return None
+    return index, count
+
+
+def shard_range(total: int, index: int, count: int):
+    """Return the [start, end) item range of a shard, sizes differ by at most one."""
+    return total * index // count, total * (index + 1) // count
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    shard = parse_shard_spec(os.environ.get("UCA_PYTEST_SHARD", ""))
+    if shard is None:
+        return
+    start, end = shard_range(len(items), *shard)
+    deselected = items[:start] + items[end:]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    items[:] = items[start:end]
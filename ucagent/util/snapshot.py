@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Copy-on-write snapshots of directory trees (stage checkpoints).
+
+A snapshot directory holds a copy of the tree in `tree/` and a `manifest.json`
+with the (size, mtime_ns, mode) of every file. Files unchanged since a base
+snapshot are hard links to the base snapshot's copy: snapshots are never
+modified, so they can share data. Other files are cloned with a reflink where
+the file system supports it (Linux FICLONE on btrfs/xfs/...) and copied
+otherwise. Restoring only rewrites the files that differ from the manifest, by
+cloning them back (never by hard links, as the restored tree is modified later).
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+
+from ucagent.util.functions import match_pattern_list
+from ucagent.util.log import warning
+
+SNAPSHOT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+TREE_NAME = "tree"
+_FICLONE = 0x40049409
+# (source st_dev, target st_dev) pairs where reflinks failed
+_no_reflink_devices = set()
+
+
+def clone_file(source_file: str, target_file: str) -> str:
+    """
+    Copy a file with its metadata, sharing its data blocks when the file system can.
+    :return: "reflink" or "copy"
+    """
+    if sys.platform.startswith("linux"):
+        import fcntl
+        devices = (os.stat(source_file).st_dev, os.stat(os.path.dirname(target_file) or ".").st_dev)
+        if devices not in _no_reflink_devices:
+            try:
+                with open(source_file, "rb") as fsrc, open(target_file, "wb") as fdst:
+                    fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+                shutil.copystat(source_file, target_file)
+                return "reflink"
+            except OSError:
+                _no_reflink_devices.add(devices)
+    shutil.copy2(source_file, target_file)
+    return "copy"
+
+
+def load_snapshot_manifest(snapshot_dir: str):
+    """Manifest of a snapshot ({"files": {rel: [size, mtime_ns, mode]}, "dirs": [...]}), None if invalid."""
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != SNAPSHOT_VERSION:
+        return None
+    return manifest
+
+
+def latest_snapshot(root_dir: str):
+    """The most recently taken snapshot directory below root_dir, None if there is none."""
+    latest, latest_time = None, None
+    if not os.path.isdir(root_dir):
+        return None
+    for entry in os.scandir(root_dir):
+        manifest = os.path.join(entry.path, MANIFEST_NAME)
+        if entry.is_dir() and os.path.isfile(manifest):
+            mtime = os.stat(manifest).st_mtime_ns
+            if latest_time is None or mtime > latest_time:
+                latest, latest_time = entry.path, mtime
+    return latest
+
+
+def _walk_files(top: str, ignore_pattern_list, follow_links: bool = True):
+    """Yield (rel_path, DirEntry, is_dir) below top, skipping ignored names."""
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        with os.scandir(os.path.join(top, rel_dir)) as it:
+            entries = list(it)
+        for entry in entries:
+            if match_pattern_list(entry.name, ignore_pattern_list):
+                continue
+            rel = os.path.join(rel_dir, entry.name)
+            is_dir = entry.is_dir()
+            if is_dir and (follow_links or not entry.is_symlink()):
+                pending.append(rel)
+            yield rel, entry, is_dir
+
+
+def take_snapshot(source_dir: str, snapshot_dir: str, ignore_pattern_list=(), base_dir: str = None) -> dict:
+    """
+    Snapshot source_dir into snapshot_dir (replacing it), sharing unchanged files with base_dir.
+    :return: Counts of the "linked", "reflinked" and "copied" files.
+    """
+    start_time = time.time()
+    source_dir, snapshot_dir = os.path.abspath(source_dir), os.path.abspath(snapshot_dir)
+    base = load_snapshot_manifest(base_dir) if base_dir else None
+    base_files = base["files"] if base else {}
+    tmp_dir = f"{snapshot_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tree = os.path.join(tmp_dir, TREE_NAME)
+    os.makedirs(tree)
+    files, dirs = {}, []
+    count = {"linked": 0, "reflinked": 0, "copied": 0}
+    try:
+        for rel, entry, is_dir in _walk_files(source_dir, ignore_pattern_list):
+            target = os.path.join(tree, rel)
+            if is_dir:
+                os.makedirs(target, exist_ok=True)
+                dirs.append(rel)
+                continue
+            st = entry.stat()
+            record = base_files.get(rel)
+            if record == [st.st_size, st.st_mtime_ns, st.st_mode & 0o7777]:
+                try:
+                    os.link(os.path.join(base_dir, TREE_NAME, rel), target)
+                    files[rel] = record
+                    count["linked"] += 1
+                    continue
+                except OSError:
+                    pass
+            method = clone_file(entry.path, target)
+            count["reflinked" if method == "reflink" else "copied"] += 1
+            st = os.stat(target)
+            files[rel] = [st.st_size, st.st_mtime_ns, st.st_mode & 0o7777]
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "source": source_dir, "time": time.time(),
+                       "files": files, "dirs": dirs}, f)
+        old_dir = None
+        if os.path.exists(snapshot_dir):
+            old_dir = f"{snapshot_dir}.old-{os.getpid()}"
+            os.rename(snapshot_dir, old_dir)
+        os.rename(tmp_dir, snapshot_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    count["seconds"] = round(time.time() - start_time, 3)
+    return count
+
+
+def restore_snapshot(snapshot_dir: str, target_dir: str, ignore_pattern_list=()) -> dict:
+    """
+    Make target_dir equal to a snapshot, rewriting only the files that differ from its manifest.
+    Ignored names in target_dir are left alone.
+    :return: Counts of the "unchanged", "restored" and "removed" items.
+    """
+    start_time = time.time()
+    manifest = load_snapshot_manifest(snapshot_dir)
+    if manifest is None:
+        raise ValueError(f"'{snapshot_dir}' is not a valid snapshot.")
+    files, dirs = manifest["files"], set(manifest["dirs"])
+    tree = os.path.join(snapshot_dir, TREE_NAME)
+    os.makedirs(target_dir, exist_ok=True)
+    count = {"unchanged": 0, "restored": 0, "removed": 0}
+    present = {}
+    stale_dirs = []
+    for rel, entry, is_dir in _walk_files(target_dir, ignore_pattern_list, follow_links=False):
+        if is_dir and not entry.is_symlink():
+            if rel not in dirs:
+                stale_dirs.append(entry.path)
+        elif rel in files and entry.is_file(follow_symlinks=False):
+            present[rel] = entry.stat(follow_symlinks=False)
+        else:
+            os.remove(entry.path)
+            count["removed"] += 1
+    for path in sorted(stale_dirs, reverse=True):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            count["removed"] += 1
+    for rel in sorted(dirs):
+        path = os.path.join(target_dir, rel)
+        if not os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
+    for rel, record in files.items():
+        st = present.get(rel)
+        if st is not None and [st.st_size, st.st_mtime_ns, st.st_mode & 0o7777] == record:
+            count["unchanged"] += 1
+            continue
+        target = os.path.join(target_dir, rel)
+        tmp = f"{target}.restore-{os.getpid()}"
+        try:
+            clone_file(os.path.join(tree, rel), tmp)
+            os.replace(tmp, target)
+        except OSError as e:
+            warning(f"Cannot restore {rel} from snapshot {snapshot_dir}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        count["restored"] += 1
+    count["seconds"] = round(time.time() - start_time, 3)
+    return count
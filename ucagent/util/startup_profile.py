@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Per-module import cost of the CLI start (`ucagent --profile-startup`).
+
+A meta path finder wraps the loader of every module imported after
+`enable_startup_profile()` and times its execution. Like `python -X importtime`
+each module gets a cumulative time (with the modules it imports) and a self
+time. The report is printed to stderr by `report_startup_profile()`, or at
+exit when the process ends before (e.g. `--help`).
+"""
+
+import atexit
+import sys
+import time
+
+_DEFAULT_TOP = 30
+
+
+class _TimedLoader:
+    """Loader proxy timing exec_module, the original loader is put back before the module runs."""
+
+    def __init__(self, profiler, loader):
+        self._profiler = profiler
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        spec = getattr(module, "__spec__", None)
+        if spec is not None and spec.loader is self:
+            spec.loader = self._loader
+        if getattr(module, "__loader__", None) is self:
+            module.__loader__ = self._loader
+        self._profiler.enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.leave()
+
+
+class StartupProfiler:
+    """Meta path finder recording [cumulative, self] import seconds per module."""
+
+    def __init__(self):
+        self.records = {}
+        self.stack = []
+        self.start_time = time.perf_counter()
+        self.preloaded = len(sys.modules)
+        self.reported = False
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(self, spec.loader)
+            return spec
+        return None
+
+    def enter(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def leave(self):
+        name, start, children = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.records[name] = [elapsed, elapsed - children]
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    def format_report(self, top: int = _DEFAULT_TOP) -> str:
+        total = time.perf_counter() - self.start_time
+        imports = sum(v[1] for v in self.records.values())
+        rows = sorted(self.records.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+        lines = [f"Startup import profile: {len(self.records)} modules imported in {imports * 1000:.1f} ms "
+                 f"({total * 1000:.1f} ms since profiling started, {self.preloaded} modules preloaded)",
+                 f"{'cumulative(ms)':>15} {'self(ms)':>10}  module"]
+        for name, (cumulative, own) in rows:
+            lines.append(f"{cumulative * 1000:15.1f} {own * 1000:10.1f}  {name}")
+        return "\n".join(lines)
+
+
+_profiler = None
+
+
+def enable_startup_profile() -> StartupProfiler:
+    """Start timing the imports of the process, the report is printed at exit if not done before."""
+    global _profiler
+    if _profiler is None:
+        _profiler = StartupProfiler()
+        sys.meta_path.insert(0, _profiler)
+        atexit.register(report_startup_profile)
+    return _profiler
+
+
+def report_startup_profile(top: int = _DEFAULT_TOP, file=None):
+    """Stop timing imports and print the `top` most expensive modules (once)."""
+    if _profiler is None or _profiler.reported:
+        return
+    _profiler.reported = True
+    if _profiler in sys.meta_path:
+        sys.meta_path.remove(_profiler)
+    print(_profiler.format_report(top), file=file or sys.stderr, flush=True)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Bounded capture of process output."""
+
+from collections import deque
+from typing import Callable, Optional
+import threading
+
+
+class BoundedOutputCapture:
+    """Line based capture that keeps the head and the tail of an output in memory.
+
+    Every line is also written to `spill_path`, so the full output stays available
+    on disk while memory use is bounded by `max_chars` regardless of the output size.
+    """
+
+    def __init__(self, max_chars: int = 65536, spill_path: Optional[str] = None,
+                 on_line: Optional[Callable[[str], None]] = None, head_ratio: float = 0.25):
+        self.head_limit = max(0, int(max_chars * head_ratio))
+        self.tail_limit = max(1, max_chars - self.head_limit)
+        self.spill_path = spill_path
+        self.on_line = on_line
+        self.head = []
+        self.head_chars = 0
+        self.tail = deque()
+        self.tail_chars = 0
+        self.total_lines = 0
+        self.omitted_lines = 0
+        self.lock = threading.Lock()
+        self._spill = open(spill_path, "w", encoding="utf-8") if spill_path else None
+
+    @classmethod
+    def from_file(cls, path: str, max_chars: int = 65536) -> "BoundedOutputCapture":
+        """Build a capture from an output file, which is used as the spill file."""
+        capture = cls(max_chars)
+        capture.spill_path = path
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                capture.write(line)
+        return capture
+
+    def write(self, line: str):
+        with self.lock:
+            self.total_lines += 1
+            if self._spill is not None:
+                self._spill.write(line)
+            if not self.tail and self.head_chars + len(line) <= self.head_limit:
+                self.head.append(line)
+                self.head_chars += len(line)
+            else:
+                kept = line[-self.tail_limit:]
+                self.tail.append(kept)
+                self.tail_chars += len(kept)
+                while self.tail_chars > self.tail_limit:
+                    self.tail_chars -= len(self.tail.popleft())
+                    self.omitted_lines += 1
+        if self.on_line is not None:
+            self.on_line(line)
+
+    def close(self):
+        with self.lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+    def getvalue(self) -> str:
+        with self.lock:
+            if not self.omitted_lines:
+                return "".join(self.head) + "".join(self.tail)
+            where = f", full output in {self.spill_path}" if self.spill_path else ""
+            return "".join(self.head) + \
+                f"\n... [{self.omitted_lines} of {self.total_lines} lines omitted{where}] ...\n" + \
+                "".join(self.tail)
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""Persistent trigram index of workspace text files.
+
+Every indexed file keeps the sorted set of byte trigrams of its lower-cased
+UTF-8 text, together with the (mtime_ns, size) it was built from. A search
+derives the trigrams that every match must contain from its pattern and only
+scans the files whose trigram set contains all of them. The index never
+decides a match, the normal line scanner does: a file is skipped only when it
+provably cannot match, and any file the index knows nothing about is scanned.
+Entries are checked against file stats on use and dropped by write tool callbacks.
+Queries never build entries: missing or stale files are scanned and queued, and
+`schedule_update()` indexes them and saves the index in a background thread.
+Files over `max_file_size` and files modified less than `min_file_age` seconds
+ago (they are likely to change again) are not indexed.
+"""
+
+import marshal
+import os
+import threading
+import time
+
+from ucagent.util.log import warning
+
+INDEX_VERSION = 1
+
+
+def _trigrams(data: bytes) -> set:
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def _literal_fragments_wildcard(pattern: str) -> list:
+    """Literal runs of a fnmatch pattern ('*', '?' and '[...]' are not literal)."""
+    ret, run, i = [], "", 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c in "*?":
+            ret.append(run)
+            run = ""
+        elif c == "[":
+            j = i + 1
+            if j < len(pattern) and pattern[j] == "!":
+                j += 1
+            if j < len(pattern) and pattern[j] == "]":
+                j += 1
+            end = pattern.find("]", j)
+            if end < 0:
+                run += c
+            else:
+                ret.append(run)
+                run = ""
+                i = end
+        else:
+            run += c
+        i += 1
+    ret.append(run)
+    return ret
+
+
+def _skip_regex_class(pattern: str, i: int):
+    """Index after the character class starting at pattern[i] == '[', None if not understood."""
+    i += 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1
+    while i < len(pattern) and pattern[i] != "]":
+        if pattern[i] == "[":  # nested or POSIX sets
+            return None
+        if pattern[i] == "\\":
+            i += 1
+        i += 1
+    return i + 1 if i < len(pattern) else None
+
+
+def _literal_fragments_regex(pattern: str):
+    """Literal runs that every match of a regular expression must contain, None if unknown.
+
+    Only the top level sequence is used: alternations and inline flags give up,
+    groups, classes and escapes end the current run, and a quantified char is dropped.
+    """
+    if "|" in pattern or "(?" in pattern:
+        return None
+    ret, run, i = [], "", 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            nxt = pattern[i + 1] if i + 1 < n else ""
+            if not nxt or nxt.isalnum():
+                ret.append(run)
+                run = ""
+                i += 2
+                continue
+            literal, i = nxt, i + 2
+        elif c == "(":
+            depth, i = 1, i + 1
+            while i < n and depth:
+                if pattern[i] == "\\":
+                    i += 2
+                    continue
+                if pattern[i] == "[":
+                    i = _skip_regex_class(pattern, i)
+                    if i is None:
+                        return None
+                    continue
+                depth += {"(": 1, ")": -1}.get(pattern[i], 0)
+                i += 1
+            if depth:
+                return None
+            ret.append(run)
+            run = ""
+            continue
+        elif c == "[":
+            i = _skip_regex_class(pattern, i)
+            if i is None:
+                return None
+            ret.append(run)
+            run = ""
+            continue
+        elif c == "{":
+            # a quantifier (or fuzzy constraint) of the previous item, or a literal '{'
+            end = pattern.find("}", i)
+            if end < 0:
+                return None
+            ret.append(run)
+            run = ""
+            i = end + 1
+            continue
+        elif c in ".^$)*?+":
+            ret.append(run)
+            run = ""
+            i += 1
+            continue
+        else:
+            literal, i = c, i + 1
+        if i < n and pattern[i] in "*?{":
+            # the char is optional or repeated: it ends the run without being required
+            ret.append(run)
+            run = ""
+            continue
+        run += literal
+    ret.append(run)
+    return ret
+
+
+def required_trigrams(pattern: str, use_regex: bool, case_sensitive: bool):
+    """
+    Trigrams (of the lower-cased text) that every line matched by a SearchText query contains.
+    :return: (trigrams, ascii_files_only) or None if the pattern gives no usable trigram.
+             With ascii_files_only the trigrams may only exclude pure ASCII files.
+    """
+    if use_regex:
+        fragments = _literal_fragments_regex(pattern)
+    elif "*" in pattern or "?" in pattern:
+        fragments = _literal_fragments_wildcard(pattern)
+    else:
+        fragments = [pattern]
+    if not fragments:
+        return None
+    ret = set()
+    for fragment in fragments:
+        # str.lower() of a non ASCII fragment may not be a substring of the lower-cased line
+        if len(fragment) < 3 or not fragment.isascii():
+            continue
+        ret |= _trigrams(fragment.lower().encode("utf-8"))
+    if not ret:
+        return None
+    # Unicode case folding lets ASCII letters match non ASCII chars (e.g. 'k' and KELVIN SIGN)
+    return ret, use_regex and not case_sensitive
+
+
+class TrigramIndex:
+    """Trigram index of the text files below a workspace, persisted to `index_path`."""
+
+    def __init__(self, workspace: str, index_path: str, max_file_size: int = 4 * 1024 * 1024,
+                 min_file_age: float = 60.0):
+        self.workspace = os.path.realpath(workspace)
+        self.index_path = index_path
+        self.max_file_size = max_file_size
+        self.min_file_age = min_file_age
+        # relative path -> (mtime_ns, size, is_ascii, sorted trigram blob) or (mtime_ns, size, None, None)
+        self.entries = None
+        self.dirty = False
+        self.lock = threading.RLock()
+        # relative path -> real path of the files to (re)index in the background
+        self.pending = {}
+        self.builder = None
+        self.stats = {"queries": 0, "files_skipped": 0, "files_scanned": 0, "files_indexed": 0}
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "rb") as f:
+                version, entries = marshal.load(f)
+            if version == INDEX_VERSION and isinstance(entries, dict):
+                self.entries = entries
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            warning(f"Ignore broken search index {self.index_path}: {e}")
+
+    def save(self):
+        """Write the index if it changed since the last save."""
+        with self.lock:
+            if not self.dirty or self.entries is None:
+                return
+            tmp = f"{self.index_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+                with open(tmp, "wb") as f:
+                    marshal.dump((INDEX_VERSION, self.entries), f)
+                os.replace(tmp, self.index_path)
+                self.dirty = False
+            except OSError as e:
+                warning(f"Cannot save search index {self.index_path}: {e}")
+
+    def _build_entry(self, real_path: str, st) -> tuple:
+        if st.st_size > self.max_file_size:
+            return (st.st_mtime_ns, st.st_size, None, None)
+        try:
+            with open(real_path, "r", encoding="utf-8") as f:
+                data = f.read().lower().encode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return (st.st_mtime_ns, st.st_size, None, None)
+        self.stats["files_indexed"] += 1
+        return (st.st_mtime_ns, st.st_size, data.isascii(), b"".join(sorted(_trigrams(data))))
+
+    def _get_entry(self, real_path: str, relative_path: str):
+        """Up-to-date entry of a file, None (and queued for indexing) if missing or stale."""
+        try:
+            st = os.stat(real_path)
+        except OSError:
+            return None
+        with self.lock:
+            self._load()
+            entry = self.entries.get(relative_path)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                return entry
+            self.pending[relative_path] = real_path
+        return None
+
+    def build_pending(self):
+        """Index the queued files and save the index, called by the background builder."""
+        while True:
+            with self.lock:
+                if not self.pending:
+                    break
+                relative_path, real_path = self.pending.popitem()
+            try:
+                st = os.stat(real_path)
+            except OSError:
+                continue
+            if time.time() - st.st_mtime < self.min_file_age:
+                continue  # recently modified: keep scanning it until it settles
+            entry = self._build_entry(real_path, st)
+            with self.lock:
+                self._load()
+                self.entries[relative_path] = entry
+                self.dirty = True
+        self.save()
+
+    def schedule_update(self):
+        """Start the background builder if files are queued or the index needs saving."""
+        with self.lock:
+            if not self.pending and not self.dirty:
+                return
+            if self.builder is not None and self.builder.is_alive():
+                return
+            self.builder = threading.Thread(target=self.build_pending, name="ucagent-search-index", daemon=True)
+            self.builder.start()
+
+    def wait_update(self, timeout: float = None):
+        """Wait for the background builder to finish."""
+        builder = self.builder
+        if builder is not None:
+            builder.join(timeout)
+
+    def query(self, pattern: str, use_regex: bool, case_sensitive: bool):
+        """Prepare a SearchText query for may_match, None if the index cannot narrow it."""
+        self.stats["queries"] += 1
+        return required_trigrams(pattern, use_regex, case_sensitive)
+
+    @staticmethod
+    def _blob_contains(blob: bytes, trigram: bytes) -> bool:
+        lo, hi = 0, len(blob) // 3
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = blob[mid * 3:mid * 3 + 3]
+            if value == trigram:
+                return True
+            if value < trigram:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def may_match(self, real_path: str, relative_path: str, query) -> bool:
+        """
+        Check whether a file can contain a match of the query from required_trigrams.
+        :return: False only if the file provably has no match, so it can be skipped.
+        """
+        if query is None:
+            return True
+        trigrams, ascii_files_only = query
+        entry = self._get_entry(real_path, relative_path)
+        if entry is None or entry[3] is None or (ascii_files_only and not entry[2]):
+            self.stats["files_scanned"] += 1
+            return True
+        blob = entry[3]
+        if all(self._blob_contains(blob, t) for t in trigrams):
+            self.stats["files_scanned"] += 1
+            return True
+        self.stats["files_skipped"] += 1
+        return False
+
+    def invalidate(self, relative_path: str = None):
+        """Drop the entries of a file or of all files below a directory, all entries if None."""
+        with self.lock:
+            self._load()
+            if relative_path is None:
+                self.entries.clear()
+            else:
+                path = os.path.normpath(relative_path).replace(os.sep, "/")
+                for key in [k for k in self.entries if k == path or k.startswith(path + "/") or path == "."]:
+                    del self.entries[key]
+            self.dirty = True
+
+    def on_file_changed(self, success, path, msg):
+        """`BaseReadWrite` callback for write tools."""
+        if success and isinstance(path, str):
+            self.invalidate(path)
+
+    def get_statistics(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries or {})
+            stats["pending"] = len(self.pending)
+            return stats
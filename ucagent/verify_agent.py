@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-from curses import echo
 from .tools.context import ArbitContextSummary
 from .util.config import get_config, save_runtime_config
 from .util.log import echo_g, echo_r, info, message, warning, error, msg_msg
@@ -18,6 +17,10 @@ from .util.functions import (
 )
 import ucagent.util.functions as fc
 from .util.test_tools import ucagent_lib_path
+from .util.text_index import TrigramIndex
+from .util.line_index import line_index_write_callback
+from .util.file_index import set_file_index_enabled
+from .tools.testops import set_warm_pool_config, warm_pool_summary
 
 import ucagent.tools
 from .tools import *
@@ -37,8 +40,6 @@ import shutil
 import os
 
 from .abackend import get_backend
-from langfuse import Langfuse
-from langfuse.langchain import CallbackHandler
 from uuid import uuid4
 from typing import Any, Dict, List, Optional, OrderedDict
 import traceback
@@ -252,6 +253,11 @@ class VerifyAgent:
         self.cwd_read_only_files = fc.chmode_ro_by_pattern(
             self.workspace, self.cfg.get_value("un_write_dirs", [])
         )
+        set_file_index_enabled(self.cfg.get_value("tools.file_index.enable", True))
+        set_warm_pool_config(
+            self.cfg.get_value("tools.RunTestCases.warm_pool.enable", False),
+            self.cfg.get_value("tools.RunTestCases.warm_pool.preload", []),
+        )
         self.tool_waveinfo = WaveInfo(
             workspace=self.workspace,
             test_dir=self.cfg.tools.RunTestCases.test_dir,
@@ -297,6 +303,11 @@ class VerifyAgent:
                 write_dirs=self.cfg.write_dirs,
                 un_write_dirs=self.cfg.un_write_dirs,
             ),
+            MultiEditFiles(
+                self.workspace,
+                write_dirs=self.cfg.write_dirs,
+                un_write_dirs=self.cfg.un_write_dirs,
+            ),
             # File management tools (require permissions)
             CopyFile(
                 self.workspace,
@@ -319,6 +330,39 @@ class VerifyAgent:
             # bash tool
             RunBashCommand(self.workspace),
         ]
+        self.tool_result_cache = None
+        if self.cfg.get_value("tools.result_cache.enable", False):
+            self.tool_result_cache = ToolResultCache(
+                self.workspace,
+                max_entries=self.cfg.get_value("tools.result_cache.max_entries", 256),
+            )
+            for tool in self.tool_list_file + [self.tool_read_text]:
+                if not isinstance(tool, BaseReadWrite):
+                    continue
+                if isinstance(tool, (ReadTextFile, PathList, SearchText, FindFiles, GetFileInfo)):
+                    tool.set_result_cache(self.tool_result_cache)
+                else:
+                    tool.append_callback(self.tool_result_cache.on_file_changed)
+        # Drop the parsed document models (doc mark checkers) and line indexes of files changed by write tools
+        on_doc_changed = fc.doc_model_write_callback(self.workspace)
+        on_lines_changed = line_index_write_callback(self.workspace)
+        search_index = None
+        if self.cfg.get_value("tools.search_index.enable", False):
+            # Files are indexed and the index saved in a background thread, never during a query
+            search_index = TrigramIndex(
+                self.workspace,
+                fc.get_abs_path_cwd_ucagent(self.workspace, os.path.join("search_index", "trigrams.idx")),
+                max_file_size=int(self.cfg.get_value("tools.search_index.max_file_size", 4 * 1024 * 1024)),
+                min_file_age=float(self.cfg.get_value("tools.search_index.min_file_age", 60)),
+            )
+            self.tool_search_text.set_search_index(search_index)
+        for tool in self.tool_list_file:
+            if isinstance(tool, BaseReadWrite) and \
+               not isinstance(tool, (ReadTextFile, PathList, SearchText, FindFiles, GetFileInfo)):
+                tool.append_callback(on_doc_changed)
+                tool.append_callback(on_lines_changed)
+                if search_index is not None:
+                    tool.append_callback(search_index.on_file_changed)
         self.tool_list_task = self.stage_manager.new_tools()
         self.tool_list_ext = import_and_instance_tools(
             self.cfg.get_value("ex_tools", []), ucagent.tools
@@ -356,6 +400,15 @@ class VerifyAgent:
         self.tail_keep_msgs = self.cfg.get_value(
             "conversation_summary.tail_keep_msgs", 20
         )
+        self.background_summary = self.cfg.get_value(
+            "conversation_summary.background_summary", False
+        ) is True
+        self.background_watermark = self.cfg.get_value(
+            "conversation_summary.background_watermark", 0.7
+        )
+        self.background_queue_size = self.cfg.get_value(
+            "conversation_summary.background_queue_size", 2
+        )
         self.message_echo_handler = None
         self.update_handler = None
         self._time_start = time.time()
@@ -447,6 +500,8 @@ class VerifyAgent:
         langfuse_cfg = self.cfg.get_value("langfuse", {})
         self.langfuse_enable = langfuse_cfg.get_value("enable", False) is True
         if self.langfuse_enable:
+            from langfuse import Langfuse
+            from langfuse.langchain import CallbackHandler
             public_key = langfuse_cfg.get_value("public_key", "")
             secret_key = langfuse_cfg.get_value("secret_key", "")
             base_url = langfuse_cfg.get_value("base_url", "")
@@ -1017,6 +1072,9 @@ class VerifyAgent:
                 f"Token Reception({self.backend.token_total()})/TPS": self.backend.token_speed(),
             }
         )
+        warm_pool = warm_pool_summary()
+        if warm_pool:
+            stats["Warm Pytest Pool"] = warm_pool
         return stats
 
     def message_get_str(self, index, count):
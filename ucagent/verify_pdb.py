@@ -1358,6 +1358,9 @@ class VerifyPDB(Pdb):
         echo(f"[Name]: {tool.name}")
         echo(f"[Description]:\n{tool.description}")
         echo(f"[Call Count]: {tool.call_count}")
+        cache_stats = getattr(tool, "get_cache_statistics", lambda: None)()
+        if cache_stats is not None:
+            echo(f"[Cache]: hits {cache_stats['hits']}, misses {cache_stats['misses']}, invalidations {cache_stats['invalidations']}")
         if tool.args:
             echo(f"[Args]:\n{dump_as_json(tool.args)}")
 
@@ -1477,6 +1480,15 @@ class VerifyPDB(Pdb):
                  getattr(tool, "is_hot", lambda: False)())
                  for tool in self.agent.test_tools]
 
+    def api_tool_cache_status(self):
+        """Return {tool name: hit/miss counters} for tools using the result cache."""
+        ret = {}
+        for tool in self.agent.test_tools:
+            stats = getattr(tool, "get_cache_statistics", lambda: None)()
+            if stats is not None:
+                ret[tool.name] = stats
+        return ret
+
     def api_task_detail(self, index=None):
         """
         Get details of a specific task.
@@ -3657,6 +3669,26 @@ class VerifyPDB(Pdb):
             return
         self.agent.stage_manager.unskip_stage(index)
 
+    def do_clear_check_cache(self, arg):
+        """
+        Drop cached checker results so the next Check runs all checkers in full.
+        Usage: clear_check_cache [index|all]  (default: current stage)
+        """
+        arg = arg.strip()
+        index = None
+        if arg == "all":
+            index = "all"
+        elif arg:
+            try:
+                index = int(arg)
+            except ValueError:
+                echo_r("Invalid index. Usage: clear_check_cache [index|all]")
+                return
+        if not self.agent.stage_manager.invalidate_check_cache(index):
+            echo_r(f"Index {index} is out of range. Valid range: 0 to {len(self.agent.stage_manager.stages) - 1}.")
+            return
+        echo_g("Check cache cleared.")
+
     def do_messages_config(self, arg):
         """
         Show or set message configuration.
@@ -4088,6 +4120,40 @@ class VerifyPDB(Pdb):
         stage.hist_commit(arg)
         echo_g("Stage changes committed.")
 
+    def do_stage_checkpoint_restore(self, arg):
+        """
+        Restore the output dir to the checkpoint taken when a stage completed (needs hist_checkpoint.enable).
+        args:
+            <stage_index>
+        """
+        index = arg.strip()
+        if not index:
+            echo_y("Usage: stage_checkpoint_restore <stage_index>")
+            return
+        try:
+            index = int(index)
+        except ValueError:
+            echo_r(f"Invalid stage index: {index}")
+            return
+        stage = self.agent.stage_manager.get_stage(index)
+        if stage is None:
+            echo_r("No stage available.")
+            return
+        try:
+            count = stage.hist_checkpoint_restore()
+        except Exception as e:
+            echo_r(f"Restore checkpoint failed: {e}")
+            return
+        echo_g(f"Checkpoint of stage {stage.title_short()} restored: "
+               f"{count['restored']} restored, {count['removed']} removed, {count['unchanged']} unchanged.")
+
+    def complete_stage_checkpoint_restore(self, text, line, begidx, endidx):
+        """
+        Auto-complete the stage_checkpoint_restore command.
+        """
+        stage_index = [str(i) for i in range(len(self.agent.stage_manager.stages))]
+        return [i for i in stage_index if i.startswith(text.strip())]
+
     def do_quit(self, arg):
         """
         Quit the debugger.